@@ -28,6 +28,7 @@ class SampleRule(Rule):
         # better access config via self.get_config*
 
         # create cron job - syntax see https://github.com/dbader/schedule
+        # (or a cron expression like "*/5 * * * *", IntervalTrigger(60), DailyTrigger("07:30"))
         cron_job = schedule.every().minute
         # choose a cron name to recognize several cron jobs
         self.subscribe_cron_actions(self.CRON_NAME, cron_job)
@@ -1,6 +1,8 @@
+from enum import Enum
 from prend.channel import Channel, ChannelType
 from prend.oh.oh_event import OhEvent, OhNotificationType
 from prend.state import State
+from typing import Optional
 
 
 class ActionException(Exception):
@@ -12,7 +14,43 @@ class OhIllegalActionException(ActionException):
         super().__init__('invalid action ({})!'.format(str(event) if event else 'None'))
 
 
+class ActionPriority(Enum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __repr__(self) -> str:
+        return self.name
+
+    @staticmethod
+    def parse(text) -> Optional['ActionPriority']:
+        result = None
+        if text:
+            text = text.strip().upper()
+            for en in ActionPriority:
+                if en.name == text:
+                    result = en
+                    break
+        return result
+
+    @staticmethod
+    def get_default(notification_type: Optional[OhNotificationType]) -> 'ActionPriority':
+        """commands are served before state changes (telemetry)"""
+        if notification_type == OhNotificationType.ITEM_COMMAND:
+            return ActionPriority.HIGH
+        return ActionPriority.NORMAL
+
+
 class Action:
+    """
+    Once pushed to the dispatcher, an action is a shared payload: all listeners of the channel get the same instance
+    (bound via BoundAction), so it must not be changed anymore.
+    """
+
+    __slots__ = ('channel', 'listener', 'state_old', 'state_new', 'notification_type')
 
     def __init__(self):
         self.channel = None
@@ -24,7 +62,7 @@ class Action:
     def __eq__(self, other) -> bool:
         if not other:
             return False
-        if type(self) != type(other):
+        if not isinstance(other, (Action, BoundAction)):
             return False
         if self.channel != other.channel:
             return False
@@ -67,6 +105,19 @@ class Action:
             return True
         return False
 
+    def coalesce(self, newer: 'Action') -> None:
+        """takes over the new state of a newer action of the same channel and listener (the old state is kept)"""
+        self.state_new = newer.state_new
+
+    def copy_with_state_new(self, state_new: Optional[State]) -> 'Action':
+        action = Action()
+        action.channel = self.channel
+        action.listener = self.listener
+        action.state_old = self.state_old
+        action.state_new = state_new
+        action.notification_type = self.notification_type
+        return action
+
     @staticmethod
     def create_cron_action(channel_name: str) -> 'Action':
         action = Action()
@@ -90,3 +141,67 @@ class Action:
         action.notification_type = event.notification_type
 
         return action
+
+
+class BoundAction:
+    """
+    Envelope, which binds a shared action (payload) to one listener: the fan-out of an action to many listeners
+    allocates only these small objects instead of copies of the action. Provides the (read) interface of Action.
+    """
+
+    __slots__ = ('action', 'listener', 'priority', 'deadline')
+
+    def __init__(self, action: Action, listener, priority: ActionPriority = ActionPriority.NORMAL,
+                 deadline: Optional[float] = None):
+        """:param deadline: time.monotonic; expired actions get skipped by the action queue"""
+        self.action = action
+        self.listener = listener
+        self.priority = priority
+        self.deadline = deadline
+
+    @property
+    def channel(self) -> Channel:
+        return self.action.channel
+
+    @property
+    def state_old(self) -> Optional[State]:
+        return self.action.state_old
+
+    @property
+    def state_new(self) -> Optional[State]:
+        return self.action.state_new
+
+    @property
+    def notification_type(self) -> Optional[OhNotificationType]:
+        return self.action.notification_type
+
+    def __eq__(self, other) -> bool:
+        if not other:
+            return False
+        if not isinstance(other, (Action, BoundAction)):
+            return False
+        if self.listener != other.listener:
+            return False
+        if self.action is getattr(other, 'action', None):
+            return True
+        return self.channel == other.channel and self.state_old == other.state_old and \
+            self.state_new == other.state_new and self.notification_type == other.notification_type
+
+    def __repr__(self) -> str:
+        if self.channel and self.channel.type in [ChannelType.CRON, ChannelType.STARTUP]:
+            return '{}({})'.format(self.__class__.__name__, self.channel)
+        else:
+            return '{}({} | {} => {}; | {} (old: {}))'\
+                .format(self.__class__.__name__, self.notification_type, self.channel,
+                        self.listener, self.state_new, self.state_old)
+
+    def is_valid(self) -> bool:
+        return self.action.is_valid()
+
+    def should_be_published(self) -> bool:
+        return self.action.should_be_published()
+
+    def coalesce(self, newer) -> None:
+        """takes over the new state of a newer action; the shared payload stays untouched (copy for this listener)"""
+        self.action = self.action.copy_with_state_new(newer.state_new)
+        self.deadline = getattr(newer, 'deadline', self.deadline)  # the new state is as fresh as the newer action
@@ -0,0 +1,433 @@
+import collections
+import copy
+import logging
+import threading
+import time
+from enum import Enum
+from typing import Optional
+from prend.action import Action, ActionPriority
+from prend.oh.oh_event import OhNotificationType
+
+
+_logger = logging.getLogger(__name__)
+
+
+class ActionQueuePolicy(Enum):
+    COALESCE = 'coalesce'  # merge with a queued action of the same channel and listener (latest state wins)
+    DROP_OLDEST = 'drop_oldest'  # drop the oldest queued state change
+    BLOCK = 'block'  # let the producer wait (with timeout), drop the oldest state change afterwards
+
+    def __repr__(self) -> str:
+        return self.value
+
+
+class ActionQueueFairness(Enum):
+    FIFO = 'fifo'  # one queue for all listeners
+    ROUND_ROBIN = 'round_robin'  # one queue per listener, served in turns (one action each)
+    WEIGHTED = 'weighted'  # one queue per listener, "weight" actions per turn (see "set_weight")
+
+    def __repr__(self) -> str:
+        return self.value
+
+
+class ActionQueueStatistics:
+    """overflow counters of "ActionQueue" """
+
+    def __init__(self):
+        self.put = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.expired = 0
+        self.blocked = 0
+        self.block_time = 0.0
+        self.size_max = 0
+
+    def __repr__(self) -> str:
+        return '{}(put={}, coalesced={}, dropped={}, expired={}, blocked={} ({:.3f}s), size max={})'\
+            .format(self.__class__.__name__, self.put, self.coalesced, self.dropped, self.expired, self.blocked,
+                    self.block_time, self.size_max)
+
+
+class ListenerQueueStatistics:
+    """per listener: queued actions and their waiting time"""
+
+    def __init__(self, listener):
+        self.listener = listener
+        self.backlog = 0  # current count of queued actions (not reset)
+        self.backlog_max = 0
+        self.served = 0
+        self.wait_time = 0.0
+        self.wait_time_max = 0.0
+        self.coalesced = 0
+        self.dropped = 0
+        self.expired = 0
+
+    def __repr__(self) -> str:
+        wait_time_avg = self.wait_time / self.served if self.served else 0.0
+        return '{}(backlog={} (max {}), served={}, wait avg={:.3f}ms, wait max={:.3f}ms, coalesced={}, dropped={}, ' \
+               'expired={})'.format(self.__class__.__name__, self.backlog, self.backlog_max, self.served,
+                                    1000 * wait_time_avg, 1000 * self.wait_time_max, self.coalesced, self.dropped,
+                                    self.expired)
+
+    def is_active(self) -> bool:
+        return bool(self.backlog or self.served or self.coalesced or self.dropped or self.expired)
+
+    def reset(self) -> None:
+        self.backlog_max = self.backlog
+        self.served = 0
+        self.wait_time = 0.0
+        self.wait_time_max = 0.0
+        self.coalesced = 0
+        self.dropped = 0
+        self.expired = 0
+
+
+class QueueEntry:
+    """queued action; "queued" == neither served nor dropped"""
+
+    __slots__ = ('action', 'time_put', 'queued')
+
+    def __init__(self, action: Action, time_put: float):
+        self.action = action
+        self.time_put = time_put
+        self.queued = True
+
+    def is_expired(self, time_now: float) -> bool:
+        deadline = getattr(self.action, 'deadline', None)
+        return deadline is not None and deadline < time_now
+
+
+class ListenerQueue:
+    """queued actions of one listener (or of all with FIFO) within one priority level"""
+
+    __slots__ = ('key', 'entries', 'credit')
+
+    def __init__(self, key, credit: int):
+        self.key = key
+        self.entries = collections.deque()  # QueueEntry
+        self.credit = credit  # actions left in the current turn
+
+
+class PriorityLevel:
+    """listener queues of one priority, served round robin (deficit round robin with weights)"""
+
+    def __init__(self):
+        self.queues = {}  # listener key => ListenerQueue
+        self.ring = collections.deque()  # ListenerQueue with entries; [0] is served next
+        self.order = collections.deque()  # QueueEntry in put order; served, dropped and expired ones removed lazily
+
+    def __bool__(self) -> bool:
+        return bool(self.ring)
+
+    def get_oldest(self, time_now: float) -> Optional[QueueEntry]:
+        """:return: oldest entry, which is still queued and not expired (with round robin not the next served)"""
+        order = self.order
+        while order:
+            entry = order[0]
+            if entry.queued and not entry.is_expired(time_now):
+                return entry
+            order.popleft()  # an expired entry stays expired
+        return None
+
+    def append(self, key, entry: QueueEntry, weight: int) -> None:
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = ListenerQueue(key, weight)
+            self.queues[key] = queue
+            self.ring.append(queue)
+        queue.entries.append(entry)
+        self.order.append(entry)
+
+    def pop(self, weight_func) -> QueueEntry:
+        queue = self.ring[0]
+        entry = queue.entries.popleft()
+        entry.queued = False
+        queue.credit -= 1
+        if not queue.entries:
+            self.ring.popleft()
+            del self.queues[queue.key]
+            if not self.ring:
+                self.order.clear()
+        elif queue.credit <= 0:
+            queue.credit = weight_func(queue.key)
+            self.ring.rotate(-1)
+        return entry
+
+    def remove_entry(self, queue: ListenerQueue, index: int) -> None:
+        queue.entries[index].queued = False
+        del queue.entries[index]
+        if not queue.entries:
+            self.ring.remove(queue)
+            del self.queues[queue.key]
+            if not self.ring:
+                self.order.clear()
+
+
+class ActionQueue:
+    """
+    Bounded (synchronized) queue between the producers of actions (observer, gateway, cron jobs) and the dispatcher.
+
+    Only state changes (telemetry) are subject to the overflow policy, commands, cron and startup actions are always
+    enqueued (they may exceed the limit).
+
+    Actions are served strictly by priority ("priority" of BoundAction, default NORMAL). Only against starvation a
+    priority gets promoted by one level per "promotion_seconds" its oldest not expired action waits (default 30s), so
+    a backlog of seconds never delays higher priority actions. Actions with an expired "deadline" are skipped (counted
+    as "expired").
+
+    Within a priority the listeners get their own queues and are served in turns (fairness ROUND_ROBIN or WEIGHTED),
+    so a listener with hundreds of queued actions doesn't delay the others. On overflow the listener with the biggest
+    backlog loses its oldest state change. FIFO keeps one queue for all listeners.
+    """
+
+    OVERFLOW_TYPES = (OhNotificationType.ITEM_CHANGE, OhNotificationType.GROUP_CHANGE,
+                      OhNotificationType.THING_CHANGE, OhNotificationType.AGGREGATE_CHANGE)
+
+    def __init__(self, max_size=1000, policy=ActionQueuePolicy.COALESCE, block_timeout=5.0,
+                 fairness=ActionQueueFairness.FIFO, promotion_seconds=30.0):
+        self._max_size = max_size
+        self._policy = policy
+        self._block_timeout = block_timeout
+        self._fairness = fairness
+        self._promotion_seconds = promotion_seconds
+        self._levels = [PriorityLevel() for _ in ActionPriority]  # index == priority value
+        self._size = 0
+        self._queued_states = {}  # (channel, listener id) => queued state change
+        self._weights = {}  # listener id => actions per turn (WEIGHTED)
+        self._listener_statistics = {}  # listener id => ListenerQueueStatistics
+        self._backlog_buckets = {}  # backlog => listener ids (dict as ordered set) => victims of "drop oldest"
+        self._backlog_max = 0
+        self._condition = threading.Condition()
+        self._consumer_ident = None
+        self._statistics = ActionQueueStatistics()
+
+    @staticmethod
+    def create(max_size=None, policy=None, block_timeout=None, fairness=None,
+               promotion_seconds=None) -> 'ActionQueue':
+        """
+        :param max_size: None => default
+        :param policy: ActionQueuePolicy or its (config) text; None => default
+        :param block_timeout: seconds; None => default
+        :param fairness: ActionQueueFairness or its (config) text; None => default (FIFO)
+        :param promotion_seconds: waiting time, after which a priority gets promoted by one level; None => default
+        """
+        queue = ActionQueue()
+        if max_size is not None:
+            if max_size < 1:
+                raise ValueError('invalid action queue size ({})!'.format(max_size))
+            queue._max_size = max_size
+        if policy is not None:
+            queue._policy = policy if isinstance(policy, ActionQueuePolicy) else ActionQueuePolicy(policy.lower())
+        if block_timeout is not None:
+            queue._block_timeout = block_timeout
+        if fairness is not None:
+            queue._fairness = fairness if isinstance(fairness, ActionQueueFairness) \
+                else ActionQueueFairness(fairness.lower())
+        if promotion_seconds is not None:
+            if promotion_seconds <= 0:
+                raise ValueError('invalid action queue promotion ({}s)!'.format(promotion_seconds))
+            queue._promotion_seconds = promotion_seconds
+        return queue
+
+    def __repr__(self) -> str:
+        return '{}(size={}, max={}, policy={}, fairness={})'.format(self.__class__.__name__, self.qsize(),
+                                                                    self._max_size, self._policy, self._fairness)
+
+    def get_policy(self) -> ActionQueuePolicy:
+        return self._policy
+
+    def get_fairness(self) -> ActionQueueFairness:
+        return self._fairness
+
+    def set_weight(self, listener, weight: int) -> None:
+        """:param weight: actions per turn of the listener (fairness WEIGHTED), default 1"""
+        if not isinstance(weight, int) or weight < 1:
+            raise ValueError('invalid weight ({})!'.format(weight))
+        with self._condition:
+            self._weights[id(listener)] = weight
+
+    def qsize(self) -> int:
+        with self._condition:
+            return self._size
+
+    def put(self, action: Action) -> None:
+        self.put_all([action])
+
+    def put_all(self, actions: list) -> None:
+        with self._condition:
+            for action in actions:
+                self._put_locked(action)
+            self._statistics.size_max = max(self._statistics.size_max, self._size)
+
+    def get_nowait(self) -> Optional[Action]:
+        """:return: next action or None (empty queue)"""
+        with self._condition:
+            self._consumer_ident = threading.get_ident()
+            time_now = time.monotonic()
+            action = None
+            while self._size:
+                entry = self._pop_locked(self._select_level_locked(time_now))
+                action = entry.action
+                listener_statistics = self._get_listener_statistics_locked(action)
+                if not entry.is_expired(time_now):
+                    listener_statistics.served += 1
+                    wait_time = time_now - entry.time_put
+                    listener_statistics.wait_time += wait_time
+                    listener_statistics.wait_time_max = max(listener_statistics.wait_time_max, wait_time)
+                    break
+                self._statistics.expired += 1
+                listener_statistics.expired += 1
+                action = None
+            self._condition.notify_all()
+        return action
+
+    def pop_statistics(self) -> ActionQueueStatistics:
+        """:return: statistics since last call"""
+        with self._condition:
+            statistics = self._statistics
+            self._statistics = ActionQueueStatistics()
+            self._statistics.size_max = self._size
+        return statistics
+
+    def pop_listener_statistics(self) -> list:
+        """:return: ListenerQueueStatistics (backlog, wait time, drops) of the active listeners since last call"""
+        result = []
+        with self._condition:
+            for listener_id, statistics in list(self._listener_statistics.items()):
+                if statistics.is_active():
+                    result.append(copy.copy(statistics))
+                    statistics.reset()
+                else:
+                    del self._listener_statistics[listener_id]
+        return result
+
+    @classmethod
+    def _get_key(cls, action: Action):
+        if action.notification_type in cls.OVERFLOW_TYPES and action.listener is not None:
+            return action.channel, id(action.listener)
+        return None
+
+    def _get_listener_key(self, action: Action):
+        if self._fairness == ActionQueueFairness.FIFO:
+            return None
+        return id(action.listener)
+
+    def _get_weight(self, listener_key) -> int:
+        if self._fairness == ActionQueueFairness.WEIGHTED:
+            return self._weights.get(listener_key, 1)
+        return 1
+
+    def _get_listener_statistics_locked(self, action: Action) -> ListenerQueueStatistics:
+        statistics = self._listener_statistics.get(id(action.listener))
+        if statistics is None:
+            statistics = ListenerQueueStatistics(action.listener)
+            self._listener_statistics[id(action.listener)] = statistics
+        return statistics
+
+    def _change_backlog_locked(self, action: Action, delta: int) -> ListenerQueueStatistics:
+        """keeps the backlog buckets up to date (delta +1/-1), so an overflow finds the biggest backlog directly"""
+        statistics = self._get_listener_statistics_locked(action)
+        listener_id = id(action.listener)
+        backlog = statistics.backlog
+        bucket = self._backlog_buckets.get(backlog)
+        if bucket is not None:
+            bucket.pop(listener_id, None)
+            if not bucket:
+                del self._backlog_buckets[backlog]
+                if backlog == self._backlog_max:
+                    self._backlog_max = backlog + delta
+        backlog += delta
+        statistics.backlog = backlog
+        if backlog > 0:
+            self._backlog_buckets.setdefault(backlog, {})[listener_id] = None
+            self._backlog_max = max(self._backlog_max, backlog)
+        return statistics
+
+    def _select_level_locked(self, time_now: float) -> PriorityLevel:
+        """:return: level with the best (promoted) priority; equal => the higher priority"""
+        selected = None
+        selected_rank = None
+        for index, level in enumerate(self._levels):
+            if level:
+                oldest = level.get_oldest(time_now)
+                rank = index - int((time_now - oldest.time_put) // self._promotion_seconds) if oldest else index
+                if selected is None or rank < selected_rank:
+                    selected, selected_rank = level, rank
+        return selected
+
+    def _pop_locked(self, level: PriorityLevel) -> QueueEntry:
+        entry = level.pop(self._get_weight)
+        action = entry.action
+        self._size -= 1
+        self._change_backlog_locked(action, -1)
+        key = self._get_key(action)
+        if key and self._queued_states.get(key) is action:
+            del self._queued_states[key]
+        return entry
+
+    def _put_locked(self, action: Action) -> None:
+        self._statistics.put += 1
+        key = self._get_key(action)
+        listener_statistics = self._get_listener_statistics_locked(action)
+
+        if key and self._size >= self._max_size:
+            if self._policy == ActionQueuePolicy.COALESCE:
+                queued = self._queued_states.get(key)
+                if queued is not None:
+                    # keep the position and the old state of the queued action => the listener sees the whole change
+                    queued.coalesce(action)
+                    self._statistics.coalesced += 1
+                    listener_statistics.coalesced += 1
+                    return
+            elif self._policy == ActionQueuePolicy.BLOCK and self._consumer_ident != threading.get_ident():
+                # the consumer itself (e.g. cache_states in the main loop) must never wait
+                self._wait_locked()
+
+            if self._size >= self._max_size:
+                self._drop_oldest_locked()
+
+        priority = getattr(action, 'priority', None) or ActionPriority.NORMAL
+        listener_key = self._get_listener_key(action)
+        self._levels[priority.value].append(listener_key, QueueEntry(action, time.monotonic()),
+                                            self._get_weight(listener_key))
+        self._size += 1
+        self._change_backlog_locked(action, 1)
+        listener_statistics.backlog_max = max(listener_statistics.backlog_max, listener_statistics.backlog)
+        if key:
+            self._queued_states[key] = action
+
+    def _wait_locked(self) -> None:
+        self._statistics.blocked += 1
+        time_start = time.perf_counter()
+        self._condition.wait_for(lambda: self._size < self._max_size, self._block_timeout)
+        self._statistics.block_time += time.perf_counter() - time_start
+
+    def _drop_oldest_locked(self) -> None:
+        """drops the oldest state change of the lowest priority (of the listener with the biggest backlog)"""
+        if self._fairness == ActionQueueFairness.FIFO:
+            self._drop_listener_oldest_locked(None)
+            return
+        # usually the first listener of the biggest backlog has a state change queued
+        for backlog in range(self._backlog_max, 0, -1):
+            for listener_id in self._backlog_buckets.get(backlog, ()):
+                if self._drop_listener_oldest_locked(listener_id):
+                    return
+        # only commands, cron and startup actions queued => exceed the limit
+
+    def _drop_listener_oldest_locked(self, listener_key) -> bool:
+        for level in reversed(self._levels):
+            queue = level.queues.get(listener_key)
+            if queue is None:
+                continue
+            for index, entry in enumerate(queue.entries):
+                queued = entry.action
+                key = self._get_key(queued)
+                if key:
+                    level.remove_entry(queue, index)
+                    self._size -= 1
+                    self._change_backlog_locked(queued, -1).dropped += 1
+                    if self._queued_states.get(key) is queued:
+                        del self._queued_states[key]
+                    self._statistics.dropped += 1
+                    return True
+        return False
@@ -1,4 +1,5 @@
 from enum import Enum
+import sys
 import typing
 
 
@@ -13,6 +14,7 @@ class ChannelType(Enum):
     ITEM = 3
     GROUP = 4
     THING = 5
+    AGGREGATE = 6  # see GroupAggregates
 
     def __str__(self):
         return self.__repr__()
@@ -35,37 +37,66 @@ class ChannelType(Enum):
 
 
 class Channel:
-    def __init__(self) -> None:
-        self.type = None
-        self.name = None
+    """
+    Immutable flyweight: "create" delivers one canonical (interned) instance per (type, name), so channels are shared
+    by events, states and listeners instead of being allocated for every event. The hash is calculated once.
+    """
+
+    __slots__ = ('_type', '_name', '_hash')
+
+    _registry = {}  # (type, name) => Channel
+
+    def __init__(self, channel_type: typing.Optional[ChannelType] = None, name: typing.Optional[str] = None) -> None:
+        """use "create" to get the shared instance"""
+        self._type = channel_type
+        self._name = name
+        # STARTUP channels are equal regardless of the name
+        self._hash = hash((channel_type, None if channel_type == ChannelType.STARTUP else name))
+
+    @property
+    def type(self) -> typing.Optional[ChannelType]:
+        return self._type
+
+    @property
+    def name(self) -> typing.Optional[str]:
+        return self._name
+
+    def __copy__(self) -> 'Channel':
+        return self
+
+    # noinspection PyUnusedLocal
+    def __deepcopy__(self, memo) -> 'Channel':
+        return self
 
     def __eq__(self, other) -> bool:
+        if self is other:
+            return True
         if not other:
             return False
         if type(self) != type(other):
             return False
-        if self.type != other.type:
+        if self._type != other._type:
             return False
 
-        if self.type == ChannelType.STARTUP and self.type == other.type:
+        if self._type == ChannelType.STARTUP:
             return True  # no name check neccessary
 
-        if self.name != other.name:
+        if self._name != other._name:
             return False
         return True
 
     def __hash__(self):
-        return hash((self.type, self.name))
+        return self._hash
 
     def __repr__(self) -> str:
-        return '{}({},{})'.format(self.__class__.__name__, self.type, self.name)
+        return '{}({},{})'.format(self.__class__.__name__, self._type, self._name)
 
     def is_valid(self) -> bool:
-        if not self.type:
+        if not self._type:
             return False
-        if self.type == ChannelType.STARTUP:
+        if self._type == ChannelType.STARTUP:
             return True
-        if not self.name:
+        if not self._name:
             return False
         return True
 
@@ -73,22 +104,27 @@ class Channel:
     def create(channel_type: ChannelType, name: str) -> 'Channel':
         if not isinstance(name, str):
             raise TypeError()
-        channel = Channel()
-        channel.type = channel_type
-        channel.name = name
+        key = (channel_type, name)
+        channel = Channel._registry.get(key)
+        if channel is None:
+            # setdefault is atomic => concurrent threads get the same instance
+            channel = Channel._registry.setdefault(key, Channel(channel_type, sys.intern(name)))
         return channel
 
     @staticmethod
     def create_item(name: str) -> 'Channel':
-        if not isinstance(name, str):
-            raise TypeError()
-        channel = Channel()
-        channel.type = ChannelType.ITEM
-        channel.name = name
-        return channel
+        return Channel.create(ChannelType.ITEM, name)
+
+    _startup = None  # type: Channel
 
     @staticmethod
     def create_startup() -> 'Channel':
-        channel = Channel()
-        channel.type = ChannelType.STARTUP
-        return channel
+        return Channel._startup
+
+    @staticmethod
+    def get_registry_size() -> int:
+        """:return: count of interned channels"""
+        return len(Channel._registry)
+
+
+Channel._startup = Channel(ChannelType.STARTUP)
@@ -0,0 +1,185 @@
+import fnmatch
+import re
+from enum import Enum
+from prend.channel import Channel, ChannelType
+from typing import Optional
+
+
+class ChannelPatternException(Exception):
+    pass
+
+
+class ChannelPatternType(Enum):
+    PREFIX = 1
+    GLOB = 2
+    REGEX = 3
+    CHANNEL_TYPE = 4
+    GROUP = 5
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+class ChannelPattern:
+    """
+    Subscription of all channels (also the ones created later), whose name matches a prefix, a glob or a regular
+    expression, of a channel type or of the members of a group (incl. nested groups).
+    """
+
+    __slots__ = ('_pattern_type', '_channel_type', '_text', '_regex', '_prefix')
+
+    GLOB_SPECIAL_CHARS = '*?['
+
+    def __init__(self, pattern_type: ChannelPatternType, channel_type: Optional[ChannelType], text: Optional[str]):
+        """use the "create_*" functions"""
+        self._pattern_type = pattern_type
+        self._channel_type = channel_type
+        self._text = text
+        self._regex = None
+        self._prefix = ''  # literal prefix of the name, used by the index
+
+        if pattern_type == ChannelPatternType.PREFIX:
+            self._prefix = text
+        elif pattern_type == ChannelPatternType.GLOB:
+            self._regex = re.compile(fnmatch.translate(text))
+            positions = [text.find(c) for c in self.GLOB_SPECIAL_CHARS if c in text]
+            self._prefix = text[:min(positions)] if positions else text
+        elif pattern_type == ChannelPatternType.REGEX:
+            try:
+                self._regex = re.compile(text)
+            except re.error as ex:
+                raise ChannelPatternException('invalid regular expression ({}): {}'.format(text, ex))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ChannelPattern):
+            return False
+        return self._pattern_type == other._pattern_type and self._channel_type == other._channel_type and \
+            self._text == other._text
+
+    def __hash__(self):
+        return hash((self._pattern_type, self._channel_type, self._text))
+
+    def __repr__(self) -> str:
+        return '{}({},{},{})'.format(self.__class__.__name__, self._pattern_type, self._channel_type, self._text)
+
+    @property
+    def pattern_type(self) -> ChannelPatternType:
+        return self._pattern_type
+
+    @property
+    def channel_type(self) -> Optional[ChannelType]:
+        return self._channel_type
+
+    @property
+    def text(self) -> Optional[str]:
+        return self._text
+
+    @property
+    def prefix(self) -> str:
+        return self._prefix
+
+    def matches(self, channel: Channel, groups_of_channel=()) -> bool:
+        """
+        :param groups_of_channel: names of the groups (incl. nested), which the channel is member of
+        """
+        if self._pattern_type == ChannelPatternType.GROUP:
+            return self._text in groups_of_channel
+        if channel.type != self._channel_type:
+            return False
+        if self._pattern_type == ChannelPatternType.CHANNEL_TYPE:
+            return True
+        name = channel.name or ''
+        if self._pattern_type == ChannelPatternType.PREFIX:
+            return name.startswith(self._prefix)
+        if self._pattern_type == ChannelPatternType.GLOB:
+            return self._regex.match(name) is not None
+        return self._regex.search(name) is not None  # REGEX
+
+    @staticmethod
+    def _check_text(text: str) -> str:
+        if not text or not isinstance(text, str):
+            raise ChannelPatternException('invalid pattern ({})!'.format(text))
+        return text
+
+    @staticmethod
+    def create_prefix(prefix: str, channel_type: ChannelType = ChannelType.ITEM) -> 'ChannelPattern':
+        return ChannelPattern(ChannelPatternType.PREFIX, channel_type, ChannelPattern._check_text(prefix))
+
+    @staticmethod
+    def create_glob(glob: str, channel_type: ChannelType = ChannelType.ITEM) -> 'ChannelPattern':
+        """case sensitive shell pattern: "val*Temperature", "valLight?" ... """
+        return ChannelPattern(ChannelPatternType.GLOB, channel_type, ChannelPattern._check_text(glob))
+
+    @staticmethod
+    def create_regex(regex: str, channel_type: ChannelType = ChannelType.ITEM) -> 'ChannelPattern':
+        """the expression has to match somewhere in the name (re.search)"""
+        return ChannelPattern(ChannelPatternType.REGEX, channel_type, ChannelPattern._check_text(regex))
+
+    @staticmethod
+    def create_channel_type(channel_type: ChannelType) -> 'ChannelPattern':
+        if channel_type not in (ChannelType.ITEM, ChannelType.GROUP, ChannelType.THING, ChannelType.AGGREGATE):
+            raise ChannelPatternException('invalid channel type ({})!'.format(channel_type))
+        return ChannelPattern(ChannelPatternType.CHANNEL_TYPE, channel_type, None)
+
+    @staticmethod
+    def create_group(group_name: str) -> 'ChannelPattern':
+        """all members of the group (and its sub groups)"""
+        return ChannelPattern(ChannelPatternType.GROUP, None, ChannelPattern._check_text(group_name))
+
+
+class ChannelPatternIndex:
+    """
+    Finds the subscriptions of a channel without testing all patterns: name patterns are stored in a prefix trie (per
+    channel type; globs by their literal prefix, regular expressions at the root), so only patterns, whose prefix
+    matches, get tested. Group patterns are looked up by the group names. Not synchronized.
+    """
+
+    _ENTRIES = ''  # key of the entry list in a trie node (chars are never empty)
+
+    def __init__(self):
+        self._tries = {}  # channel type => trie node (dict: char => node, _ENTRIES => list of (pattern, value))
+        self._by_group = {}  # group name => list of (pattern, value)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, pattern: ChannelPattern, value) -> None:
+        if pattern.pattern_type == ChannelPatternType.GROUP:
+            self._by_group.setdefault(pattern.text, []).append((pattern, value))
+        else:
+            node = self._tries.setdefault(pattern.channel_type, {})
+            for char in pattern.prefix:
+                node = node.setdefault(char, {})
+            node.setdefault(self._ENTRIES, []).append((pattern, value))
+        self._count += 1
+
+    def has_group_patterns(self) -> bool:
+        return bool(self._by_group)
+
+    def find(self, channel: Channel, groups_of_channel=()) -> list:
+        """
+        :param groups_of_channel: names of the groups (incl. nested), which the channel is member of
+        :return: values of the matching patterns (in order of registration per pattern)
+        """
+        result = []
+        node = self._tries.get(channel.type)
+        if node is not None:
+            name = channel.name or ''
+            index = 0
+            while node is not None:
+                for pattern, value in node.get(self._ENTRIES, ()):
+                    if pattern.matches(channel):
+                        result.append(value)
+                if index >= len(name):
+                    break
+                node = node.get(name[index])
+                index += 1
+
+        for group_name in groups_of_channel:
+            for _, value in self._by_group.get(group_name, ()):
+                result.append(value)
+        return result
@@ -104,11 +104,22 @@ class Config:
         self.oh_rest_base_url = None
         self.oh_username = None
         self.oh_simulate_sending = False
+        self.oh_observer_topic_filter = False
         self.parsed = None
         self.pid_file = None
+        self.warm_start = False
+        self.action_queue_size = None
+        self.action_queue_policy = None
+        self.action_queue_block_timeout = None
+        self.action_queue_fairness = None
+        self.action_queue_promotion = None
         self.persist_dir = None
         self.work_dir = None
         self.timeout = None
+        self.rate_limits = {}
+        self.priorities = {}
+        self.history_max_mb = None
+        self.rule_workers = None
         self.rule_config = {}
 
     def __repr__(self) -> str:
@@ -127,6 +138,17 @@ class Config:
             lines.append('username      = {}'.format(self.oh_username))
         if self.oh_simulate_sending or print_all:
             lines.append('simulate send = {}'.format(self.oh_simulate_sending))
+        if self.oh_observer_topic_filter or print_all:
+            lines.append('topic filter  = {}'.format(self.oh_observer_topic_filter))
+        if self.warm_start or print_all:
+            lines.append('warm start    = {}'.format(self.warm_start))
+        if self.action_queue_size or self.action_queue_policy or print_all:
+            lines.append('action queue  = {} ({}, {})'.format(
+                self.action_queue_size, self.action_queue_policy, self.action_queue_fairness))
+        if self.history_max_mb is not None or print_all:
+            lines.append('history max   = {} MB'.format(self.history_max_mb))
+        if self.rule_workers or print_all:
+            lines.append('rule workers  = {}'.format(self.rule_workers))
         if self.pid_file or print_all:
             lines.append('pid file      = {}'.format(self.pid_file))
         if self.work_dir or print_all:
@@ -239,6 +261,33 @@ class ConfigLoader:
         data = Convert.convert_to_bool(text, default_value)
         return data
 
+    @classmethod
+    def _read_priorities(cls, parser) -> dict:
+        """
+        section "priority": <channel name> = high | normal | low (raw texts, parsed by the dispatcher)
+        """
+        priorities = {}
+        section_priority = 'priority'
+        if parser.has_section(section_priority):
+            for name, text in parser.items(section_priority):
+                priorities[name] = text
+        return priorities
+
+    @classmethod
+    def _read_rate_limits(cls, parser) -> dict:
+        """
+        section "rate_limit": <channel name> = <min. interval in seconds>
+        """
+        rate_limits = {}
+        section_rate_limit = 'rate_limit'
+        if parser.has_section(section_rate_limit):
+            for name, text in parser.items(section_rate_limit):
+                seconds = Convert.convert_to_float(text)
+                if seconds is None or seconds < 0:
+                    raise ValueError('error: invalid rate limit ({} = {})!'.format(name, text))
+                rate_limits[name] = seconds
+        return rate_limits
+
     @staticmethod
     def add_to_rule_config(ruleconf, section_name, value_name, value):
         section = ruleconf.get(section_name)
@@ -274,12 +323,32 @@ class ConfigLoader:
             config.oh_password = cls._read_from_config_parser(file_reader, section_openhab, 'password')
             config.oh_simulate_sending = \
                 cls._read_bool_config_parser(file_reader, section_openhab, 'simulate_sending', False)
+            config.oh_observer_topic_filter = \
+                cls._read_bool_config_parser(file_reader, section_openhab, 'observer_topic_filter', False)
 
             section_system = 'system'
             config.locale = cls._read_from_config_parser(file_reader, section_system, 'locale')
             config.pid_file = cls._read_from_config_parser(file_reader, section_system, 'pid_file')
             config.work_dir = cls._read_from_config_parser(file_reader, section_system, 'work_dir')
             config.persist_dir = cls._read_from_config_parser(file_reader, section_system, 'persist_dir')
+            config.warm_start = cls._read_bool_config_parser(file_reader, section_system, 'warm_start', False)
+            config.action_queue_size = \
+                Convert.convert_to_int(cls._read_from_config_parser(file_reader, section_system, 'action_queue_size'))
+            config.action_queue_policy = \
+                cls._read_from_config_parser(file_reader, section_system, 'action_queue_policy')
+            config.action_queue_block_timeout = Convert.convert_to_float(
+                cls._read_from_config_parser(file_reader, section_system, 'action_queue_block_timeout'))
+            config.action_queue_fairness = \
+                cls._read_from_config_parser(file_reader, section_system, 'action_queue_fairness')
+            config.action_queue_promotion = Convert.convert_to_float(
+                cls._read_from_config_parser(file_reader, section_system, 'action_queue_promotion'))
+
+            config.history_max_mb = Convert.convert_to_float(
+                cls._read_from_config_parser(file_reader, section_system, 'history_max_mb'))
+            config.rule_workers = \
+                Convert.convert_to_int(cls._read_from_config_parser(file_reader, section_system, 'rule_workers'))
+            config.rate_limits = cls._read_rate_limits(file_reader)
+            config.priorities = cls._read_priorities(file_reader)
 
             app_name = cls.get_app_name()
 
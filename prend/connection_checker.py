@@ -31,7 +31,8 @@ class ConnectionChecker:
     def check_connection_state(self):
         """tasks
         - slow down reconnects if connection errors
-        - if observer gets disconnected => reconnect gateway too
+        - if observer gets disconnected => reconnect gateway too (unless the observer can resume the event stream)
+        - reload gateway cache if requested (events got lost)
         - gateway: eload cache after some time
         """
         if not self._observer or not self._oh_gateway:
@@ -55,8 +56,9 @@ class ConnectionChecker:
             if not self._reconnect_observer_after:
                 self._reconnect_observer = False  # not yet
                 self._reconnect_observer_after = time_now + datetime.timedelta(seconds=self._time_reconnection)
-                # do also reset gateway connection
-                paralyse_gateway_connection = True
+                # do also reset gateway connection, if the missed events cannot be replayed
+                if not self._observer.can_resume():
+                    paralyse_gateway_connection = True
             else:
                 if self._reconnect_observer_after < time_now:
                     self._reconnect_observer = True
@@ -69,7 +71,9 @@ class ConnectionChecker:
             self._reconnect_oh_gateway_after = None
             last_cache_timegateway = self._oh_gateway.get_last_cache_time()
             last_cache_time = last_cache_timegateway or (time_now - datetime.timedelta(days=1))
-            if last_cache_time < (time_now - datetime.timedelta(seconds=self._time_reload_gateway_cache)):
+            if self._oh_gateway.is_reload_requested():
+                self._reconnect_oh_gateway = True
+            elif last_cache_time < (time_now - datetime.timedelta(seconds=self._time_reload_gateway_cache)):
                 self._reconnect_oh_gateway = True
             else:
                 self._reconnect_oh_gateway = False
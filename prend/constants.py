@@ -13,3 +13,5 @@ class Constants:
     # OhGateway
     WAIT_AFTER_CONNECTION_ERROR_SEC = 20
     WAIT_FORCE_FULL_RELOAD_SEC = 15 * 60
+    WAIT_SAVE_STATE_CACHE_SEC = 5 * 60
+    HISTORY_MAX_MEMORY_MB = 16
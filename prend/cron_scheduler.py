@@ -0,0 +1,305 @@
+import bisect
+import datetime
+import heapq
+import itertools
+import logging
+import random
+import schedule
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional, Union
+
+
+_logger = logging.getLogger(__name__)
+
+
+class CronException(Exception):
+    pass
+
+
+class CronTrigger(ABC):
+    """calculates the fire times of a cron job (local time)"""
+
+    @abstractmethod
+    def next_fire(self, after: datetime.datetime) -> Optional[datetime.datetime]:
+        """:return: first fire time later than "after" or None (never again)"""
+        pass
+
+    @staticmethod
+    def create(trigger: Union['CronTrigger', schedule.Job, str]) -> 'CronTrigger':
+        """
+        :param trigger: CronTrigger, a cron expression ("*/5 * * * *") or a schedule.Job (schedule.every().minute)
+        """
+        if isinstance(trigger, CronTrigger):
+            return trigger
+        if isinstance(trigger, schedule.Job):
+            return ScheduleJobTrigger(trigger)
+        if isinstance(trigger, str):
+            return CronExpressionTrigger(trigger)
+        raise CronException('invalid cron trigger ({})!'.format(trigger))
+
+
+class IntervalTrigger(CronTrigger):
+    """fires every "seconds" (on a fixed grid, so there is no drift)"""
+
+    def __init__(self, seconds: float, anchor: Optional[datetime.datetime] = None):
+        if not seconds or seconds <= 0:
+            raise CronException('invalid interval ({})!'.format(seconds))
+        self._interval = datetime.timedelta(seconds=seconds)
+        self._anchor = anchor or datetime.datetime.now()
+
+    def __repr__(self) -> str:
+        return '{}({}s)'.format(self.__class__.__name__, self._interval.total_seconds())
+
+    def next_fire(self, after: datetime.datetime) -> Optional[datetime.datetime]:
+        if after < self._anchor:
+            return self._anchor
+        count = (after - self._anchor) // self._interval + 1
+        return self._anchor + count * self._interval
+
+
+class DailyTrigger(CronTrigger):
+    """fires every day at "HH:MM" or "HH:MM:SS\""""
+
+    def __init__(self, time_text: str):
+        try:
+            parts = [int(p) for p in time_text.strip().split(':')]
+            if len(parts) not in (2, 3):
+                raise ValueError()
+            self._time = datetime.time(*parts)
+        except (AttributeError, TypeError, ValueError):
+            raise CronException('invalid time of day ({})!'.format(time_text))
+
+    def __repr__(self) -> str:
+        return '{}({})'.format(self.__class__.__name__, self._time)
+
+    def next_fire(self, after: datetime.datetime) -> Optional[datetime.datetime]:
+        result = datetime.datetime.combine(after.date(), self._time)
+        if result <= after:
+            result += datetime.timedelta(days=1)
+        return result
+
+
+class CronExpressionTrigger(CronTrigger):
+    """
+    Standard cron expression "minute hour day-of-month month day-of-week" with "*", lists ("1,5"), ranges ("1-5")
+    and steps ("*/15", "0-30/10"). Day of week: 0 (or 7) == Sunday. If both day fields are restricted, a day matches
+    if one of them matches (like cron).
+    """
+
+    # (min, max) of the fields
+    FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    MAX_SEARCH_DAYS = 4 * 366 + 1  # covers the 29th of February
+
+    def __init__(self, expression: str):
+        self._expression = expression
+        fields = expression.split() if isinstance(expression, str) else []
+        if len(fields) != 5:
+            raise CronException('invalid cron expression ({}), 5 fields expected!'.format(expression))
+
+        values = [self._parse_field(field, value_range, expression)
+                  for field, value_range in zip(fields, self.FIELD_RANGES)]
+        self._minutes, self._hours, days, months, weekdays = values
+        self._days = set(days)
+        self._months = set(months)
+        self._weekdays = {(d % 7) for d in weekdays}  # 7 => 0 (Sunday)
+        self._days_restricted = not fields[2].startswith(('*', '?'))
+        self._weekdays_restricted = not fields[4].startswith(('*', '?'))
+
+    def __repr__(self) -> str:
+        return '{}({})'.format(self.__class__.__name__, self._expression)
+
+    @staticmethod
+    def _parse_field(field: str, value_range: tuple, expression: str) -> list:
+        range_min, range_max = value_range
+        values = set()
+        try:
+            for part in field.split(','):
+                step = 1
+                if '/' in part:
+                    part, step_text = part.split('/', 1)
+                    step = int(step_text)
+                if part in ('*', '?'):
+                    first, last = range_min, range_max
+                elif '-' in part:
+                    first, last = (int(p) for p in part.split('-', 1))
+                else:
+                    first = int(part)
+                    last = range_max if step > 1 else first
+                if step < 1 or first < range_min or last > range_max or first > last:
+                    raise ValueError()
+                values.update(range(first, last + 1, step))
+        except ValueError:
+            raise CronException('invalid cron expression ({}), field "{}"!'.format(expression, field))
+        return sorted(values)
+
+    def _match_day(self, day: datetime.datetime) -> bool:
+        match_day = day.day in self._days
+        match_weekday = (day.weekday() + 1) % 7 in self._weekdays
+        if self._days_restricted and self._weekdays_restricted:
+            return match_day or match_weekday
+        return match_day and match_weekday
+
+    def next_fire(self, after: datetime.datetime) -> Optional[datetime.datetime]:
+        current = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = current + datetime.timedelta(days=self.MAX_SEARCH_DAYS)
+
+        while current <= limit:
+            if current.month not in self._months:
+                current = (current.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+                continue
+            if not self._match_day(current):
+                current = current.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+                continue
+            if current.hour not in self._hours:
+                index = bisect.bisect_left(self._hours, current.hour)
+                if index >= len(self._hours):
+                    current = current.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+                else:
+                    current = current.replace(hour=self._hours[index], minute=0)
+                continue
+            index = bisect.bisect_left(self._minutes, current.minute)
+            if index >= len(self._minutes):
+                current = current.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+            return current.replace(minute=self._minutes[index])
+
+        return None  # e.g. 30th of February
+
+
+class ScheduleJobTrigger(CronTrigger):
+    """
+    adapter for jobs of the "schedule" package (schedule.every(10).minutes, schedule.every().day.at('10:30'),
+    schedule.every().monday.at('08:00')); the fire times are calculated from the job definition (unit, interval,
+    at, start day), the job itself is not scheduled by "schedule". Time zones (at(..., tz)) are not supported.
+    """
+
+    UNITS = ('seconds', 'minutes', 'hours', 'days', 'weeks')
+    WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+    def __init__(self, job: schedule.Job):
+        if job.unit not in self.UNITS:
+            raise CronException('invalid schedule job ({}), unit "{}"!'.format(job, job.unit))
+        if job.start_day is not None and (job.unit != 'weeks' or job.start_day not in self.WEEKDAYS):
+            raise CronException('invalid schedule job ({}), start day "{}"!'.format(job, job.start_day))
+        if getattr(job, 'at_time_zone', None) is not None:
+            raise CronException('schedule job with time zone not supported ({})!'.format(job))
+        if job.latest is not None and job.latest < job.interval:
+            raise CronException('invalid schedule job ({}), latest < interval!'.format(job))
+        self._job = job
+
+    def __repr__(self) -> str:
+        return '{}({})'.format(self.__class__.__name__, self._job)
+
+    def next_fire(self, after: datetime.datetime) -> Optional[datetime.datetime]:
+        # same calculation as schedule.Job, but based on "after" instead of "now"
+        job = self._job
+        interval = job.interval if job.latest is None else random.randint(job.interval, job.latest)
+        period = datetime.timedelta(**{job.unit: interval})
+
+        result = after
+        if job.start_day is not None:
+            days_ahead = self.WEEKDAYS.index(job.start_day) - after.weekday()
+            result += datetime.timedelta(days=days_ahead if days_ahead >= 0 else days_ahead + 7)
+        if job.at_time is not None:
+            if job.unit in ('days', 'weeks'):
+                result = datetime.datetime.combine(result.date(), job.at_time)
+            elif job.unit == 'hours':
+                result = result.replace(minute=job.at_time.minute, second=job.at_time.second, microsecond=0)
+            elif job.unit == 'minutes':
+                result = result.replace(second=job.at_time.second, microsecond=0)
+            if interval != 1:
+                result += period
+        else:
+            result += period
+
+        while result <= after:
+            result += period
+        return result
+
+
+class CronJob:
+    """registered cron job; "next_run" == None => cancelled or never fires again"""
+
+    __slots__ = ('key', 'trigger', 'listener', 'next_run')
+
+    def __init__(self, key: str, trigger: CronTrigger, listener):
+        self.key = key
+        self.trigger = trigger
+        self.listener = listener
+        self.next_run = None  # type: Optional[datetime.datetime]
+
+    def __repr__(self) -> str:
+        return '{}({}, {}, next={})'.format(self.__class__.__name__, self.key, self.trigger, self.next_run)
+
+
+class CronScheduler:
+    """
+    Cron jobs in a min-heap ordered by the next fire time: checking for due jobs costs O(1), firing a job O(log n).
+    The main loop waits till "get_idle_seconds", so idle jobs cost nothing. Synchronized.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []  # tuples (next_run, sequence, CronJob)
+        self._sequence = itertools.count()  # keeps the order of jobs with the same fire time
+        self._count = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count
+
+    def add(self, key: str, trigger: Union[CronTrigger, schedule.Job, str], listener,
+            now: Optional[datetime.datetime] = None) -> CronJob:
+        job = CronJob(key, CronTrigger.create(trigger), listener)
+        job.next_run = job.trigger.next_fire(now or datetime.datetime.now())
+        with self._lock:
+            if job.next_run is not None:
+                heapq.heappush(self._heap, (job.next_run, next(self._sequence), job))
+                self._count += 1
+        if job.next_run is None:
+            _logger.warning('cron job "%s" (%s) never fires!', key, job.trigger)
+        return job
+
+    def remove(self, job: CronJob) -> None:
+        """the heap entry gets dropped when it is due"""
+        with self._lock:
+            if job.next_run is not None:
+                job.next_run = None
+                self._count -= 1
+
+    def get_next_run(self) -> Optional[datetime.datetime]:
+        with self._lock:
+            self._drop_cancelled()
+            return self._heap[0][0] if self._heap else None
+
+    def get_idle_seconds(self, now: Optional[datetime.datetime] = None) -> Optional[float]:
+        """:return: seconds till the next job is due (may be negative) or None (no jobs)"""
+        next_run = self.get_next_run()
+        if next_run is None:
+            return None
+        return (next_run - (now or datetime.datetime.now())).total_seconds()
+
+    def pop_due(self, now: Optional[datetime.datetime] = None) -> list:
+        """
+        :return: due jobs (CronJob); they get rescheduled from "now" (missed fire times are skipped)
+        """
+        now = now or datetime.datetime.now()
+        due_jobs = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                next_run, _, job = heapq.heappop(self._heap)
+                if job.next_run != next_run:
+                    continue  # cancelled
+                due_jobs.append(job)
+                job.next_run = job.trigger.next_fire(now)
+                if job.next_run is None:
+                    self._count -= 1
+                else:
+                    heapq.heappush(self._heap, (job.next_run, next(self._sequence), job))
+        return due_jobs
+
+    def _drop_cancelled(self) -> None:
+        while self._heap and self._heap[0][2].next_run != self._heap[0][0]:
+            heapq.heappop(self._heap)
@@ -1,12 +1,18 @@
-import copy
 import datetime
 import logging
 import requests
 import schedule
 import threading
-from queue import Queue, Empty
+import time
 from prend.channel import Channel, OhIllegalChannelException
-from prend.action import Action, OhIllegalActionException
+from prend.channel_pattern import ChannelPattern, ChannelPatternIndex
+from prend.action import Action, ActionPriority, BoundAction, OhIllegalActionException
+from prend.action_queue import ActionQueue
+from prend.cron_scheduler import CronScheduler, CronTrigger
+from prend.rate_limiter import RateLimiter
+from prend.rule_executor import RuleExecutor
+from prend.tools.wake_up import WakeUp
+from typing import Optional, Union
 
 
 _logger = logging.getLogger(__name__)
@@ -19,8 +25,12 @@ class DispatcherException(Exception):
 class ActionListener:
     def __init__(self):
         self.channel: Channel = None
+        self.pattern = None  # type: ChannelPattern
         self.listener = None
         self.type = None
+        self.min_interval = None  # type: float
+        self.priority = None  # type: ActionPriority  # None == by notification type (commands HIGH)
+        self.max_age = None  # type: float  # seconds; older actions get skipped
 
 
 class DispatcherActionSink:
@@ -28,16 +38,81 @@ class DispatcherActionSink:
         """overwrite for testing"""
         pass
 
+    def push_actions(self, root_actions: list) -> None:
+        """overwrite for testing"""
+        for root_action in root_actions:
+            self.push_action(root_action)
+
 
 class Dispatcher(DispatcherActionSink):
 
-    def __init__(self):
+    SCHEDULE_THROTTLE_MS = 800  # jobs registered directly at "schedule" get checked not more often
+
+    def __init__(self, action_queue: ActionQueue = None):
         self._lock_channel_listeners = threading.Lock()
         self._channel_listeners = {}
-        self._action_queue = Queue()  # synchronized
+        self._pattern_listeners = ChannelPatternIndex()
+        self._listener_cache = {}  # channel => tuple of ActionListener (exact + pattern subscriptions)
+        self._listener_cache_group_version = None
+        self._group_source = None
+        self._subscription_version = 0
+        self._action_queue = action_queue or ActionQueue()  # synchronized
+        self._rate_limiter = RateLimiter()
+        self._rate_limits = {}  # lower case channel name => min interval (seconds)
+        self._priorities = {}  # lower case channel name => ActionPriority
+        self._cron_scheduler = CronScheduler()
         self._last_cron_run = datetime.datetime.now() - datetime.timedelta(days=1)
+        self._wake_up = None  # type: WakeUp
+        self._rule_executor = None  # type: RuleExecutor
+
+    def set_wake_up(self, wake_up: WakeUp) -> None:
+        """gets signaled when actions are pushed (from other threads)"""
+        self._wake_up = wake_up
+
+    def set_rule_executor(self, rule_executor: Optional[RuleExecutor]) -> None:
+        """
+        :param rule_executor: runs the rules on worker threads; None == the rules run within "dispatch" (main thread)
+        """
+        self._rule_executor = rule_executor
+        if rule_executor:
+            rule_executor.set_notify_func(self._dispatch_action)
 
-    def register_oh_listener(self, channel: Channel, listeners) -> None:
+    def set_group_source(self, group_source) -> None:
+        """
+        :param group_source: provides the group membership for group pattern subscriptions (OhGateway:
+            "get_groups_of(channel)", "get_group_version()"); must not call the dispatcher while holding its locks
+        """
+        self._group_source = group_source
+
+    def set_rate_limits(self, rate_limits: dict) -> None:
+        """
+        :param rate_limits: channel name => minimal interval (seconds) between state change actions; used if no interval
+            is given at registration
+        """
+        self._rate_limits = {name.lower(): seconds for name, seconds in rate_limits.items()}
+
+    def set_priorities(self, priorities: dict) -> None:
+        """
+        :param priorities: channel name => ActionPriority or its name (config); used if no priority is given at
+            registration. Unknown names are logged and ignored.
+        """
+        self._priorities = {}
+        for name, priority in priorities.items():
+            if not isinstance(priority, ActionPriority):
+                text = priority
+                priority = ActionPriority.parse(text)
+                if priority is None:
+                    _logger.error('invalid priority (%s = %s) => ignored!', name, text)
+                    continue
+            self._priorities[name.lower()] = priority
+
+    def register_oh_listener(self, channel: Channel, listeners, min_interval: float = None,
+                             priority: ActionPriority = None, max_age: float = None) -> None:
+        """
+        :param min_interval: seconds; deliver state changes not more often (bursts get merged); commands are not limited
+        :param priority: None == from the configured channel priorities or by notification type (commands HIGH)
+        :param max_age: seconds; actions, which waited longer in the action queue, get skipped (expired)
+        """
 
         if not channel or not channel.is_valid():
             raise OhIllegalChannelException(channel)
@@ -48,6 +123,14 @@ class Dispatcher(DispatcherActionSink):
         listener.channel = channel
         listener.listener = listeners
         listener.type = type
+        listener.min_interval = min_interval
+        listener.priority = priority
+        listener.max_age = max_age
+        if channel.name:
+            if min_interval is None:
+                listener.min_interval = self._rate_limits.get(channel.name.lower())
+            if priority is None:
+                listener.priority = self._priorities.get(channel.name.lower())
 
         with self._lock_channel_listeners:
             listeners = self._channel_listeners.get(channel)
@@ -55,70 +138,214 @@ class Dispatcher(DispatcherActionSink):
                 listeners = []
                 self._channel_listeners[channel] = listeners
             listeners.append(listener)
+            self._subscription_version += 1
+            self._listener_cache.clear()
 
-    # pylint: disable=protected-access
-    def register_cron_listener(self, cron_key: str, job: schedule.Job, listener):
-        if job and listener:
-            instance = self
+    def register_pattern_listener(self, pattern: ChannelPattern, listeners, min_interval: float = None,
+                                  priority: ActionPriority = None, max_age: float = None) -> None:
+        """
+        Subscribes all channels matching the pattern, also channels created later. A listener gets an action only once,
+        even if several of its subscriptions match.
+        :param min_interval: seconds; None == from the rate limits of the matching channel
+        :param priority: None == from the priorities of the matching channel
+        """
+        if not isinstance(pattern, ChannelPattern):
+            raise DispatcherException('invalid channel pattern ({})!'.format(pattern))
+        if not listeners:
+            raise DispatcherException('invalid listener (None)!')
+
+        listener = ActionListener()
+        listener.pattern = pattern
+        listener.listener = listeners
+        listener.min_interval = min_interval
+        listener.priority = priority
+        listener.max_age = max_age
 
-            def job_closure():
-                action = Action.create_cron_action(cron_key)
-                action.listener = listener
-                instance._action_queue.put(action)  # no protected access, just a closure
+        with self._lock_channel_listeners:
+            self._pattern_listeners.add(pattern, listener)
+            self._subscription_version += 1
+            self._listener_cache.clear()
 
-            job.do(job_closure)
+    def has_pattern_listeners(self) -> bool:
+        """:return: True if there are pattern subscriptions (=> "get_oh_channels" is not complete)"""
+        with self._lock_channel_listeners:
+            return len(self._pattern_listeners) > 0
+
+    def _get_listeners_locked(self, channel: Channel):
+        if not self._pattern_listeners:
+            return self._channel_listeners.get(channel)
+
+        if self._group_source and self._pattern_listeners.has_group_patterns():
+            group_version = self._group_source.get_group_version()
+            if group_version != self._listener_cache_group_version:
+                self._listener_cache.clear()
+                self._listener_cache_group_version = group_version
+
+        listeners = self._listener_cache.get(channel)
+        if listeners is None:
+            listeners = self._match_listeners_locked(channel)
+            self._listener_cache[channel] = listeners
+        return listeners
+
+    def _match_listeners_locked(self, channel: Channel) -> tuple:
+        """:return: exact and pattern subscriptions of the channel (one per listener)"""
+        listeners = list(self._channel_listeners.get(channel, ()))
+        known = {id(listener.listener) for listener in listeners}
+
+        groups = ()
+        if self._group_source and self._pattern_listeners.has_group_patterns():
+            groups = self._group_source.get_groups_of(channel)
+        for pattern_listener in self._pattern_listeners.find(channel, groups):
+            if id(pattern_listener.listener) in known:
+                continue
+            known.add(id(pattern_listener.listener))
+            listener = ActionListener()
+            listener.channel = channel
+            listener.pattern = pattern_listener.pattern
+            listener.listener = pattern_listener.listener
+            listener.min_interval = pattern_listener.min_interval
+            listener.priority = pattern_listener.priority
+            listener.max_age = pattern_listener.max_age
+            if channel.name:
+                if listener.min_interval is None:
+                    listener.min_interval = self._rate_limits.get(channel.name.lower())
+                if listener.priority is None:
+                    listener.priority = self._priorities.get(channel.name.lower())
+            listeners.append(listener)
+        return tuple(listeners)
+
+    def get_oh_channels(self) -> list:
+        """
+        :return: all channels with at least one registered listener
+        """
+        with self._lock_channel_listeners:
+            return list(self._channel_listeners)
+
+    def get_subscription_version(self) -> int:
+        """
+        :return: counter which gets increased with every channel registration
+        """
+        with self._lock_channel_listeners:
+            return self._subscription_version
+
+    def pop_queue_statistics(self):
+        """
+        :return: ActionQueueStatistics (overflow counters) since last call
+        """
+        return self._action_queue.pop_statistics()
+
+    def pop_listener_queue_statistics(self) -> list:
+        """
+        :return: ListenerQueueStatistics (backlog, wait time, drops per rule) since last call
+        """
+        return self._action_queue.pop_listener_statistics()
+
+    def set_listener_weight(self, listener, weight: int) -> None:
+        """
+        :param weight: actions per turn of the listener, if the action queue is configured "weighted" (default 1)
+        """
+        self._action_queue.set_weight(listener, weight)
+
+    def register_cron_listener(self, cron_key: str, job: Union[CronTrigger, schedule.Job, str], listener):
+        """
+        :param job: CronTrigger, cron expression ("*/5 * * * *") or schedule.Job (schedule.every().minute, without "do")
+        """
+        if job and listener:
+            self._cron_scheduler.add(cron_key, job, listener)
+            if self._wake_up:
+                self._wake_up.signal()  # new deadline
 
     def push_action(self, root_action: Action) -> None:
-        if not root_action or not root_action.is_valid():
-            raise OhIllegalActionException(root_action)
-
-        max_queued_actions = 1000
-        count_queued_actions = self._action_queue.qsize()
-        if count_queued_actions > max_queued_actions:
-            raise DispatcherException('max queued actions exceeded ({} > {})!'
-                                      .format(count_queued_actions, max_queued_actions))
-
-        if root_action.listener is None:
-            with self._lock_channel_listeners:
-                listeners = self._channel_listeners.get(root_action.channel)
-                if listeners:
-                    for listener in listeners:
-                        action = copy.deepcopy(root_action)
-                        action.listener = listener.listener
-                        self._action_queue.put(action)
-        else:
-            listener = root_action.listener
-            root_action.listener = None
-            action = copy.deepcopy(root_action)
-            action.listener = listener
-            root_action.listener = listener
-            self._action_queue.put(action)
+        self.push_actions([root_action])
+
+    def push_actions(self, root_actions: list) -> None:
+        """
+        Distributes the actions to the listeners and enqueues all of them at once. If the queue is full, its overflow
+        policy applies (coalesce, drop oldest or block).
+        """
+        for root_action in root_actions:
+            if not root_action or not root_action.is_valid():
+                raise OhIllegalActionException(root_action)
+
+        actions = []
+        time_now = time.monotonic()
+        with self._lock_channel_listeners:
+            for root_action in root_actions:
+                priority_default = ActionPriority.get_default(root_action.notification_type)
+                if root_action.listener is None:
+                    listeners = self._get_listeners_locked(root_action.channel)
+                    if listeners:
+                        for listener in listeners:
+                            # all listeners share the (immutable) root action
+                            action = BoundAction(root_action, listener.listener, listener.priority or priority_default,
+                                                 time_now + listener.max_age if listener.max_age else None)
+                            if self._rate_limiter.offer(action, listener.min_interval):
+                                actions.append(action)
+                else:
+                    actions.append(BoundAction(root_action, root_action.listener, priority_default))
+
+        if actions:
+            self._action_queue.put_all(actions)
+        if root_actions and self._wake_up:
+            self._wake_up.signal()  # queued or held back by the rate limiter (=> new deadline)
 
     def dispatch(self) -> bool:
-        return self.dispatch_skip_cron(800)
+        return self.dispatch_skip_cron(self.SCHEDULE_THROTTLE_MS)
+
+    def get_cron_idle_seconds(self) -> Optional[float]:
+        """:return: seconds till the next cron job is due (may be negative) or None (no jobs)"""
+        idle_seconds = self._cron_scheduler.get_idle_seconds()
+        if schedule.jobs:  # jobs registered directly at "schedule" (schedule.every().minute.do(func))
+            since_last_run = (datetime.datetime.now() - self._last_cron_run).total_seconds()
+            schedule_seconds = max(schedule.idle_seconds(), self.SCHEDULE_THROTTLE_MS / 1000 - since_last_run)
+            idle_seconds = schedule_seconds if idle_seconds is None else min(idle_seconds, schedule_seconds)
+        return idle_seconds
+
+    def get_next_rate_limit_deadline(self):
+        """
+        :return: time (time.monotonic) when the next merged state change gets delivered or None
+        """
+        return self._rate_limiter.get_next_deadline()
+
+    def pop_rate_limit_merged_count(self) -> int:
+        return self._rate_limiter.pop_merged_count()
 
     def dispatch_skip_cron(self, skip_cron_ms) -> bool:
         something_processed = False
-        start_loop = True
-
-        action = None
-        while action or start_loop:
-            start_loop = False
-            try:
-                action = self._action_queue.get_nowait()
-            except Empty:
-                action = None
 
-            if self._dispatch_action(action):
+        flushed_actions = self._rate_limiter.pop_due()
+        if flushed_actions:
+            self._action_queue.put_all(flushed_actions)
+
+        cron_jobs = self._cron_scheduler.pop_due()  # O(1) if nothing is due
+        if cron_jobs:
+            self._action_queue.put_all([self._create_cron_action(job.key, job.listener) for job in cron_jobs])
+
+        rule_executor = self._rule_executor
+        while True:
+            if rule_executor and not rule_executor.has_capacity():
+                break  # the actions stay in the action queue (overflow policy), wake-up when the rules caught up
+            action = self._action_queue.get_nowait()
+            if action is None:
+                break
+            if rule_executor and action.listener:
+                rule_executor.submit(action)
+                something_processed = True
+            elif self._dispatch_action(action):
                 something_processed = True
 
-        diff = datetime.datetime.now() - self._last_cron_run
-        if diff.microseconds >= skip_cron_ms:
-            self._last_cron_run = datetime.datetime.now()
-            schedule.run_pending()
+        if schedule.jobs:
+            diff = datetime.datetime.now() - self._last_cron_run
+            if diff.total_seconds() * 1000 >= skip_cron_ms:
+                self._last_cron_run = datetime.datetime.now()
+                schedule.run_pending()
 
         return something_processed
 
+    @staticmethod
+    def _create_cron_action(cron_key: str, listener) -> BoundAction:
+        return BoundAction(Action.create_cron_action(cron_key), listener)
+
     @staticmethod
     def _dispatch_action(action: Action) -> bool:
         """
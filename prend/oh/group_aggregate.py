@@ -0,0 +1,351 @@
+import math
+from enum import Enum
+from prend.action import Action
+from prend.channel import Channel, ChannelType
+from prend.oh.oh_event import OhNotificationType
+from prend.state import State, StateType
+from prend.values import OnOffValue, OpeningValue
+from typing import Optional
+
+
+class GroupAggregateException(Exception):
+    pass
+
+
+class AggregateFunction(Enum):
+    COUNT = 'count'  # members with a defined state (not UNDEF)
+    COUNT_ON = 'count_on'  # members ON or OPEN
+    SUM = 'sum'
+    MIN = 'min'
+    MAX = 'max'
+    ANY_ON = 'any_on'
+    ALL_ON = 'all_on'  # all defined members ON or OPEN
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __repr__(self) -> str:
+        return self.name
+
+    @staticmethod
+    def parse(text) -> Optional['AggregateFunction']:
+        if text:
+            text = text.strip().lower()
+            for en in AggregateFunction:
+                if en.value == text:
+                    return en
+        return None
+
+
+class GroupAggregate:
+    """
+    Accumulator over the member states of one group. Adding, removing or changing a member costs O(1); only if the
+    last member with the minimum (maximum) value changes, the extremum gets searched again. The sum is kept exact (a
+    float running sum would drift: 0.1 + 0.2 - 0.1 - 0.2 != 0).
+    """
+
+    def __init__(self):
+        self._values = {}  # member channel => value
+        self.count = 0
+        self.count_on = 0
+        self.count_numbers = 0
+        self.sum = 0
+        self._sum_partials = []  # non-overlapping partial sums (like math.fsum)
+        self._min = None
+        self._min_count = 0
+        self._max = None
+        self._max_count = 0
+
+    def set_member(self, channel: Channel, value) -> None:
+        if channel in self._values:
+            self.remove_member(channel)
+        self._values[channel] = value
+
+        if value is None:
+            return
+        self.count += 1
+        if self.is_on_value(value):
+            self.count_on += 1
+        if self.is_number_value(value):
+            self.count_numbers += 1
+            self._add_to_sum(value)
+            if self._min is None or value < self._min:
+                self._min, self._min_count = value, 1
+            elif value == self._min:
+                self._min_count += 1
+            if self._max is None or value > self._max:
+                self._max, self._max_count = value, 1
+            elif value == self._max:
+                self._max_count += 1
+
+    def remove_member(self, channel: Channel) -> None:
+        if channel not in self._values:
+            return
+        value = self._values.pop(channel)
+
+        if value is None:
+            return
+        self.count -= 1
+        if self.is_on_value(value):
+            self.count_on -= 1
+        if self.is_number_value(value):
+            self.count_numbers -= 1
+            self._add_to_sum(-value)
+            if value == self._min:
+                self._min_count -= 1
+                if self._min_count <= 0:
+                    self._min, self._min_count = self._search_extremum(min)
+            if value == self._max:
+                self._max_count -= 1
+                if self._max_count <= 0:
+                    self._max, self._max_count = self._search_extremum(max)
+
+    def _add_to_sum(self, value) -> None:
+        """adds without rounding errors: ints as int, floats via Shewchuk's partial sums (as math.fsum)"""
+        partials = self._sum_partials
+        if self.count_numbers == 0:
+            partials.clear()
+            self.sum = 0
+            return
+        if isinstance(value, int) and not partials:
+            self.sum += value
+            return
+        if not partials:
+            partials.append(float(self.sum))  # ints so far
+        value = float(value)
+        i = 0
+        for partial in partials:
+            if abs(value) < abs(partial):
+                value, partial = partial, value
+            high = value + partial
+            low = partial - (high - value)
+            if low:
+                partials[i] = low
+                i += 1
+            value = high
+        partials[i:] = [value]
+        self.sum = math.fsum(partials)
+
+    def _search_extremum(self, func) -> tuple:
+        numbers = [v for v in self._values.values() if self.is_number_value(v)]
+        if not numbers:
+            return None, 0
+        extremum = func(numbers)
+        return extremum, numbers.count(extremum)
+
+    def get_value(self, function: AggregateFunction):
+        if function == AggregateFunction.COUNT:
+            return self.count
+        if function == AggregateFunction.COUNT_ON:
+            return self.count_on
+        if function == AggregateFunction.SUM:
+            return self.sum if self.count_numbers > 0 else None
+        if function == AggregateFunction.MIN:
+            return self._min
+        if function == AggregateFunction.MAX:
+            return self._max
+        if function == AggregateFunction.ANY_ON:
+            return OnOffValue.ON if self.count_on > 0 else OnOffValue.OFF
+        if function == AggregateFunction.ALL_ON:
+            return OnOffValue.ON if 0 < self.count == self.count_on else OnOffValue.OFF
+        raise GroupAggregateException('unknown aggregate function ({})!'.format(function))
+
+    def get_state(self, function: AggregateFunction) -> State:
+        value = self.get_value(function)
+        if value is None:
+            return State.create(StateType.UNDEF, None)
+        if isinstance(value, OnOffValue):
+            return State.create(StateType.SWITCH, value)
+        return State.create(StateType.DECIMAL, value)
+
+    @staticmethod
+    def is_on_value(value) -> bool:
+        return OnOffValue.is_on(value) or value == OpeningValue.OPEN or value == 'OPEN'
+
+    @staticmethod
+    def is_number_value(value) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class GroupAggregates:
+    """
+    Group membership graph (group name => member channels, built from the "groupNames" of the items) and the
+    aggregates, which rules subscribed to. Aggregates are published as channels of type AGGREGATE
+    ("<group>.<function>"). Not synchronized - OhGateway calls it with locked state cache.
+    """
+
+    def __init__(self):
+        self._groups_of = {}  # member channel => tuple of group names
+        self._members = {}  # group name => set of member channels
+        self._aggregates = {}  # group name => GroupAggregate (subscribed groups only)
+        self._functions = {}  # group name => set of subscribed AggregateFunction
+        self._channels = {}  # aggregate channel => (group name, AggregateFunction)
+        self._states = {}  # aggregate channel => State
+        self._version = 0
+
+    @staticmethod
+    def create_channel(group_name: str, function: AggregateFunction) -> Channel:
+        return Channel.create(ChannelType.AGGREGATE, '{}.{}'.format(group_name, function.value))
+
+    def get_version(self) -> int:
+        """:return: counter which gets increased with every membership change"""
+        return self._version
+
+    def get_members(self, group_name: str) -> list:
+        return list(self._members.get(group_name, ()))
+
+    def get_groups(self, channel: Channel) -> tuple:
+        return self._groups_of.get(channel, ())
+
+    def get_groups_nested(self, channel: Channel) -> frozenset:
+        """:return: names of the groups, which the channel is member of, directly or via sub groups"""
+        result = set()
+        pending = list(self._groups_of.get(channel, ()))
+        while pending:
+            group_name = pending.pop()
+            if group_name not in result:
+                result.add(group_name)
+                pending.extend(self._groups_of.get(Channel.create(ChannelType.GROUP, group_name), ()))
+        return frozenset(result)
+
+    def get_state(self, channel: Channel) -> Optional[State]:
+        return self._states.get(channel)
+
+    def has_aggregates(self) -> bool:
+        return bool(self._aggregates)
+
+    def subscribe(self, group_name: str, function: AggregateFunction, states) -> Channel:
+        """
+        :param states: current cache (channel => state), to initialize a new aggregate
+        :return: aggregate channel
+        """
+        if not group_name:
+            raise GroupAggregateException('invalid group name ({})!'.format(group_name))
+        if not isinstance(function, AggregateFunction):
+            raise GroupAggregateException('invalid aggregate function ({})!'.format(function))
+
+        aggregate = self._aggregates.get(group_name)
+        if aggregate is None:
+            aggregate = self._build_aggregate(group_name, states)
+            self._aggregates[group_name] = aggregate
+            self._functions[group_name] = set()
+        self._functions[group_name].add(function)
+
+        channel = self.create_channel(group_name, function)
+        self._channels[channel] = (group_name, function)
+        self._states[channel] = aggregate.get_state(function)
+        return channel
+
+    def update_member(self, channel: Channel, state: Optional[State]) -> list:
+        """
+        member state changed
+        :return: actions of changed aggregates
+        """
+        actions = []
+        for group_name in self._groups_of.get(channel, ()):
+            aggregate = self._aggregates.get(group_name)
+            if aggregate is not None:
+                aggregate.set_member(channel, self._get_value(state))
+                self._update_states(group_name, actions)
+        return actions
+
+    def set_member_groups(self, channel: Channel, group_names, state: Optional[State]) -> list:
+        """
+        membership of "channel" changed (item added, updated or removed)
+        :return: actions of changed aggregates
+        """
+        groups_old = self._groups_of.get(channel, ())
+        groups_new = tuple(group_names or ())
+        if groups_old == groups_new:
+            return []
+
+        self._version += 1
+        actions = []
+        for group_name in groups_old:
+            if group_name not in groups_new:
+                self._remove_membership(channel, group_name)
+                aggregate = self._aggregates.get(group_name)
+                if aggregate is not None:
+                    aggregate.remove_member(channel)
+                    self._update_states(group_name, actions)
+        for group_name in groups_new:
+            if group_name not in groups_old:
+                self._members.setdefault(group_name, set()).add(channel)
+                aggregate = self._aggregates.get(group_name)
+                if aggregate is not None:
+                    aggregate.set_member(channel, self._get_value(state))
+                    self._update_states(group_name, actions)
+
+        if groups_new:
+            self._groups_of[channel] = groups_new
+        else:
+            self._groups_of.pop(channel, None)
+        return actions
+
+    def copy(self) -> 'GroupAggregates':
+        """:return: independent copy, e.g. to rebuild it while this one is still in use"""
+        aggregates = GroupAggregates()
+        aggregates._groups_of = dict(self._groups_of)
+        aggregates._members = {group_name: set(members) for group_name, members in self._members.items()}
+        aggregates._aggregates = dict(self._aggregates)  # GroupAggregate gets replaced, not modified by "rebuild"
+        aggregates._functions = {group_name: set(functions) for group_name, functions in self._functions.items()}
+        aggregates._channels = dict(self._channels)
+        aggregates._states = dict(self._states)
+        aggregates._version = self._version
+        return aggregates
+
+    def rebuild(self, groups_of: dict, states) -> list:
+        """
+        full reload: replaces the membership graph and recalculates all aggregates
+        :param groups_of: member channel => group names
+        :param states: new cache (channel => state)
+        :return: actions of changed aggregates
+        """
+        groups_of = {channel: tuple(names) for channel, names in groups_of.items() if names}
+        if groups_of != self._groups_of:
+            self._version += 1
+        self._groups_of = groups_of
+        self._members = {}
+        for channel, group_names in groups_of.items():
+            for group_name in group_names:
+                self._members.setdefault(group_name, set()).add(channel)
+
+        actions = []
+        for group_name in self._aggregates:
+            self._aggregates[group_name] = self._build_aggregate(group_name, states)
+            self._update_states(group_name, actions)
+        return actions
+
+    def _build_aggregate(self, group_name: str, states) -> GroupAggregate:
+        aggregate = GroupAggregate()
+        for channel in self._members.get(group_name, ()):
+            aggregate.set_member(channel, self._get_value(states.get(channel)))
+        return aggregate
+
+    def _remove_membership(self, channel: Channel, group_name: str) -> None:
+        members = self._members.get(group_name)
+        if members is not None:
+            members.discard(channel)
+            if not members:
+                del self._members[group_name]
+
+    def _update_states(self, group_name: str, actions: list) -> None:
+        aggregate = self._aggregates[group_name]
+        for function in self._functions[group_name]:
+            channel = self.create_channel(group_name, function)
+            state_old = self._states.get(channel)
+            state_new = aggregate.get_state(function)
+            if state_old is None or state_old.type != state_new.type or state_old.value != state_new.value:
+                self._states[channel] = state_new
+                action = Action()
+                action.channel = channel
+                action.notification_type = OhNotificationType.AGGREGATE_CHANGE
+                action.state_old = state_old
+                action.state_new = state_new
+                actions.append(action)
+
+    @staticmethod
+    def _get_value(state: Optional[State]):
+        if state is None:
+            return None
+        return state.value
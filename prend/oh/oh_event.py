@@ -1,8 +1,8 @@
 from enum import Enum
 from typing import Optional
-import json
 from prend.channel import Channel, ChannelType
 from prend.state import State, StateType
+from prend.tools.json_codec import JsonCodec
 
 
 class OhEventException(Exception):
@@ -21,6 +21,7 @@ class OhNotificationType(Enum):
     ITEM_COMMAND = 11
     GROUP_CHANGE = 20
     THING_CHANGE = 30
+    AGGREGATE_CHANGE = 40  # group aggregates, not sent by openhab
 
     def __str__(self):
         return self.__repr__()
@@ -56,10 +57,15 @@ class OhNotificationType(Enum):
 
 
 class OhEvent:
+
+    # parsed for the group membership (notification type RELOAD)
+    ITEM_LIFECYCLE_TYPES = ('ItemAddedEvent', 'ItemUpdatedEvent', 'ItemRemovedEvent')
+
     def __init__(self):
         self.notification_type = None
         self.channel = None
         self.state = None
+        self.group_names = None  # type: Optional[list]  # None == unknown (state events)
 
     def __eq__(self, other) -> bool:
         if not other:
@@ -127,11 +133,14 @@ class OhEvent:
         # pylint: disable=line-too-long
         # {"topic":"smarthome/items/valPvModVoltage/state","payload":"{"type":"Decimal","value":"542.20"}","type":"ItemStateEvent"}
         event = OhEvent.create_empty()
-        json_data = json.loads(text)
+        json_data = JsonCodec.loads(text)
 
-        event.notification_type = OhNotificationType.parse(json_data.get('type'))
+        type_text = json_data.get('type')
+        event.notification_type = OhNotificationType.parse(type_text)
 
-        if event.notification_type in [OhNotificationType.ITEM_CHANGE, OhNotificationType.ITEM_COMMAND]:
+        if type_text in OhEvent.ITEM_LIFECYCLE_TYPES:
+            OhEvent._fill_event_from_item_lifecycle(event, json_data, type_text)
+        elif event.notification_type in [OhNotificationType.ITEM_CHANGE, OhNotificationType.ITEM_COMMAND]:
             OhEvent._fill_event_from_item(event, json_data)
         elif event.notification_type == OhNotificationType.GROUP_CHANGE:
             OhEvent._fill_event_from_group(event, json_data)
@@ -153,11 +162,35 @@ class OhEvent:
         # embedded structure as string!
         payload_text = json_data.get('payload')
         if payload_text:
-            payload = json.loads(payload_text)
+            payload = JsonCodec.loads(payload_text)
             state_type = payload.get('type')
             state_value = payload.get('value')
             event.state = State.convert(state_type, state_value)
 
+    @staticmethod
+    def _fill_event_from_item_lifecycle(event: 'OhEvent', json_data, type_text: str):
+        # {"topic":"smarthome/items/valItem/updated","payload":"[{new item}, {old item}]","type":"ItemUpdatedEvent"}
+        payload_text = json_data.get('payload')
+        if not payload_text:
+            return
+        payload = JsonCodec.loads(payload_text)
+        if isinstance(payload, list):
+            payload = payload[0] if payload else {}
+
+        channel_name = payload.get('name') or OhEvent.extract_item_name(json_data.get('topic'))
+        if not channel_name:
+            return
+        item_type = payload.get('type')
+        if item_type and item_type.strip().upper() == 'GROUP':
+            event.channel = Channel.create(ChannelType.GROUP, channel_name)
+        else:
+            event.channel = Channel.create(ChannelType.ITEM, channel_name)
+
+        if type_text == 'ItemRemovedEvent':
+            event.group_names = []
+        else:
+            event.group_names = payload.get('groupNames') or []
+
     @staticmethod
     def _fill_event_from_group(event: 'OhEvent', json_data):
         channel_type = OhEvent.get_channel_type(event.notification_type)
@@ -167,7 +200,7 @@ class OhEvent:
         # embedded structure as string!
         payload_text = json_data.get('payload')
         if payload_text:
-            payload = json.loads(payload_text)
+            payload = JsonCodec.loads(payload_text)
             state_type = payload.get('type')
             state_value = payload.get('value')
             event.state = State.convert(state_type, state_value)
@@ -181,7 +214,7 @@ class OhEvent:
         # embedded structure as string!
         payload_text = json_data.get('payload')
         if payload_text:
-            payload = json.loads(payload_text)
+            payload = JsonCodec.loads(payload_text)
 
             if isinstance(payload, list):
                 payload_inner = payload[0]
@@ -207,6 +240,7 @@ class OhEvent:
         state_type = json_data.get('type')
         state_value = json_data.get('state')
         event.state = State.convert(state_type, state_value)
+        event.group_names = json_data.get('groupNames')
         return event
 
     @staticmethod
@@ -1,13 +1,19 @@
-import copy
 import datetime
 import logging
 import requests
 import threading
+import time
+from .group_aggregate import AggregateFunction, GroupAggregates
 from .oh_event import OhEvent, OhIllegalEventException, OhNotificationType
 from .oh_send_data import OhSendData, OhSendFlags
+from .state_history import HistoryAggregates, StateHistory
+from .state_index import StateIndex
+from .state_store import StateSnapshot, StateStore
 from prend.action import Action
 from prend.channel import Channel, ChannelType, OhIllegalChannelException
-from prend.state import State
+from prend.constants import Constants
+from prend.state import State, StateType
+from prend.tools.wake_up import WakeUp
 from queue import Queue, Empty
 from typing import Optional
 
@@ -26,6 +32,65 @@ class OhGatewayEventSink:
         """
         pass
 
+    def push_events(self, events: list) -> None:
+        """overwrite for testing
+        :param events: list of OhEvent
+        """
+        for event in events:
+            self.push_event(event)
+
+    def request_reload(self) -> None:
+        """overwrite for testing"""
+        pass
+
+
+class OhPushStatistics:
+    """batch sizes and lock hold times of "OhGateway.push_events" """
+
+    def __init__(self):
+        self.batches = 0
+        self.events = 0
+        self.batch_size_max = 0
+        self.lock_time = 0.0
+        self.lock_time_max = 0.0
+
+    def __repr__(self) -> str:
+        batch_size_avg = self.events / self.batches if self.batches else 0.0
+        lock_time_avg = self.lock_time / self.batches if self.batches else 0.0
+        return '{}(batches={}, events={}, size avg={:.1f}, size max={}, lock avg={:.3f}ms, lock max={:.3f}ms)'\
+            .format(self.__class__.__name__, self.batches, self.events, batch_size_avg, self.batch_size_max,
+                    1000 * lock_time_avg, 1000 * self.lock_time_max)
+
+    def add(self, batch_size: int, lock_time: float) -> None:
+        self.batches += 1
+        self.events += batch_size
+        self.batch_size_max = max(self.batch_size_max, batch_size)
+        self.lock_time += lock_time
+        self.lock_time_max = max(self.lock_time_max, lock_time)
+
+
+class OhReloadStatistics:
+    """result and phase timings of "OhGateway.cache_states" """
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.deleted = 0
+        self.count = 0
+        self.concurrent_writes = False
+        self.time_fetch = 0.0
+        self.time_diff = 0.0
+        self.time_apply = 0.0
+        self.time_dispatch = 0.0
+
+    def __repr__(self) -> str:
+        return '{}(read={}, inserted={}, updated={}, deleted={}, count={}, fetch={:.3f}s, diff={:.3f}s, ' \
+               'apply={:.3f}s{}, dispatch={:.3f}s)'\
+            .format(self.__class__.__name__, self.read, self.inserted, self.updated, self.deleted, self.count,
+                    self.time_fetch, self.time_diff, self.time_apply,
+                    ' (concurrent writes)' if self.concurrent_writes else '', self.time_dispatch)
+
 
 class OhGateway(OhGatewayEventSink):
 
@@ -34,12 +99,22 @@ class OhGateway(OhGatewayEventSink):
         self._cache_states_notified_reload = None
         self._channel_listeners = {}
         self._dispatcher = None
+        self._group_aggregates = GroupAggregates()  # like "_states"
+        self._history = StateHistory(Constants.HISTORY_MAX_MEMORY_MB * 1024 * 1024)  # like "_states"
         self._last_connection_error = None
         self._lock_channel_listeners = threading.Lock()
-        self._lock_state = threading.Lock()
+        self._lock_cache_states = threading.Lock()
+        self._lock_state = threading.Lock()  # serializes the writers (observer batches, reloads, registrations)
+        self._lock_store = threading.Lock()  # short: single modifications, snapshots and queries
+        self._push_statistics = OhPushStatistics()
+        self._reload_statistics = None  # type: OhReloadStatistics
+        self._reload_requested = False
         self._rest = None
         self._send_queue = Queue()  # synchronized
-        self._states = {}
+        self._stale = False
+        # modifications with locked "_lock_state" and "_lock_store"; a reload swaps the whole store
+        self._states = StateStore(StateIndex())
+        self._wake_up = None  # type: WakeUp
 
     def set_dispatcher(self, dispatcher):
         self._dispatcher = dispatcher
@@ -47,6 +122,10 @@ class OhGateway(OhGatewayEventSink):
     def set_rest(self, rest):
         self._rest = rest
 
+    def set_wake_up(self, wake_up: WakeUp) -> None:
+        """gets signaled when something gets queued for sending"""
+        self._wake_up = wake_up
+
     def send_queued(self):
         something_processed = False
         start_loop = True
@@ -90,11 +169,16 @@ class OhGateway(OhGatewayEventSink):
 
         if do_send:
             self._send_queue.put(send_data)
+            if self._wake_up:
+                self._wake_up.signal()
 
-    def get_states(self) -> dict:
-        with self._lock_state:
-            export = copy.deepcopy(self._states)
-        return export
+    def get_states(self) -> StateSnapshot:
+        """
+        :return: consistent dict-like snapshot (channel => state), taken in constant time (copy on write); waits
+            for one single modification at most, not for a whole observer batch or reload
+        """
+        with self._lock_store:
+            return self._states.snapshot()
 
     # convenience function for get_states
     def get_channels(self) -> list:
@@ -102,6 +186,92 @@ class OhGateway(OhGatewayEventSink):
         channels = [*states]
         return channels
 
+    def query_channels(self, channel_type: Optional[ChannelType] = None, state_type: Optional[StateType] = None,
+                       name_prefix: Optional[str] = None, value=StateIndex.ANY) -> list:
+        """
+        Uses the secondary indexes of the cache, so the costs depend on the result size, not on the count of channels.
+        :param value: state value (e.g. OnOffValue.ON or "OPEN"); indexed for CONTACT, ONOFF, SWITCH, THING_STATUS and
+            UPDOWN states only
+        :return: channels, which match all given criteria
+        """
+        with self._lock_store:
+            return self._states.get_index().query(channel_type, state_type, name_prefix, value)
+
+    # convenience function for query_channels
+    def query_states(self, channel_type: Optional[ChannelType] = None, state_type: Optional[StateType] = None,
+                     name_prefix: Optional[str] = None, value=StateIndex.ANY) -> dict:
+        """:return: dict (channel => state) of the matching channels"""
+        with self._lock_store:
+            channels = self._states.get_index().query(channel_type, state_type, name_prefix, value)
+            return {channel: self._states.get(channel) for channel in channels}
+
+    def set_history_max_memory(self, max_memory: int) -> None:
+        """:param max_memory: bytes; limits all histories together"""
+        with self._lock_state, self._lock_store:
+            self._history = StateHistory(max_memory)
+
+    def enable_history(self, channel: Channel, depth: int, max_age: Optional[float] = None) -> None:
+        """
+        Records the changes of a numeric channel in a ring buffer (UNDEF and other values are skipped).
+        :param depth: max. count of entries
+        :param max_age: seconds; older entries get dropped
+        """
+        with self._lock_state, self._lock_store:
+            self._history.enable(channel, depth, max_age)
+
+    def get_history(self, channel: Channel, since: Optional[float] = None) -> list:
+        """
+        :param since: monotonic timestamp (time.monotonic()); None == all
+        :return: list of tuples (monotonic timestamp, value), oldest first
+        """
+        with self._lock_store:
+            return self._history.get_history(channel, since)
+
+    def get_history_aggregates(self, channel: Channel) -> Optional[HistoryAggregates]:
+        """:return: count, sum, mean, min and max of the history or None (not enabled)"""
+        with self._lock_store:
+            return self._history.get_aggregates(channel)
+
+    def get_history_memory(self) -> tuple:
+        """:return: tuple (count of histories, allocated bytes, max. bytes)"""
+        with self._lock_store:
+            return len(self._history), self._history.get_memory(), self._history.get_max_memory()
+
+    def register_group_aggregate(self, group_name: str, function: AggregateFunction) -> Channel:
+        """
+        Aggregates get updated incrementally with every state change of a group member.
+        :return: AGGREGATE channel, which can be subscribed and read like other channels
+        """
+        with self._lock_state, self._lock_store:
+            return self._group_aggregates.subscribe(group_name, function, self._states)
+
+    def get_group_members(self, group_name: str) -> list:
+        """:return: channels of the direct members (from "groupNames" of the items)"""
+        with self._lock_store:
+            return self._group_aggregates.get_members(group_name)
+
+    def get_groups_of(self, channel: Channel) -> frozenset:
+        """:return: names of the groups, which the channel is member of (incl. nested groups)"""
+        with self._lock_store:
+            return self._group_aggregates.get_groups_nested(channel)
+
+    def get_group_version(self) -> int:
+        """:return: counter which gets increased with every change of the group membership"""
+        with self._lock_store:
+            return self._group_aggregates.get_version()
+
+    def expand_group_aggregates(self, channels) -> list:
+        """:return: channels, in which AGGREGATE channels are replaced by the members of the group"""
+        result = set()
+        with self._lock_store:
+            for channel in channels:
+                if channel.type == ChannelType.AGGREGATE:
+                    group_name = channel.name.rsplit('.', 1)[0]
+                    result.update(self._group_aggregates.get_members(group_name))
+                else:
+                    result.add(channel)
+        return list(result)
+
     # convenience function for get_state
     def get_item_state(self, channel_name: str) -> State:
         channel = Channel.create(ChannelType.ITEM, channel_name)
@@ -117,13 +287,14 @@ class OhGateway(OhGatewayEventSink):
         return None
 
     def get_state(self, channel: Channel) -> Optional[State]:
-        state_out = None
+        """
+        :return: the cached (immutable) state; updates replace the states in the cache => no lock and no copy needed
+        """
         if channel:
-            with self._lock_state:
-                state = self._states.get(channel)
-                if state:
-                    state_out = copy.deepcopy(state)
-        return state_out
+            if channel.type == ChannelType.AGGREGATE:
+                return self._group_aggregates.get_state(channel)
+            return self._states.get(channel)
+        return None
 
     # convenience function for get_state
     def get_state_value(self, channel: Channel):
@@ -144,35 +315,91 @@ class OhGateway(OhGatewayEventSink):
     def get_last_cache_time(self):
         return self._cache_states_last_fetch
 
+    def request_reload(self) -> None:
+        """events may be missed (observer could not resume the event stream) => cache_states as soon as possible"""
+        self._reload_requested = True
+
+    def is_reload_requested(self) -> bool:
+        return self._reload_requested
+
+    def restore_states(self, states: dict) -> int:
+        """
+        Warm start: takes over states (of a snapshot file) for not yet known channels, without any actions. The cache
+        is stale till the next successful "cache_states".
+        :return: count of restored states
+        """
+        count = 0
+        with self._lock_state, self._lock_store:
+            for channel, state in states.items():
+                if channel not in self._states:
+                    self._states[channel] = state
+                    count += 1
+            self._stale = True
+        return count
+
+    def is_stale(self) -> bool:
+        """:return: True if the cache was restored from a snapshot file and not yet reloaded"""
+        return self._stale
+
+    def get_reload_statistics(self) -> Optional[OhReloadStatistics]:
+        """:return: statistics of the last successful "cache_states" """
+        return self._reload_statistics
+
     def cache_states(self):
+        """
+        Full reload: fetches all items and things and diffs them against the cache (without lock). The new cache, its
+        index and the group aggregates get built beside the current ones (other writers wait, readers don't) and are
+        swapped in at once.
+        """
+        if not self._lock_cache_states.acquire(blocking=False):
+            _logger.debug('cache_states: reload already running')
+            return
+
         try:
             if self._rest:
-                time_start = datetime.datetime.now()
-                existing_channels = {}
+                statistics = OhReloadStatistics()
+                time_start = time.perf_counter()
                 events = self._rest.fetch_all()
-                stat_sum_events = len(events)
-                for event in events:
-                    self.push_event(event)
-                    existing_channels[event.channel] = event.state
-
-                stat_deleted = 0
-                all_states = self.get_states()  # don't lock all time
-                for channel in all_states:
-                    existing_state = existing_channels.get(channel)
-                    if not existing_state:
-                        with self._lock_state:
-                            del self._states[channel]
-                            stat_deleted += 1
+                time_fetched = time.perf_counter()
+                statistics.time_fetch = time_fetched - time_start
+
+                snapshot = self.get_states()
+                states_new, actions = self._diff_states(snapshot, events, statistics)
+                time_diffed = time.perf_counter()
+                statistics.time_diff = time_diffed - time_fetched
+
+                with self._lock_state:
+                    if self._states.get_version() != snapshot.version:
+                        # the observer wrote meanwhile => keep its (newer) states, it has published its actions
+                        statistics.concurrent_writes = True
+                        actions = self._merge_concurrent_writes(snapshot, states_new, actions)
+                    # O(n) work without "_lock_store": the readers go on with the current cache till the swap
+                    states = self._states.replaced(states_new)
+                    statistics.count = len(states_new)
+                    group_aggregates = self._group_aggregates.copy()
+                    groups_of = {e.channel: e.group_names for e in events if e.group_names is not None}
+                    aggregate_actions = group_aggregates.rebuild(groups_of, states)
+                    with self._lock_store:
+                        self._states = states
+                        self._group_aggregates = group_aggregates
+                        for action in actions:
+                            self._history.record(action.channel, action.state_new)
+                    actions.extend(aggregate_actions)
+                time_applied = time.perf_counter()
+                statistics.time_apply = time_applied - time_diffed
+
+                if actions:
+                    self._dispatcher.push_actions(actions)
+                statistics.time_dispatch = time.perf_counter() - time_applied
 
                 self._cache_states_notified_reload = None
+                self._reload_requested = False
+                self._stale = False
                 self._last_connection_error = None
                 self._cache_states_last_fetch = datetime.datetime.now()
+                self._reload_statistics = statistics
 
-                with self._lock_state:
-                    stat_sum_new = len(self._states)
-                _logger.info('cache_states: item cache reloaded (read=%d, deleted=%d, count=%d, time=%fs)',
-                             stat_sum_events, stat_deleted, stat_sum_new,
-                             (self._cache_states_last_fetch - time_start).total_seconds())
+                _logger.info('cache_states: item cache reloaded - %s', statistics)
 
         except Exception as ex:
             _logger.error('cache_states failed (%s: %s)!', ex.__class__.__name__, ex)
@@ -180,34 +407,124 @@ class OhGateway(OhGatewayEventSink):
                 _logger.exception(ex)
             self._cache_states_last_fetch = None
             self._last_connection_error = datetime.datetime.now()
+        finally:
+            self._lock_cache_states.release()
 
-    def _import_newer_state(self, channel: Channel, state_new: State) -> bool:
-        if not channel or not channel.is_valid():
-            raise OhIllegalChannelException(channel)
-        with self._lock_state:
-            state = self._states.get(channel)
-            if state:
-                changed = state.import_newer_state(state_new)
+    @staticmethod
+    def _diff_states(snapshot: StateSnapshot, events: list, statistics: OhReloadStatistics) -> tuple:
+        """
+        one pass over the fetched events
+        :return: tuple (new cache dict, actions of changed channels)
+        """
+        states_new = {}
+        actions = []
+        statistics.read = len(events)
+        for event in events:
+            if not event or not event.is_valid():
+                raise OhIllegalEventException(event)
+            state_old = snapshot.get(event.channel)
+            if state_old:
+                states_new[event.channel] = state_old.merge_newer(event.state)
+                changed = (state_old != event.state)
+                if changed:
+                    statistics.updated += 1
             else:
-                state_clone = copy.deepcopy(state_new)
-                self._states[channel] = state_clone
+                states_new[event.channel] = event.state
                 changed = True
+                statistics.inserted += 1
 
-        # _logger.debug('queue _import_newer_state: %s | %s', channel, changed)
-        return changed
+            if changed:
+                action = Action.create_from_event(event)
+                action.state_old = state_old
+                actions.append(action)
 
-    def push_event(self, event: OhEvent) -> None:
-        if not event or not event.is_valid():
-            raise OhIllegalEventException(event)
-        # _logger.debug('push_event - in: %s', event)
+        statistics.deleted = sum(1 for channel in snapshot if channel not in states_new)
+        return states_new, actions
 
-        if event.notification_type == OhNotificationType.RELOAD:
-            self._cache_states_notified_reload = datetime.datetime.now()
+    def _merge_concurrent_writes(self, snapshot: StateSnapshot, states_new: dict, actions: list) -> list:
+        """
+        call with locked "_lock_state" (reads the cache only)
+        :return: actions without the channels written by the observer since the snapshot
+        """
+        written = set()
+        for channel in self._states:
+            state = self._states.get(channel)
+            if state is not snapshot.get(channel):
+                written.add(channel)
+                state_new = states_new.get(channel)
+                states_new[channel] = state.merge_newer(state_new) if state_new else state
+        if not written:
+            return actions
+        return [action for action in actions if action.channel not in written]
+
+    def _import_newer_state(self, channel: Channel, state_new: State) -> tuple:
+        """
+        call with locked "_lock_state" and "_lock_store"
+        :return: tuple (previous state or None, changed)
+        """
+        if not channel or not channel.is_valid():
+            raise OhIllegalChannelException(channel)
+        state_old = self._states.get(channel)
+        if state_old:
+            # unchanged texts need no conversion
+            changed = (state_old != state_new)
+            self._states[channel] = state_old.merge_newer(state_new)
         else:
-            action = Action.create_from_event(event)
-            action.state_old = self.get_state(action.channel)  # copied action
+            self._states[channel] = state_new
+            changed = True
 
-            self._import_newer_state(action.channel, action.state_new)
+        # _logger.debug('queue _import_newer_state: %s | %s', channel, changed)
+        return state_old, changed
 
-            if action.should_be_published():
-                self._dispatcher.push_action(action)
+    def push_event(self, event: OhEvent) -> None:
+        self.push_events([event])
+
+    def push_events(self, events: list) -> None:
+        """
+        Imports all events and hands over the resulting actions in one go. The batch holds the writer lock, the
+        store gets locked per event only, so readers don't wait behind the batch.
+        """
+        for event in events:
+            if not event or not event.is_valid():
+                raise OhIllegalEventException(event)
+        # _logger.debug('push_events - in: %s', events)
+
+        actions = []
+        lock_store = self._lock_store
+        with self._lock_state:
+            time_start = time.perf_counter()
+            for event in events:
+                if event.notification_type == OhNotificationType.RELOAD:
+                    self._cache_states_notified_reload = datetime.datetime.now()
+                    if event.group_names is not None and event.channel:
+                        with lock_store:
+                            actions.extend(self._group_aggregates.set_member_groups(
+                                event.channel, event.group_names, self._states.get(event.channel)))
+                else:
+                    action = Action.create_from_event(event)
+                    aggregate_actions = None
+                    with lock_store:
+                        action.state_old, changed = self._import_newer_state(action.channel, action.state_new)
+                        if changed:
+                            state = self._states.get(action.channel)
+                            self._history.record(action.channel, state)
+                            if self._group_aggregates.has_aggregates():
+                                aggregate_actions = self._group_aggregates.update_member(action.channel, state)
+
+                    if changed or action.should_be_published():
+                        actions.append(action)
+                    if aggregate_actions:
+                        actions.extend(aggregate_actions)
+            self._push_statistics.add(len(events), time.perf_counter() - time_start)
+
+        if actions:
+            self._dispatcher.push_actions(actions)
+
+    def pop_push_statistics(self) -> OhPushStatistics:
+        """
+        :return: statistics since the last call
+        """
+        with self._lock_state:
+            statistics = self._push_statistics
+            self._push_statistics = OhPushStatistics()
+        return statistics
@@ -1,14 +1,17 @@
 import asyncio
-import json
+import datetime
 import logging
 import threading
-from random import randint
+from typing import Optional
 
 import aiohttp
 
+from prend.channel import ChannelType
 from prend.config import Config
-from prend.oh.aiosseclient import Event
+from prend.constants import Constants
 from prend.oh.oh_event import OhEvent, OhNotificationType
+from prend.oh.sse_parser import SseParser
+from prend.tools.json_codec import JsonCodec
 
 # aiosseclient for OpenHAB notifications
 #     Asynchronous Server Side Events (SSE) Client
@@ -24,18 +27,153 @@ class OhObserverException(Exception):
 
 class OhObserver(threading.Thread):
 
+    # item/thing lifecycle events, needed to notice OhNotificationType.RELOAD
+    LIFECYCLE_TOPICS = [
+        'smarthome/items/*/added',
+        'smarthome/items/*/removed',
+        'smarthome/items/*/updated',
+        'smarthome/things/*/added',
+        'smarthome/things/*/removed',
+        'smarthome/things/*/updated',
+    ]
+
     def __init__(self, config: Config, gateway):
         threading.Thread.__init__(self)
         self._rest_base_url = config.oh_rest_base_url
         self._username = config.oh_username
         self._password = config.oh_password
+        self._topic_filter = config.oh_observer_topic_filter
         self._event_loop = None
+        self._event_task = None
         self._gateway = gateway
+        self._subscribed_channels = None
+        self._last_event_id = None
+        self._resume_event_id = None
+        self._resume_pending = False
+
+        self._stat_events = 0
+        self._stat_unsubscribed = 0
+        self._stat_start = datetime.datetime.now()
+
+    def set_subscribed_channels(self, channels) -> None:
+        """
+        Subscribed channels are used to build the server side topic filter (if configured) and to count events,
+        which no rule is interested in. Has to be set before starting the thread.
+        """
+        self._subscribed_channels = frozenset(channels) if channels is not None else None
+
+    def set_resume_event_id(self, event_id) -> None:
+        """
+        Resume the event stream of a previous (disconnected) observer: the id is sent as "Last-Event-ID", the first
+        received event shows, if the server replayed the missed events. If not, a full reload of the gateway cache
+        is requested. Has to be set before starting the thread.
+        """
+        self._resume_event_id = event_id
+        self._last_event_id = event_id
+
+    def get_last_event_id(self):
+        """:return: id of the last received event or None (server does not send ids)"""
+        return self._last_event_id
+
+    def can_resume(self) -> bool:
+        """a new observer can continue the event stream (with set_resume_event_id), no full reload needed"""
+        return self._last_event_id is not None
+
+    @staticmethod
+    def is_successor_event_id(last_id, next_id, filtered: bool = False) -> bool:
+        """
+        openhab numbers the events consecutively; with a topic filter the ids of the filtered out events are missing,
+        so any greater id counts as successor
+        """
+        try:
+            if filtered:
+                return int(next_id) > int(last_id)
+            return int(next_id) == int(last_id) + 1
+        except (TypeError, ValueError):
+            return False
+
+    def _is_topic_filtered(self) -> bool:
+        return bool(self._topic_filter) and self._subscribed_channels is not None
+
+    def _check_resumed(self, first_event_id) -> None:
+        self._resume_pending = False
+        if self.is_successor_event_id(self._resume_event_id, first_event_id, self._is_topic_filtered()):
+            _logger.info('event stream resumed (last id=%s)', self._resume_event_id)
+        else:
+            _logger.info('event stream not resumed (last id=%s, next id=%s) => reload cache',
+                         self._resume_event_id, first_event_id)
+            self._gateway.request_reload()
+
+    def _check_resume_timeout(self) -> None:
+        # nothing received => missed events cannot be excluded
+        if self._resume_pending:
+            _logger.info('event stream not confirmed (last id=%s) => reload cache', self._resume_event_id)
+            self._resume_pending = False
+            self._gateway.request_reload()
+
+    @classmethod
+    def build_topics(cls, channels) -> str:
+        """
+        :return: openhab "topics" filter for the SSE subscription, which delivers only events for the given channels
+        """
+        topics = list(cls.LIFECYCLE_TOPICS)
+        for channel in sorted(channels, key=lambda c: (c.type.value, c.name or '')):
+            if channel.type in [ChannelType.ITEM, ChannelType.GROUP]:
+                # ItemStateEvent, ItemCommandEvent, ... and GroupItemStateChangedEvent (groups/member/statechanged)
+                topics.append('smarthome/items/{}/*'.format(channel.name))
+            elif channel.type == ChannelType.THING:
+                topics.append('smarthome/things/{}/*'.format(channel.name))
+        return ','.join(topics)
+
+    def pop_event_statistics(self):
+        """
+        :return: tuple (received events per second, events per second without subscribed channel); counters get reset
+        """
+        time_now = datetime.datetime.now()
+        seconds = (time_now - self._stat_start).total_seconds()
+        stat_events, stat_unsubscribed = self._stat_events, self._stat_unsubscribed
+        self._stat_events = 0
+        self._stat_unsubscribed = 0
+        self._stat_start = time_now
+        if seconds <= 0:
+            return 0.0, 0.0
+        return stat_events / seconds, stat_unsubscribed / seconds
+
+    def _count_event(self, event) -> None:
+        self._stat_events += 1
+        if self._subscribed_channels is not None and event.channel not in self._subscribed_channels:
+            self._stat_unsubscribed += 1
 
     def _handle_event(self, event_in) -> None:
+        self._handle_events([event_in])
+
+    def _handle_events(self, events_in: list) -> None:
+        """
+        Converts all events, which were received together, and hands them over to the gateway as one batch.
+        """
+        if self._resume_pending and events_in:
+            self._check_resumed(events_in[0].id)
+
+        events_out = []
+        for event_in in events_in:
+            if event_in.id is not None:
+                self._last_event_id = event_in.id
+            event_out = self._convert_event(event_in)
+            if event_out:
+                events_out.append(event_out)
+
+        if events_out:
+            try:
+                self._gateway.push_events(events_out)
+                # _logger.debug('events queued: %s', events_out)
+            except Exception as ex:
+                _logger.exception(ex)
+                _logger.error('cannot push events (%d)', len(events_out))
+
+    def _convert_event(self, event_in) -> Optional[OhEvent]:
         if not event_in or not event_in.data:
             _logger.error('invalid event (None)')
-            return
+            return None
 
         try:
             event_out = OhEvent.create_from_notify_json(event_in.data)
@@ -43,18 +181,21 @@ class OhObserver(threading.Thread):
             if event_out.notification_type == OhNotificationType.IGNORE:
                 pass
             elif event_out.is_valid():
-                self._gateway.push_event(event_out)
-                # _logger.debug('event queued: %s', event_out)
+                if event_out.notification_type != OhNotificationType.RELOAD:
+                    self._count_event(event_out)
+                return event_out
             else:
                 raise OhObserverException('invalid event!')
 
-        except json.decoder.JSONDecodeError:
+        except JsonCodec.DecodeError:
             _logger.error('cannot parse faulty json: %s', event_in.data)
         except Exception as ex:
             _logger.exception(ex)
             _logger.error('cannot parse faulty json: %s', event_in.data)
 
-    # copied from aiosseclient.aiosseclient - to set timeout
+        return None
+
+    # copied from aiosseclient.aiosseclient - to set timeout and parse chunks incrementally
     @staticmethod
     async def _aiosseclient(url, last_id, **kwargs):
         if 'headers' not in kwargs:
@@ -74,19 +215,11 @@ class OhObserver(threading.Thread):
         try:
             async with aiohttp.ClientSession(read_timeout=one_year_in_seconds) as session:
                 response = await session.get(url, **kwargs)
-                lines = []
-                async for line in response.content:
-                    line = line.decode('utf8')
-
-                    if line == '\n' or line == '\r' or line == '\r\n':
-                        if lines[0] == ':ok\n':
-                            lines = []
-                            continue
-
-                        yield Event.parse(''.join(lines))
-                        lines = []
-                    else:
-                        lines.append(line)
+                parser = SseParser()
+                async for chunk in response.content.iter_any():  # all buffered data
+                    events = parser.feed(chunk)
+                    if events:
+                        yield events
         except (
                 aiohttp.client_exceptions.ClientError,
                 asyncio.TimeoutError,
@@ -99,15 +232,24 @@ class OhObserver(threading.Thread):
             raise
 
     async def _loop(self) -> None:
-        last_id = '{}{}'.format(self.__class__.__name__, randint(0, 99999))
+        last_id = self._resume_event_id
 
         try:
+            if last_id is not None:
+                self._resume_pending = True
+                asyncio.get_event_loop().call_later(Constants.WAIT_AFTER_CONNECTION_ERROR_SEC,
+                                                    self._check_resume_timeout)
 
             url = '{}/events'.format(self._rest_base_url)
-            _logger.debug('connecting to %s (id=%s)', url, last_id)
+            kwargs = {}
+            if self._is_topic_filtered():
+                kwargs['params'] = {'topics': self.build_topics(self._subscribed_channels)}
+                _logger.debug('connecting to %s (id=%s, topics=%d)', url, last_id, len(self._subscribed_channels))
+            else:
+                _logger.debug('connecting to %s (id=%s)', url, last_id)
 
-            async for event in self._aiosseclient(url, last_id):
-                self._handle_event(event)
+            async for events in self._aiosseclient(url, last_id, **kwargs):
+                self._handle_events(events)
 
             # normally there was an exception in another thread
             _logger.debug('_loop - exiting "normally", but expected to run forever!')
@@ -124,7 +266,12 @@ class OhObserver(threading.Thread):
             _logger.exception(ex)
 
     def shutdown(self) -> None:
-        pass
+        event_loop, event_task = self._event_loop, self._event_task
+        if event_loop and event_task:
+            try:
+                event_loop.call_soon_threadsafe(event_task.cancel)
+            except RuntimeError:
+                pass  # loop already closed
 
     def is_connected(self):
         return self.is_alive()
@@ -134,11 +281,15 @@ class OhObserver(threading.Thread):
         event_loop = None
         try:
             event_loop = asyncio.new_event_loop()
-            event_loop.run_until_complete(self._loop())
+            self._event_task = event_loop.create_task(self._loop())
+            self._event_loop = event_loop
+            event_loop.run_until_complete(self._event_task)
 
             # normally there was an exception in another thread
             _logger.debug('run - exiting "normally", but expected to run forever!')
 
+        except asyncio.CancelledError:
+            _logger.debug('run - shutdown')
         except (
                 aiohttp.client_exceptions.ClientError,
                 asyncio.TimeoutError,
@@ -150,5 +301,6 @@ class OhObserver(threading.Thread):
             _logger.error('run - %s: %s', ex.__class__.__name__, ex)
             _logger.exception(ex)
         finally:
+            self._event_loop = None
             if event_loop:
                 event_loop.close()
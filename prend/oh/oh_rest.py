@@ -1,13 +1,17 @@
+import concurrent.futures
 import datetime
 import logging
 import requests
 import threading
+import time
 import typing
 from .oh_event import OhEvent, OhIllegalEventException
 from .oh_send_data import OhSendData
 from prend.channel import ChannelType
 from prend.config import Config
 from prend.state import State
+from prend.tools.json_codec import JsonCodec
+from prend.tools.json_stream import JsonArrayStreamParser
 from requests.auth import HTTPBasicAuth
 from typing import Optional
 
@@ -25,6 +29,11 @@ class OhRestException(Exception):
 
 
 class OhRest:
+
+    # only the fields, which prend needs (openhab ignores unknown parameters)
+    ITEM_PARAMS = {'recursive': 'false', 'fields': 'name,type,state,groupNames'}
+    STREAM_CHUNK_SIZE = 65536
+
     def __init__(self, config: Config):
         self._rest_base_url = config.oh_rest_base_url
         if not self._rest_base_url:
@@ -45,10 +54,19 @@ class OhRest:
 
     def open(self):
         with self._lock_session:
-            self._session = requests.Session()
-            self._session.headers['accept'] = 'application/json'
-            if self._username:
-                self._session.auth = HTTPBasicAuth(self._username, self._password)
+            self._session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers['accept'] = 'application/json'
+        if self._username:
+            session.auth = HTTPBasicAuth(self._username, self._password)
+        return session
+
+    def _check_open(self) -> None:
+        """call with _lock_session"""
+        if self._session is None:
+            raise OhRestException('rest session is not open!')
 
     def close(self):
         with self._lock_session:
@@ -57,15 +75,25 @@ class OhRest:
                 self._session = None
 
     def fetch_all(self):
+        """fetches items and things concurrently"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix='OhRest') as executor:
+            future_items = executor.submit(self._fetch_timed, self.fetch_items)
+            future_things = executor.submit(self._fetch_timed, self.fetch_things)
+            events = future_items.result()
+            events.extend(future_things.result())
+        return events
+
+    @staticmethod
+    def _fetch_timed(fetch_func) -> list:
         events = []
-        self.fetch_items(events)
-        self.fetch_things(events)
+        time_start = time.perf_counter()
+        fetch_func(events)
+        _logger.debug('%s: %d events (%.3fs)', fetch_func.__name__, len(events), time.perf_counter() - time_start)
         return events
 
     def fetch_items(self, events: list) -> None:
         time_start_loading = datetime.datetime.now()
-        res = self._req_get('/items/')
-        for json_data in res:
+        for json_data in self._req_get_stream('/items/', self.ITEM_PARAMS):
             event = self._fetch_item(time_start_loading, json_data)
             if event:
                 events.append(event)
@@ -90,7 +118,7 @@ class OhRest:
             if not event.is_valid():
                 raise OhIllegalEventException(event)
 
-            event.state.last_change = time_start_loading
+            event.state = event.state.with_last_change(time_start_loading)
             return event
 
         except Exception as ex:
@@ -100,8 +128,7 @@ class OhRest:
 
     def fetch_things(self, events: list) -> None:
         time_start_loading = datetime.datetime.now()
-        res = self._req_get('/things/')
-        for json_data in res:
+        for json_data in self._req_get_stream('/things/'):
             event = self._fetch_thing(time_start_loading, json_data)
             if event:
                 events.append(event)
@@ -114,7 +141,7 @@ class OhRest:
             if not event.is_valid():
                 raise OhIllegalEventException(event)
 
-            event.state.last_change = time_start_loading
+            event.state = event.state.with_last_change(time_start_loading)
             return event
         except Exception as ex:
             _logger.exception(ex)
@@ -161,17 +188,42 @@ class OhRest:
 
     def _req_get(self, uri_path: str) -> typing.Any:
         with self._lock_session:
-            req = self._session.get(self._rest_base_url + uri_path, timeout=self._timeout)
+            self._check_open()
+        # requests.Session isn't thread-safe => every fetch gets its own short-lived session, so items and things can
+        # be fetched concurrently (and "close" doesn't pull the shared session away in between)
+        with self._create_session() as session:
+            req = session.get(self._rest_base_url + uri_path, timeout=self._timeout)
+            self._check_req_return(req)
+            return JsonCodec.loads(req.content)
+
+    def _req_get_stream(self, uri_path: str, params: dict = None):
+        """
+        generator: delivers the elements of a JSON array response while it's still arriving
+        """
+        with self._lock_session:
+            self._check_open()
+        # own session, see _req_get
+        with self._create_session() as session, \
+                session.get(self._rest_base_url + uri_path, params=params, timeout=self._timeout, stream=True) as req:
             self._check_req_return(req)
-            return req.json()
+            parser = JsonArrayStreamParser()
+            count_bytes = 0
+            for chunk in req.iter_content(chunk_size=self.STREAM_CHUNK_SIZE):
+                count_bytes += len(chunk)
+                yield from parser.feed(chunk)
+            if not parser.is_finished():
+                raise OhRestException('incomplete response ({}, {} bytes)!'.format(uri_path, count_bytes))
+            _logger.debug('%s: %d bytes received', uri_path, count_bytes)
 
     def _req_post(self, uri_path: str, payload=None) -> None:
         with self._lock_session:
+            self._check_open()
             req = self._session.post(self._rest_base_url + uri_path, data=payload, timeout=self._timeout)
             self._check_req_return(req)
 
     def _req_put(self, uri_path: str, payload=None) -> None:
         with self._lock_session:
+            self._check_open()
             req = self._session.put(self._rest_base_url + uri_path, data=payload, timeout=self._timeout)
             self._check_req_return(req)
 
@@ -0,0 +1,105 @@
+from prend.oh.aiosseclient import Event
+
+
+class SseParser:
+    """
+    Incremental parser for server sent events, which works directly on the received byte chunks.
+
+    Frame boundaries are found by buffer searches, only field values get decoded and complete frames are returned
+    as "aiosseclient.Event" (same semantics as "Event.parse"). Frames without data (comments like ":ok") are
+    not delivered (see SSE spec).
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pending_cr = False
+        self.last_event_id = None
+
+    def feed(self, chunk: bytes) -> list:
+        """
+        :param chunk: any received bytes, frames may be split at any position
+        :return: list of complete events
+        """
+        if not chunk:
+            return []
+
+        if b'\r' in chunk or self._pending_cr:
+            chunk = self._normalize_line_breaks(chunk)
+
+        buffer = self._buffer
+        buffer += chunk
+
+        events = []
+        start = 0
+        while True:
+            end = buffer.find(b'\n\n', start)
+            if end < 0:
+                break
+            if end > start:
+                event = self._parse_frame(buffer, start, end)
+                if event is not None:
+                    events.append(event)
+            start = end + 2
+
+        if start:
+            del buffer[:start]
+        return events
+
+    def _normalize_line_breaks(self, chunk: bytes) -> bytes:
+        if self._pending_cr and chunk[:1] == b'\n':
+            chunk = chunk[1:]  # second half of a "\r\n" split between chunks
+        self._pending_cr = chunk[-1:] == b'\r'
+        return chunk.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+    def _parse_frame(self, buffer: bytearray, start: int, end: int):
+        # fast path: single data line (the usual openhab notification)
+        if buffer.startswith(b'data:', start) and buffer.find(b'\n', start, end) < 0:
+            value_start = start + 5
+            if value_start < end and buffer[value_start] == 0x20:
+                value_start += 1
+            return Event(data=buffer[value_start:end].decode('utf8'))
+
+        data = None
+        event = Event()
+        line_start = start
+        while line_start <= end:
+            line_end = buffer.find(b'\n', line_start, end)
+            if line_end < 0:
+                line_end = end
+
+            colon = buffer.find(b':', line_start, line_end)
+            if colon == line_start or line_end == line_start:
+                pass  # comment or empty line
+            else:
+                if colon < 0:
+                    name = bytes(buffer[line_start:line_end])
+                    value = ''
+                else:
+                    name = bytes(buffer[line_start:colon])
+                    value_start = colon + 1
+                    if value_start < line_end and buffer[value_start] == 0x20:
+                        value_start += 1
+                    value = buffer[value_start:line_end].decode('utf8')
+
+                if name == b'data':
+                    if data is None:
+                        data = [value]
+                    else:
+                        data.append(value)
+                elif name == b'event':
+                    event.event = value
+                elif name == b'id':
+                    event.id = value
+                    self.last_event_id = value
+                elif name == b'retry':
+                    try:
+                        event.retry = int(value)
+                    except ValueError:
+                        pass
+
+            line_start = line_end + 1
+
+        if data is None:
+            return None
+        event.data = '\n'.join(data)
+        return event
@@ -0,0 +1,78 @@
+import datetime
+import logging
+import os
+from prend.channel import Channel, ChannelType
+from prend.oh.state_store import StateSnapshot
+from prend.state import State
+from prend.tools.json_codec import JsonCodec
+
+
+_logger = logging.getLogger(__name__)
+
+
+class StateCacheFile:
+    """
+    Compact snapshot file of the gateway cache for warm starts: one row [channel type, name, type text, value text]
+    per channel. All restored states get the save time as "last_change", so every newer update wins.
+    """
+
+    FORMAT_VERSION = 1
+    FILE_NAME = 'state_cache.json'
+
+    def __init__(self, path: str):
+        self._path = path
+
+    @classmethod
+    def create(cls, work_dir: str) -> 'StateCacheFile':
+        return StateCacheFile(os.path.join(work_dir, cls.FILE_NAME))
+
+    def get_path(self) -> str:
+        return self._path
+
+    def save(self, states: StateSnapshot) -> int:
+        """
+        writes atomically (temp file + rename)
+        :return: count of saved states
+        """
+        rows = []
+        for channel, state in states.items():
+            type_text, value_text = state.to_texts()
+            rows.append([channel.type.name, channel.name, type_text, value_text])
+
+        data = {
+            'version': self.FORMAT_VERSION,
+            'saved': datetime.datetime.now().isoformat(),
+            'states': rows,
+        }
+        path_temp = self._path + '.tmp'
+        with open(path_temp, 'w', encoding='utf-8') as text_file:
+            text_file.write(JsonCodec.dumps(data))
+        os.replace(path_temp, self._path)
+        return len(rows)
+
+    def load(self) -> dict:
+        """
+        :return: dict channel => state; empty if there is no (valid) file
+        """
+        states = {}
+        if not os.path.isfile(self._path):
+            return states
+
+        try:
+            with open(self._path, 'rb') as text_file:
+                data = JsonCodec.loads(text_file.read())
+            if data.get('version') != self.FORMAT_VERSION:
+                _logger.warning('state cache file (%s) ignored: unknown version', self._path)
+                return states
+
+            last_change = datetime.datetime.fromisoformat(data['saved'])
+            for channel_type, name, type_text, value_text in data['states']:
+                channel = Channel.create(ChannelType.parse(channel_type), name)
+                if channel.is_valid():
+                    states[channel] = State.convert(type_text, value_text, last_change)
+
+        except Exception as ex:
+            _logger.error('cannot load state cache file (%s): %s: %s', self._path, ex.__class__.__name__, ex)
+            states = {}
+
+        return states
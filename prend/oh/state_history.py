@@ -0,0 +1,197 @@
+import collections
+import math
+import time
+from array import array
+from prend.channel import Channel
+from prend.state import State
+from typing import Optional
+
+
+class StateHistoryException(Exception):
+    pass
+
+
+class HistoryAggregates:
+    """rolling aggregates over the current content of a history buffer"""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.mean = None  # type: Optional[float]
+        self.min = None  # type: Optional[float]
+        self.max = None  # type: Optional[float]
+
+    def __repr__(self) -> str:
+        return '{}(count={}, sum={}, mean={}, min={}, max={})'.format(
+            self.__class__.__name__, self.count, self.sum, self.mean, self.min, self.max)
+
+
+class HistoryBuffer:
+    """
+    Ring buffer of (monotonic timestamp, value) for numeric states, backed by two preallocated arrays of doubles. Sum
+    and min/max (monotonic queues) are maintained while appending and evicting, so the aggregates cost O(1).
+    """
+
+    ITEM_SIZE = 16  # bytes per entry (2 doubles)
+
+    def __init__(self, depth: int, max_age: Optional[float] = None):
+        if not depth or depth <= 0:
+            raise StateHistoryException('invalid history depth ({})!'.format(depth))
+        self._depth = depth
+        self._max_age = max_age
+        self._times = array('d', bytes(8 * depth))
+        self._values = array('d', bytes(8 * depth))
+        self._start = 0  # sequence number of the oldest entry
+        self._end = 0  # sequence number of the next entry
+        self._sum = 0.0
+        self._min_queue = collections.deque()  # sequence numbers with increasing values
+        self._max_queue = collections.deque()  # sequence numbers with decreasing values
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def get_depth(self) -> int:
+        return self._depth
+
+    def get_memory(self) -> int:
+        """:return: bytes allocated for the entries"""
+        return self._depth * self.ITEM_SIZE
+
+    def append(self, timestamp: float, value: float) -> None:
+        if self._end - self._start >= self._depth:
+            self._pop_oldest()
+
+        value = float(value)
+        seq = self._end
+        pos = seq % self._depth
+        self._times[pos] = timestamp
+        self._values[pos] = value
+        self._sum += value
+
+        values, depth = self._values, self._depth
+        while self._min_queue and values[self._min_queue[-1] % depth] >= value:
+            self._min_queue.pop()
+        self._min_queue.append(seq)
+        while self._max_queue and values[self._max_queue[-1] % depth] <= value:
+            self._max_queue.pop()
+        self._max_queue.append(seq)
+        self._end = seq + 1
+
+    def expire(self, now: float) -> None:
+        """drops the entries older than "max_age" (if configured)"""
+        if self._max_age is None:
+            return
+        limit = now - self._max_age
+        while self._end > self._start and self._times[self._start % self._depth] < limit:
+            self._pop_oldest()
+
+    def _pop_oldest(self) -> None:
+        seq = self._start
+        self._sum -= self._values[seq % self._depth]
+        if self._min_queue and self._min_queue[0] == seq:
+            self._min_queue.popleft()
+        if self._max_queue and self._max_queue[0] == seq:
+            self._max_queue.popleft()
+        self._start = seq + 1
+        if self._start == self._end:
+            self._sum = 0.0  # no accumulated rounding errors
+
+    def get_items(self, since: Optional[float] = None) -> list:
+        """
+        :param since: monotonic timestamp (time.monotonic()); None == all
+        :return: list of tuples (monotonic timestamp, value), oldest first
+        """
+        start = self._start
+        if since is not None:
+            # binary search, timestamps are ascending
+            low, high = self._start, self._end
+            while low < high:
+                middle = (low + high) // 2
+                if self._times[middle % self._depth] < since:
+                    low = middle + 1
+                else:
+                    high = middle
+            start = low
+        return [(self._times[seq % self._depth], self._values[seq % self._depth]) for seq in range(start, self._end)]
+
+    def get_aggregates(self) -> HistoryAggregates:
+        aggregates = HistoryAggregates()
+        aggregates.count = self._end - self._start
+        if aggregates.count > 0:
+            aggregates.sum = self._sum
+            aggregates.mean = self._sum / aggregates.count
+            aggregates.min = self._values[self._min_queue[0] % self._depth]
+            aggregates.max = self._values[self._max_queue[0] % self._depth]
+        return aggregates
+
+
+class StateHistory:
+    """
+    Opt-in history of numeric channels (OhGateway). Memory is allocated when a history gets enabled, the total is
+    capped by "max_memory". Not synchronized - OhGateway calls it with locked state cache.
+    """
+
+    def __init__(self, max_memory: int):
+        self._buffers = {}  # channel => HistoryBuffer
+        self._max_memory = max_memory
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def get_memory(self) -> int:
+        """:return: bytes allocated by all buffers"""
+        return sum(buffer.get_memory() for buffer in self._buffers.values())
+
+    def get_max_memory(self) -> int:
+        return self._max_memory
+
+    def enable(self, channel: Channel, depth: int, max_age: Optional[float] = None) -> None:
+        """
+        :param depth: max. count of entries
+        :param max_age: seconds; older entries get dropped
+        """
+        buffer_old = self._buffers.get(channel)
+        memory_old = buffer_old.get_memory() if buffer_old is not None else 0
+        memory_new = self.get_memory() - memory_old + depth * HistoryBuffer.ITEM_SIZE
+        if memory_new > self._max_memory:
+            raise StateHistoryException('history of {} exceeds the memory limit ({} > {} bytes)!'.format(
+                channel, memory_new, self._max_memory))
+
+        buffer = HistoryBuffer(depth, max_age)
+        if buffer_old is not None:
+            for timestamp, value in buffer_old.get_items()[-depth:]:
+                buffer.append(timestamp, value)
+        self._buffers[channel] = buffer
+
+    def is_enabled(self, channel: Channel) -> bool:
+        return channel in self._buffers
+
+    def record(self, channel: Channel, state: Optional[State], timestamp: Optional[float] = None) -> bool:
+        """
+        :return: True if the state was recorded (history enabled and numeric value)
+        """
+        buffer = self._buffers.get(channel)
+        if buffer is None or state is None:
+            return False
+        value = state.value
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or math.isnan(value):
+            return False  # UNDEF, ...
+        if timestamp is None:
+            timestamp = time.monotonic()
+        buffer.expire(timestamp)
+        buffer.append(timestamp, value)
+        return True
+
+    def get_history(self, channel: Channel, since: Optional[float] = None) -> list:
+        buffer = self._buffers.get(channel)
+        if buffer is None:
+            return []
+        buffer.expire(time.monotonic())
+        return buffer.get_items(since)
+
+    def get_aggregates(self, channel: Channel) -> Optional[HistoryAggregates]:
+        buffer = self._buffers.get(channel)
+        if buffer is None:
+            return None
+        buffer.expire(time.monotonic())
+        return buffer.get_aggregates()
@@ -0,0 +1,176 @@
+import bisect
+from typing import Optional
+from prend.channel import Channel, ChannelType
+from prend.state import State, StateType
+
+
+class StateIndex:
+    """
+    Secondary indexes of the gateway cache: channel type, state type, name prefix and (for switches, contacts,
+    things, ...) the value. Maintained by StateStore on every modification; queries cost in the order of the result
+    size (smallest matching index), not of the cache size.
+
+    States get indexed by their declared type and (for the value types) by the openhab text of their value, so they
+    don't need to be converted. Converting would also lose contacts: "OPEN" / "CLOSED" turn into UNKNOWN.
+    """
+
+    ANY = object()  # query: value does not matter
+
+    VALUE_TYPES = (StateType.CONTACT, StateType.ONOFF, StateType.SWITCH, StateType.THING_STATUS, StateType.UPDOWN)
+
+    _NO_VALUE = object()
+
+    def __init__(self):
+        self._keys = {}  # channel => (state type, value key)
+        self._by_channel_type = {}  # ChannelType => set of channels
+        self._by_state_type = {}  # StateType => set of channels
+        self._by_value = {}  # (state type, value text) => set of channels
+        self._names = []  # sorted (name, channel type value)
+        self._channels = {}  # (name, channel type value) => channel
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @classmethod
+    def _get_keys(cls, state: State) -> tuple:
+        state_type = state.peek_type()
+        if state_type in cls.VALUE_TYPES:
+            return state_type, (state_type, cls._get_value_text(state.to_texts()[1]))
+        return state_type, cls._NO_VALUE
+
+    @staticmethod
+    def _get_value_text(value) -> Optional[str]:
+        """:return: openhab text of a value (e.g. OnOffValue.ON => "ON"); None for NULL and UNDEF"""
+        if value is None:
+            return None
+        if not isinstance(value, str):
+            value = State.convert_to_json(value)
+        return None if value in ('NULL', 'UNDEF') else value
+
+    def update(self, channel: Channel, state: State) -> None:
+        keys_new = self._get_keys(state)
+        keys_old = self._keys.get(channel)
+        if keys_old == keys_new:
+            return
+
+        if keys_old is None:
+            self._add_to(self._by_channel_type, channel.type, channel)
+            name_key = (channel.name or '', channel.type.value)
+            bisect.insort(self._names, name_key)
+            self._channels[name_key] = channel
+        else:
+            self._remove_from(self._by_state_type, keys_old[0], channel)
+            if keys_old[1] is not self._NO_VALUE:
+                self._remove_from(self._by_value, keys_old[1], channel)
+
+        self._keys[channel] = keys_new
+        self._add_to(self._by_state_type, keys_new[0], channel)
+        if keys_new[1] is not self._NO_VALUE:
+            self._add_to(self._by_value, keys_new[1], channel)
+
+    def remove(self, channel: Channel) -> None:
+        keys_old = self._keys.pop(channel, None)
+        if keys_old is None:
+            return
+        self._remove_from(self._by_channel_type, channel.type, channel)
+        self._remove_from(self._by_state_type, keys_old[0], channel)
+        if keys_old[1] is not self._NO_VALUE:
+            self._remove_from(self._by_value, keys_old[1], channel)
+        name_key = (channel.name or '', channel.type.value)
+        pos = bisect.bisect_left(self._names, name_key)
+        if pos < len(self._names) and self._names[pos] == name_key:
+            del self._names[pos]
+        self._channels.pop(name_key, None)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def copy(self) -> 'StateIndex':
+        """:return: independent index with the same content"""
+        index = StateIndex()
+        index._keys = dict(self._keys)
+        index._by_channel_type = {key: set(channels) for key, channels in self._by_channel_type.items()}
+        index._by_state_type = {key: set(channels) for key, channels in self._by_state_type.items()}
+        index._by_value = {key: set(channels) for key, channels in self._by_value.items()}
+        index._names = list(self._names)
+        index._channels = dict(self._channels)
+        return index
+
+    def query(self, channel_type: Optional[ChannelType] = None, state_type: Optional[StateType] = None,
+              name_prefix: Optional[str] = None, value=ANY) -> list:
+        """
+        :return: channels, which match all given criteria
+        """
+        candidates = []
+        if channel_type is not None:
+            candidates.append(self._by_channel_type.get(channel_type, ()))
+        if state_type is not None:
+            candidates.append(self._by_state_type.get(state_type, ()))
+        if value is not self.ANY:
+            candidates.append(self._query_value(state_type, self._get_value_text(value)))
+
+        if name_prefix is not None:
+            prefixed = self._query_prefix(name_prefix, min((len(c) for c in candidates), default=None))
+            if prefixed is not None:
+                candidates.append(prefixed)
+
+        if not candidates:
+            return list(self._keys)
+
+        candidates.sort(key=len)
+        smallest, others = candidates[0], candidates[1:]
+        return [channel for channel in smallest if all(channel in other for other in others)]
+
+    def _query_value(self, state_type: Optional[StateType], value_text: Optional[str]):
+        if state_type is not None:
+            return self._by_value.get((state_type, value_text), ())
+        channels = set()
+        for value_type in self.VALUE_TYPES:
+            channels.update(self._by_value.get((value_type, value_text), ()))
+        return channels
+
+    def _query_prefix(self, name_prefix: str, limit: Optional[int]):
+        """
+        :param limit: size of the smallest other candidate set; prefix matches are collected only till this size
+        :return: set of channels or None if there are more matches than "limit" (filter by prefix later)
+        """
+        channels = set()
+        pos = bisect.bisect_left(self._names, (name_prefix,))
+        while pos < len(self._names):
+            name_key = self._names[pos]
+            if not name_key[0].startswith(name_prefix):
+                break
+            if limit is not None and len(channels) >= limit:
+                return _PrefixFilter(name_prefix)
+            channels.add(self._channels[name_key])
+            pos += 1
+        return channels
+
+    @staticmethod
+    def _add_to(index: dict, key, channel: Channel) -> None:
+        channels = index.get(key)
+        if channels is None:
+            channels = set()
+            index[key] = channels
+        channels.add(channel)
+
+    @staticmethod
+    def _remove_from(index: dict, key, channel: Channel) -> None:
+        channels = index.get(key)
+        if channels is not None:
+            channels.discard(channel)
+            if not channels:
+                del index[key]
+
+
+class _PrefixFilter:
+    """behaves like a set of all channels with the name prefix (membership test only)"""
+
+    def __init__(self, name_prefix: str):
+        self._name_prefix = name_prefix
+
+    def __len__(self) -> int:
+        return 1 << 62  # never the smallest candidate
+
+    def __contains__(self, channel: Channel) -> bool:
+        return (channel.name or '').startswith(self._name_prefix)
@@ -0,0 +1,147 @@
+from collections.abc import MutableMapping
+from typing import Optional
+from prend.channel import Channel
+from prend.oh.state_index import StateIndex
+from prend.state import State
+
+
+class StateSnapshot(MutableMapping):
+    """
+    Consistent view (channel => state) of a StateStore at the time the snapshot was taken. Shares the data with the
+    store until one of both gets modified (copy on write), so taking a snapshot costs nothing and iterating needs no
+    lock.
+    """
+
+    def __init__(self, data: dict, version: int):
+        self._data = data
+        self._owned = False
+        self.version = version
+
+    def __repr__(self) -> str:
+        return '{}(version={}, count={})'.format(self.__class__.__name__, self.version, len(self._data))
+
+    def __getitem__(self, channel: Channel) -> State:
+        return self._data[channel]
+
+    def __setitem__(self, channel: Channel, state: State) -> None:
+        self._ensure_owned()
+        self._data[channel] = state
+
+    def __delitem__(self, channel: Channel) -> None:
+        self._ensure_owned()
+        del self._data[channel]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, channel) -> bool:
+        return channel in self._data
+
+    def get(self, channel, default=None):
+        return self._data.get(channel, default)
+
+    def copy(self) -> dict:
+        return dict(self._data)
+
+    def _ensure_owned(self) -> None:
+        if not self._owned:
+            self._data = dict(self._data)
+            self._owned = True
+
+
+class StateStore:
+    """
+    Versioned copy-on-write dict (channel => state) of OhGateway. Modifications have to be synchronized by the caller,
+    "get" is lock-free. A snapshot shares the current dict; the next modification copies it (once).
+    An optional StateIndex gets updated with every modification.
+    """
+
+    def __init__(self, index: Optional[StateIndex] = None):
+        self._data = {}
+        self._shared = False
+        self._version = 0
+        self._index = index
+
+    def __repr__(self) -> str:
+        return '{}(version={}, count={})'.format(self.__class__.__name__, self._version, len(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, channel) -> bool:
+        return channel in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __getitem__(self, channel: Channel) -> State:
+        return self._data[channel]
+
+    def __setitem__(self, channel: Channel, state: State) -> None:
+        self._ensure_writable()
+        self._data[channel] = state
+        if self._index is not None:
+            self._index.update(channel, state)
+
+    def __delitem__(self, channel: Channel) -> None:
+        self._ensure_writable()
+        del self._data[channel]
+        if self._index is not None:
+            self._index.remove(channel)
+
+    def get(self, channel: Channel, default=None) -> Optional[State]:
+        return self._data.get(channel, default)
+
+    def get_index(self) -> Optional[StateIndex]:
+        """:return: index (access synchronized like modifications)"""
+        return self._index
+
+    def get_version(self) -> int:
+        """:return: counter which gets increased with every modification"""
+        return self._version
+
+    def clear(self) -> None:
+        self._data = {}
+        self._shared = False
+        self._version += 1
+        if self._index is not None:
+            self._index.clear()
+
+    def replace_all(self, data: dict) -> None:
+        """takes over "data" (no copy); the index gets updated for the differences only"""
+        data_old = self._data
+        self._data = data
+        self._shared = False
+        self._version += 1
+        if self._index is not None:
+            index = self._index
+            for channel in data_old:
+                if channel not in data:
+                    index.remove(channel)
+            for channel, state in data.items():
+                if data_old.get(channel) is not state:
+                    index.update(channel, state)
+
+    def replaced(self, data: dict) -> 'StateStore':
+        """
+        :return: new store with "data" (no copy) and a copy of the index, which gets updated for the differences only;
+            this store stays unchanged, so it can be read meanwhile
+        """
+        store = StateStore(self._index.copy() if self._index is not None else None)
+        store._data = self._data  # not modified, "replace_all" exchanges the dict
+        store._version = self._version
+        store.replace_all(data)
+        return store
+
+    def snapshot(self) -> StateSnapshot:
+        self._shared = True
+        return StateSnapshot(self._data, self._version)
+
+    def _ensure_writable(self) -> None:
+        if self._shared:
+            self._data = dict(self._data)
+            self._shared = False
+        self._version += 1
@@ -0,0 +1,103 @@
+import threading
+import time
+from typing import Optional
+from prend.action import Action
+from prend.oh.oh_event import OhNotificationType
+
+
+class RateLimitSlot:
+    """delivery state of one channel/listener combination"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.last_delivery = None  # type: float
+        self.pending = None  # type: Action
+
+    def get_deadline(self) -> float:
+        return self.last_delivery + self.min_interval
+
+
+class RateLimiter:
+    """
+    Delivers at most one state change per channel and listener within "min_interval" seconds. Changes of a burst get
+    merged (first old state, latest new state) and delivered when the interval has passed (see "pop_due").
+    Commands are never limited.
+    """
+
+    LIMITED_TYPES = (OhNotificationType.ITEM_CHANGE, OhNotificationType.GROUP_CHANGE,
+                     OhNotificationType.THING_CHANGE, OhNotificationType.AGGREGATE_CHANGE)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots = {}  # (channel, listener id) => RateLimitSlot
+        self._pending = {}  # (channel, listener id) => RateLimitSlot with pending action
+        self._statistics_merged = 0
+
+    @staticmethod
+    def get_time() -> float:
+        # overwrite for tests
+        return time.monotonic()
+
+    def offer(self, action: Action, min_interval: float) -> bool:
+        """
+        :param action: action, which is already bound to its listener
+        :param min_interval: seconds
+        :return: True if the action can be delivered immediately, otherwise it's kept till the interval has passed
+        """
+        if not min_interval or action.notification_type not in self.LIMITED_TYPES:
+            return True
+
+        key = (action.channel, id(action.listener))
+        time_now = self.get_time()
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = RateLimitSlot(min_interval)
+                self._slots[key] = slot
+
+            if slot.pending is not None:
+                slot.pending.coalesce(action)
+                self._statistics_merged += 1
+                return False
+
+            if slot.last_delivery is not None and time_now < slot.get_deadline():
+                slot.pending = action
+                self._pending[key] = slot
+                return False
+
+            slot.last_delivery = time_now
+            return True
+
+    def pop_due(self) -> list:
+        """
+        :return: pending actions whose interval has passed (flush of bursts)
+        """
+        if not self._pending:
+            return []
+
+        actions = []
+        time_now = self.get_time()
+        with self._lock:
+            for key, slot in list(self._pending.items()):
+                if time_now >= slot.get_deadline():
+                    actions.append(slot.pending)
+                    slot.pending = None
+                    slot.last_delivery = time_now
+                    del self._pending[key]
+        return actions
+
+    def get_next_deadline(self) -> Optional[float]:
+        """
+        :return: point of time (see "get_time") of the next pending delivery or None
+        """
+        with self._lock:
+            if not self._pending:
+                return None
+            return min(slot.get_deadline() for slot in self._pending.values())
+
+    def pop_merged_count(self) -> int:
+        """:return: count of state changes, which got merged into pending actions since last call"""
+        with self._lock:
+            merged = self._statistics_merged
+            self._statistics_merged = 0
+        return merged
@@ -3,15 +3,21 @@ import logging
 import schedule
 from abc import ABC, abstractmethod
 
-from prend.action import Action
-from prend.channel import Channel
+from prend.action import Action, ActionPriority
+from prend.channel import Channel, ChannelType
+from prend.channel_pattern import ChannelPattern
+from prend.cron_scheduler import CronTrigger
 from prend.dispatcher import Dispatcher
 from prend.logging_helper import LoggingHelper
 from prend.oh.oh_gateway import OhGateway
+from prend.oh.group_aggregate import AggregateFunction
 from prend.oh.oh_send_data import OhSendFlags
-from prend.state import State
+from prend.oh.state_history import HistoryAggregates
+from prend.oh.state_index import StateIndex
+from prend.oh.state_store import StateSnapshot
+from prend.state import State, StateType
 from prend.tools.convert import Convert
-from typing import Optional
+from typing import Optional, Union
 
 
 class RuleException(Exception):
@@ -69,10 +75,56 @@ class Rule(ABC):
     def close(self) -> None:
         pass
 
-    def subscribe_channel_actions(self, channel: Channel) -> None:
-        self._dispatcher.register_oh_listener(channel, self)
+    def subscribe_channel_actions(self, channel: Channel, min_interval: Optional[float] = None,
+                                  priority: Optional[ActionPriority] = None, max_age: Optional[float] = None) -> None:
+        """
+        :param min_interval: seconds; bursts of state changes get merged into one action (first old, latest new state)
+            per interval. "None" takes the interval from config section "rate_limit" (if any).
+        :param priority: "None" takes the priority from config section "priority" (default: commands HIGH, else NORMAL)
+        :param max_age: seconds; actions, which could not be delivered within this time, get skipped
+        """
+        self._dispatcher.register_oh_listener(channel, self, min_interval, priority, max_age)
 
-    def subscribe_cron_actions(self, cron_key: str, job: schedule.Job) -> None:
+    def subscribe_pattern_actions(self, pattern: ChannelPattern, min_interval: Optional[float] = None,
+                                  priority: Optional[ActionPriority] = None, max_age: Optional[float] = None) -> None:
+        """
+        Subscribes all matching channels, also the ones created later, e.g.
+        ChannelPattern.create_glob('valTemp*'), ChannelPattern.create_group('gWindows')
+        (parameters see subscribe_channel_actions)
+        """
+        self._dispatcher.register_pattern_listener(pattern, self, min_interval, priority, max_age)
+
+    def set_action_weight(self, weight: int) -> None:
+        """
+        share of this rule, if the action queue serves the rules weighted (config "action_queue_fairness = weighted"):
+        up to "weight" actions per turn (default 1)
+        """
+        self._dispatcher.set_listener_weight(self, weight)
+
+    def subscribe_group_aggregate(self, group_name: str, function: AggregateFunction,
+                                  min_interval: Optional[float] = None) -> Channel:
+        """
+        e.g. open windows: subscribe_group_aggregate('gWindows', AggregateFunction.COUNT_ON)
+        :return: AGGREGATE channel of the notified actions; get_state(channel) delivers the current value
+        """
+        channel = self._oh_gateway.register_group_aggregate(group_name, function)
+        self.subscribe_channel_actions(channel, min_interval)
+        return channel
+
+    def enable_history(self, channel: Channel, depth: int, max_age: Optional[float] = None) -> None:
+        """
+        Keeps the last changes of a numeric channel (see get_history, get_history_aggregates); the memory of all
+        histories is limited by config value "history_max_mb".
+        :param depth: max. count of entries
+        :param max_age: seconds; older entries get dropped
+        """
+        self._oh_gateway.enable_history(channel, depth, max_age)
+
+    def subscribe_cron_actions(self, cron_key: str, job: Union[CronTrigger, schedule.Job, str]) -> None:
+        """
+        :param job: cron expression ("*/5 * * * *"), IntervalTrigger(seconds), DailyTrigger("07:30") or a job of the
+            "schedule" package (schedule.every().minute, don't call "do")
+        """
         self._dispatcher.register_cron_listener(cron_key, job, self)
 
     def get_config(self, section_name: str, value_name: str, fallback: Optional[str] = None):
@@ -102,9 +154,35 @@ class Rule(ABC):
     def get_channels(self) -> list:
         return self._oh_gateway.get_channels()
 
-    def get_states(self) -> dict:
+    def get_states(self) -> StateSnapshot:
         return self._oh_gateway.get_states()
 
+    def query_channels(self, channel_type: Optional[ChannelType] = None, state_type: Optional[StateType] = None,
+                       name_prefix: Optional[str] = None, value=StateIndex.ANY) -> list:
+        """
+        e.g. all switched on lights: query_channels(ChannelType.ITEM, name_prefix='light', value=OnOffValue.ON)
+        :return: channels, which match all given criteria (indexed, so no need to iterate over all states)
+        """
+        return self._oh_gateway.query_channels(channel_type, state_type, name_prefix, value)
+
+    def get_history(self, channel: Channel, since: Optional[float] = None) -> list:
+        """
+        :param since: monotonic timestamp, e.g. time.monotonic() - 600 for the last 10 minutes; None == all
+        :return: list of tuples (monotonic timestamp, value), oldest first
+        """
+        return self._oh_gateway.get_history(channel, since)
+
+    def get_history_aggregates(self, channel: Channel) -> Optional[HistoryAggregates]:
+        return self._oh_gateway.get_history_aggregates(channel)
+
+    def get_group_members(self, group_name: str) -> list:
+        return self._oh_gateway.get_group_members(group_name)
+
+    # convenience function for query_channels
+    def query_states(self, channel_type: Optional[ChannelType] = None, state_type: Optional[StateType] = None,
+                     name_prefix: Optional[str] = None, value=StateIndex.ANY) -> dict:
+        return self._oh_gateway.query_states(channel_type, state_type, name_prefix, value)
+
     # convenience function for get_state
     def get_item_state(self, channel_name: str) -> State:
         return self._oh_gateway.get_item_state(channel_name)
@@ -0,0 +1,167 @@
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+from prend.action import Action
+from prend.tools.wake_up import WakeUp
+from typing import Optional
+
+
+_logger = logging.getLogger(__name__)
+
+
+class RuleStatistics:
+    """per rule: processed actions, mailbox size and the time the actions waited for a worker"""
+
+    def __init__(self):
+        self.processed = 0
+        self.queue_size_max = 0
+        self.wait_time = 0.0
+        self.wait_time_max = 0.0
+        self.busy_time = 0.0
+
+    def __repr__(self) -> str:
+        wait_time_avg = self.wait_time / self.processed if self.processed else 0.0
+        return '{}(processed={}, queue max={}, wait avg={:.3f}ms, wait max={:.3f}ms, busy={:.3f}s)'.format(
+            self.__class__.__name__, self.processed, self.queue_size_max, 1000 * wait_time_avg,
+            1000 * self.wait_time_max, self.busy_time)
+
+
+class RuleMailbox:
+    """ordered actions of one rule; "scheduled" == a worker owns the mailbox"""
+
+    def __init__(self, listener):
+        self.listener = listener
+        self.queue = collections.deque()  # tuples (action, perf_counter when queued)
+        self.scheduled = False
+        self.statistics = RuleStatistics()
+
+
+class RuleExecutor:
+    """
+    Runs the rules on a worker pool. Every rule is an actor with its own mailbox: it gets its actions in order and
+    never runs concurrently with itself, but a slow rule doesn't delay the others (and the main loop) anymore.
+    """
+
+    BATCH_SIZE = 10  # actions per turn of a rule, then the other rules get the worker
+
+    def __init__(self, workers: int, max_pending: int = 1000):
+        """
+        :param max_pending: max. count of actions in all mailboxes; above the dispatcher leaves the actions in the
+            action queue (its overflow policy applies)
+        """
+        self._workers = workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='Rule')
+        self._notify_func = self._notify_action
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._mailboxes = {}  # id(listener) => RuleMailbox
+        self._pending = 0
+        self._throttled = False
+        self._shutdown = False
+        self._wake_up = None  # type: WakeUp
+
+    @staticmethod
+    def create(workers: Optional[int], max_pending: Optional[int] = None) -> Optional['RuleExecutor']:
+        """:return: None if the rules should run in the main thread (workers == 0 or None)"""
+        if workers is None or workers == 0:
+            return None
+        if workers < 0:
+            raise ValueError('invalid count of rule workers ({})!'.format(workers))
+        return RuleExecutor(workers, max_pending or 1000)
+
+    def __repr__(self) -> str:
+        return '{}(workers={}, pending={})'.format(self.__class__.__name__, self._workers, self._pending)
+
+    @staticmethod
+    def _notify_action(action: Action) -> None:
+        action.listener.notify_action(action)
+
+    def set_notify_func(self, notify_func) -> None:
+        """:param notify_func: executes an action (incl. error handling), set by the dispatcher"""
+        self._notify_func = notify_func
+
+    def set_wake_up(self, wake_up: WakeUp) -> None:
+        """gets signaled when there is capacity again (after "has_capacity" returned False)"""
+        self._wake_up = wake_up
+
+    def get_pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def has_capacity(self) -> bool:
+        with self._lock:
+            if self._pending >= self._max_pending:
+                self._throttled = True
+                return False
+            return True
+
+    def submit(self, action: Action) -> None:
+        with self._lock:
+            mailbox = self._mailboxes.get(id(action.listener))
+            if mailbox is None:
+                mailbox = RuleMailbox(action.listener)
+                self._mailboxes[id(action.listener)] = mailbox
+            mailbox.queue.append((action, time.perf_counter()))
+            mailbox.statistics.queue_size_max = max(mailbox.statistics.queue_size_max, len(mailbox.queue))
+            self._pending += 1
+            schedule = not mailbox.scheduled
+            mailbox.scheduled = True
+
+        if schedule:
+            self._executor.submit(self._run, mailbox)
+
+    def _run(self, mailbox: RuleMailbox) -> None:
+        count = 0
+        while True:
+            with self._lock:
+                if not mailbox.queue:
+                    mailbox.scheduled = False
+                    return
+                if count >= self.BATCH_SIZE and not self._shutdown:
+                    # give other rules a chance, stays scheduled; submitted with lock => "shutdown" cannot stop the
+                    # pool in between (with shutdown the mailbox gets drained by this worker)
+                    self._executor.submit(self._run, mailbox)
+                    return
+                action, time_queued = mailbox.queue.popleft()
+
+            time_start = time.perf_counter()
+            try:
+                self._notify_func(action)
+            except Exception as ex:
+                _logger.error('error - notify_action(%s) failed! - (%s: %s)', action, ex.__class__.__name__, ex)
+                _logger.exception(ex)
+            time_end = time.perf_counter()
+            count += 1
+
+            with self._lock:
+                statistics = mailbox.statistics
+                statistics.processed += 1
+                wait_time = time_start - time_queued
+                statistics.wait_time += wait_time
+                statistics.wait_time_max = max(statistics.wait_time_max, wait_time)
+                statistics.busy_time += time_end - time_start
+                self._pending -= 1
+                wake = self._throttled and self._pending < self._max_pending
+                if wake:
+                    self._throttled = False
+            if wake and self._wake_up:
+                self._wake_up.signal()
+
+    def pop_statistics(self) -> list:
+        """
+        :return: list of tuples (listener, current mailbox size, RuleStatistics since last call)
+        """
+        result = []
+        with self._lock:
+            for mailbox in self._mailboxes.values():
+                result.append((mailbox.listener, len(mailbox.queue), mailbox.statistics))
+                mailbox.statistics = RuleStatistics()
+        return result
+
+    def shutdown(self) -> None:
+        """processes the queued actions and stops the workers"""
+        with self._lock:
+            self._shutdown = True
+        self._executor.shutdown(wait=True)
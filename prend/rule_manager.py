@@ -1,13 +1,19 @@
 import time
 import datetime
 import logging
+import threading
 from .action import Action
+from .action_queue import ActionQueue
 from .connection_checker import ConnectionChecker
+from .constants import Constants
 from .daemon import Daemon
 from .dispatcher import Dispatcher
 from .oh.oh_gateway import OhGateway
 from .oh.oh_observer import OhObserver
 from .oh.oh_rest import OhRest
+from .oh.state_cache_file import StateCacheFile
+from .rule_executor import RuleExecutor
+from .tools.wake_up import WakeUp
 
 
 # https://github.com/serverdensity/python-daemon
@@ -21,20 +27,41 @@ class RuleManagerException(Exception):
 
 
 class RuleManager(Daemon):
+
+    WAIT_CHECK_CONNECTION_SEC = 3
+
     def __init__(self, config):
         super().__init__(pidfile=config.pid_file, workdir=config.work_dir)
 
         self._config = config
         self._rules = []
-        self._dispatcher = Dispatcher()
+        self._wake_up = WakeUp()
+        self._dispatcher = Dispatcher(ActionQueue.create(config.action_queue_size, config.action_queue_policy,
+                                                         config.action_queue_block_timeout,
+                                                         config.action_queue_fairness,
+                                                         config.action_queue_promotion))
+        self._dispatcher.set_rate_limits(config.rate_limits)
+        self._dispatcher.set_priorities(config.priorities)
+        self._dispatcher.set_wake_up(self._wake_up)
+        self._rule_executor = RuleExecutor.create(config.rule_workers, config.action_queue_size)
+        if self._rule_executor:
+            self._rule_executor.set_wake_up(self._wake_up)
+            self._dispatcher.set_rule_executor(self._rule_executor)
         self._rest = OhRest(config)
         self._oh_gateway = OhGateway()
         self._oh_gateway.set_dispatcher(self._dispatcher)
         self._oh_gateway.set_rest(self._rest)
+        self._oh_gateway.set_wake_up(self._wake_up)
+        self._dispatcher.set_group_source(self._oh_gateway)
+        if config.history_max_mb is not None:
+            self._oh_gateway.set_history_max_memory(int(config.history_max_mb * 1024 * 1024))
         self._observer = None
+        self._observer_subscription_version = None
         self._con_checker = ConnectionChecker()
         self._con_checker.set_oh_gateway(self._oh_gateway)
+        self._state_cache_file = StateCacheFile.create(config.work_dir) if config.warm_start else None
 
+        self.last_save_state_cache = None
         self.last_status_log = None
         self.last_check_connection = None
         self.time_usage_dispatch = 0
@@ -63,6 +90,13 @@ class RuleManager(Daemon):
         except Exception as ex:
             _logger.exception(ex)
 
+    def shutdown_rule_executor(self):
+        try:
+            if self._rule_executor:
+                self._rule_executor.shutdown()  # queued actions get processed before the rules get closed
+        except Exception as ex:
+            _logger.exception(ex)
+
     def shutdown_rules(self):
         try:
             for rule in self._rules:
@@ -89,19 +123,62 @@ class RuleManager(Daemon):
         _logger.info('shutdown')
 
         self.shutdown_observer()
+        self.shutdown_rule_executor()
         self.shutdown_rules()
+        self.save_state_cache()
         self.shutdown_rest()
 
         super().shutdown()
 
+    def save_state_cache(self):
+        if not self._state_cache_file or self._oh_gateway.is_stale() or not self._oh_gateway.is_connected():
+            return
+        try:
+            count = self._state_cache_file.save(self._oh_gateway.get_states())
+            _logger.debug('state cache saved (%d states)', count)
+        except Exception as ex:
+            _logger.error('cannot save state cache (%s): %s: %s', self._state_cache_file.get_path(),
+                          ex.__class__.__name__, ex)
+
+    def _load_state_cache(self) -> bool:
+        """
+        :return: True if the gateway cache was restored (stale) from the snapshot file
+        """
+        if not self._state_cache_file:
+            return False
+        states = self._state_cache_file.load()
+        if not states:
+            return False
+        count = self._oh_gateway.restore_states(states)
+        _logger.info('warm start: %d states restored (stale till reloaded)', count)
+        return True
+
     def _restart_observer(self):
         _logger.debug('_restart_observer')
+        last_event_id = None
         if self._observer:
+            last_event_id = self._observer.get_last_event_id()
             self.shutdown_observer()
         self._observer = OhObserver(self._config, self._oh_gateway)
+        self._observer.set_resume_event_id(last_event_id)
+        self._observer_subscription_version = self._get_subscription_version()
+        if self._dispatcher.has_pattern_listeners():
+            self._observer.set_subscribed_channels(None)  # patterns match channels, which are created later
+        else:
+            # aggregates are calculated from the member states => the observer needs their events
+            self._observer.set_subscribed_channels(
+                self._oh_gateway.expand_group_aggregates(self._dispatcher.get_oh_channels()))
         self._observer.start()
         self._con_checker.set_observer(self._observer)
 
+    def _is_observer_topic_filter_outdated(self) -> bool:
+        if not self._config.oh_observer_topic_filter or not self._observer:
+            return False
+        return self._observer_subscription_version != self._get_subscription_version()
+
+    def _get_subscription_version(self) -> tuple:
+        return self._dispatcher.get_subscription_version(), self._oh_gateway.get_group_version()
+
     def _open_rules(self):
         for rule in self._rules:
             rule.set_config(self._config.rule_config)
@@ -129,12 +206,21 @@ class RuleManager(Daemon):
 
         try:
             self._rest.open()
+            warm_start = self._load_state_cache()
             self._restart_observer()
-            self._oh_gateway.cache_states()
+            if not warm_start:
+                self._oh_gateway.cache_states()
 
             self._open_rules()
+            if self._is_observer_topic_filter_outdated():
+                self._restart_observer()  # subscribe the channels of the rules
+
+            if warm_start:
+                # differences get delivered as actions
+                threading.Thread(target=self._oh_gateway.cache_states, name='WarmStartReload', daemon=True).start()
 
             self.last_check_connection = datetime.datetime.now()
+            self.last_save_state_cache = datetime.datetime.now()
             self.last_status_log = datetime.datetime.now()
 
             self._reset_time_usage()
@@ -152,11 +238,10 @@ class RuleManager(Daemon):
                     something_processed = True
 
                 self._run_status_log()
+                self._run_save_state_cache()
 
                 if not something_processed:
-                    sleep_time = 0.03
-                    time.sleep(sleep_time)
-                    self.time_usage_sleep += sleep_time
+                    self._wait_for_wake_up()
 
         except KeyboardInterrupt:
             _logger.info('KeyboardInterrupt => abort')
@@ -203,13 +288,30 @@ class RuleManager(Daemon):
         self.time_usage_send = 0
         self.time_usage_start = datetime.datetime.now()
 
-    def _run_check_connection(self):
-        wait_check_connection_sec = 3
+    def _wait_for_wake_up(self):
+        """
+        blocks till actions or sends get queued (by other threads) or till the next deadline: cron job, rate limited
+        action or connection check
+        """
+        since_check = (datetime.datetime.now() - self.last_check_connection).total_seconds()
+        timeout = self.WAIT_CHECK_CONNECTION_SEC - since_check
+        cron_seconds = self._dispatcher.get_cron_idle_seconds()
+        if cron_seconds is not None:
+            timeout = min(timeout, cron_seconds)
+        rate_limit_deadline = self._dispatcher.get_next_rate_limit_deadline()
+        if rate_limit_deadline is not None:
+            timeout = min(timeout, rate_limit_deadline - time.monotonic())
+
+        if timeout > 0:
+            time_start = time.perf_counter()
+            self._wake_up.wait(timeout)
+            self.time_usage_sleep += time.perf_counter() - time_start
 
+    def _run_check_connection(self):
         something_processed = False
         # check observer if running
         diff = datetime.datetime.now() - self.last_check_connection
-        if diff.seconds >= wait_check_connection_sec:
+        if diff.seconds >= self.WAIT_CHECK_CONNECTION_SEC:
             time_temp = datetime.datetime.now()
             self.last_check_connection = datetime.datetime.now()
 
@@ -217,6 +319,10 @@ class RuleManager(Daemon):
             if self._con_checker.should_reconnect_observer():
                 self._restart_observer()
                 something_processed = True
+            elif self._is_observer_topic_filter_outdated():
+                _logger.debug('subscriptions changed => reconnect observer with new topic filter')
+                self._restart_observer()
+                something_processed = True
             if self._con_checker.should_reconnect_oh_gateway():
                 self._oh_gateway.cache_states()
                 something_processed = True
@@ -241,6 +347,14 @@ class RuleManager(Daemon):
         self.time_usage_send += (datetime.datetime.now() - time_temp).total_seconds()
         return something_processed
 
+    def _run_save_state_cache(self):
+        if not self._state_cache_file:
+            return
+        diff = datetime.datetime.now() - self.last_save_state_cache
+        if diff.total_seconds() >= Constants.WAIT_SAVE_STATE_CACHE_SEC:
+            self.last_save_state_cache = datetime.datetime.now()
+            self.save_state_cache()
+
     def _run_status_log(self):
         wait_status_log_sec = 600
 
@@ -258,4 +372,39 @@ class RuleManager(Daemon):
             _logger.info('alive + time shares: cov=%.1f%%, send=%.1f%%, dispatch=%.1f%%, sleep=%.1f%%',
                          time_coverage, share_send, share_dispatch, share_sleep)
 
+            _logger.info('gateway push: %s', self._oh_gateway.pop_push_statistics())
+            count_signals, count_wake_ups = self._wake_up.pop_statistics()
+            _logger.info('main loop: %d wake-ups (%.2f/s), %d signals', count_wake_ups, count_wake_ups / sum_all,
+                         count_signals)
+            queue_statistics = self._dispatcher.pop_queue_statistics()
+            if queue_statistics.coalesced or queue_statistics.dropped or queue_statistics.blocked or \
+                    queue_statistics.expired:
+                _logger.warning('action queue overflow: %s', queue_statistics)
+            else:
+                _logger.info('action queue: %s', queue_statistics)
+            for listener_statistics in self._dispatcher.pop_listener_queue_statistics():
+                if listener_statistics.dropped or listener_statistics.expired:
+                    _logger.warning('action queue of rule %s: %s', listener_statistics.listener, listener_statistics)
+                else:
+                    _logger.info('action queue of rule %s: %s', listener_statistics.listener, listener_statistics)
+            if self._rule_executor:
+                for listener, queue_size, rule_statistics in self._rule_executor.pop_statistics():
+                    _logger.info('rule %s: %d queued, %s', listener, queue_size, rule_statistics)
+            if self._config.rate_limits:
+                _logger.info('rate limits: %d state changes merged', self._dispatcher.pop_rate_limit_merged_count())
+
+            history_count, history_memory, history_max_memory = self._oh_gateway.get_history_memory()
+            if history_count:
+                _logger.info('state history: %d channels, %.1f of %.1f MB', history_count,
+                             history_memory / 1048576, history_max_memory / 1048576)
+
+            if self._observer:
+                rate_events, rate_unsubscribed = self._observer.pop_event_statistics()
+                if self._config.oh_observer_topic_filter:
+                    _logger.info('observer events: %.2f/s (filtered by topics, unsubscribed: %.2f/s)',
+                                 rate_events, rate_unsubscribed)
+                else:
+                    _logger.info('observer events: %.2f/s (avoidable by topic filter: %.2f/s)',
+                                 rate_events, rate_unsubscribed)
+
             self._reset_time_usage()
@@ -60,23 +60,90 @@ class StateType(Enum):
         return result
 
 
+_peek_types = {}  # type text => StateType
+
+
 class State:
+    """
+    Immutable value object: updates deliver new instances, so states can be shared (between threads) without copying.
+
+    States created by "convert" keep the raw openhab texts and get converted on first access of "type" or "value".
+    As long as "_raw" is set, type and value are exactly the conversion result of these texts, so unchanged updates
+    can be detected by comparing texts.
+    """
 
-    def __init__(self) -> None:
-        self.type = None  # type: StateType
-        self.value = None
-        self.last_change = None
+    __slots__ = ('_type', '_value', '_raw', '_converted', '_last_change')
 
-        self.update_last_change()
+    def __init__(self, state_type: Optional[StateType] = None, value=None, last_change=None) -> None:
+        self._type = state_type
+        self._value = value
+        self._raw = None  # type: Optional[tuple]
+        self._converted = True
+        self._last_change = last_change or datetime.datetime.now()
 
     def __repr__(self) -> str:
         return '{}({},{})'.format(self.__class__.__name__, self.type, self.value)
 
+    def __copy__(self) -> 'State':
+        return self
+
+    # noinspection PyUnusedLocal
+    def __deepcopy__(self, memo) -> 'State':
+        return self
+
+    @property
+    def type(self) -> Optional[StateType]:
+        if not self._converted:
+            self._convert_raw()
+        return self._type
+
+    @property
+    def value(self):
+        if not self._converted:
+            self._convert_raw()
+        return self._value
+
+    @property
+    def last_change(self) -> Optional[datetime.datetime]:
+        return self._last_change
+
+    def is_converted(self) -> bool:
+        return self._converted
+
+    def peek_type(self) -> Optional[StateType]:
+        """
+        :return: type without converting the value (an unconverted state delivers the declared type, a failing
+            conversion may turn it into UNKNOWN later)
+        """
+        if self._converted:
+            return self._type
+        type_text = self._raw[0]
+        state_type = _peek_types.get(type_text)
+        if state_type is None:
+            state_type = StateType.parse(type_text)
+            _peek_types[type_text] = state_type
+        return state_type
+
+    def to_texts(self) -> tuple:
+        """
+        :return: tuple (type text, value text), which "convert" turns into an equal state again
+        """
+        if self._raw is not None:
+            return self._raw
+        return (self.type.name if self.type else None), self.convert_to_json(self.value)
+
+    def _convert_raw(self) -> None:
+        # caches the conversion only, type and value don't change => no lock needed
+        self._type, self._value = self._convert_text(*self._raw)
+        self._converted = True
+
     def __eq__(self, other) -> bool:
         if not other:
             return False
         if type(self) != type(other):
             return False
+        if self._raw is not None and self._raw == other._raw:
+            return True
         if self.type != other.type:
             return False
         if self.value != other.value:
@@ -84,6 +151,8 @@ class State:
         return True
 
     def is_valid(self) -> bool:
+        if not self._converted:
+            return True  # conversion delivers at least StateType.UNKNOWN
         if not self.type:
             return False
         return True
@@ -113,14 +182,19 @@ class State:
                     value_float = None
         return value_float
 
-    def update_last_change(self) -> None:
-        self.last_change = datetime.datetime.now()
+    def with_value(self, value) -> 'State':
+        """:return: new state (same type, current time as last change)"""
+        return State(self.type, value)
 
-    def set_value(self, value) -> None:
-        self.value = value
-        self.update_last_change()
+    def with_last_change(self, last_change) -> 'State':
+        """:return: new state (same type and value, raw texts are kept)"""
+        state = State(self._type, self._value, last_change)
+        state._raw = self._raw
+        state._converted = self._converted
+        return state
 
-    def set_value_check_type(self, value) -> bool:
+    def with_value_check_type(self, value) -> Optional['State']:
+        """:return: new state or None if the value does not fit to the type"""
         type_matches = False
         if isinstance(self.value, int):
             if self.type.is_number_type():
@@ -132,81 +206,91 @@ class State:
             type_matches = True
 
         if type_matches:
-            self.set_value(value)
-        return type_matches
-
-    def import_state(self, other) -> None:
-        if self.type != StateType.UNDEF and other.type == StateType.UNDEF:
-            self.value = None
+            return self.with_value(value)
+        return None
+
+    def merge(self, other) -> 'State':
+        """
+        :return: state after an update by "other" (keeps the more specific type of this state)
+        """
+        last_change = other.last_change
+        if other._raw is not None and self._raw is not None and other._raw[0] == self._raw[0]:
+            # same type text => same result as a full merge (below), but without converting
+            pass
+        elif self.type != StateType.UNDEF and other.type == StateType.UNDEF:
+            return State(self.type, None, last_change)
         elif self.type in [StateType.CONTACT, StateType.SWITCH] and other.type == StateType.ONOFF:
             # don't overwrite type
-            self.value = other.value
+            return State(self.type, other.value, last_change)
         elif self.type in [StateType.DIMMER, StateType.ROLLERSHUTTER] and other.type == StateType.DECIMAL:
             # don't overwrite type
-            self.value = other.value
-        else:
-            self.type = other.type
-            self.value = other.value
-        self.last_change = other.last_change or datetime.datetime.now()
+            return State(self.type, other.value, last_change)
+
+        return other
 
-    def import_newer_state(self, other) -> None:
+    def merge_newer(self, other) -> 'State':
+        """
+        :return: merged state or this state, if "other" is older
+        """
         if not other:
-            return
+            return self
         if self.last_change and not other.last_change:
-            return
+            return self
         if self.last_change > other.last_change:
-            return
-        self.import_state(other)
+            return self
+        return self.merge(other)
 
     # noinspection PyShadowingBuiltins
     @staticmethod
     def create(state_type, value, last_change=None) -> 'State':
-        state = State()
-        state.type = state_type
-        state.value = value
-        state.last_change = last_change or datetime.datetime.now()
-        return state
+        return State(state_type, value, last_change)
 
     @staticmethod
-    def convert(state_type: Optional[str], state_text: Optional[str]) -> 'State':
-
-        state = State()
+    def convert(state_type: Optional[str], state_text: Optional[str], last_change=None) -> 'State':
+        """
+        :return: state, which gets converted not before "type" or "value" are accessed
+        """
+        state = State(last_change=last_change)
+        state._raw = (state_type, state_text)
+        state._converted = False
+        return state
 
+    @staticmethod
+    def _convert_text(state_type: Optional[str], state_text: Optional[str]) -> tuple:
+        value = None
         try:
-            state.type = StateType.parse(state_type)
+            type_out = StateType.parse(state_type)
 
             if state_text:
                 if state_text in ['NULL', 'UNDEF']:
-                    state.value = None
-                elif state.type in [StateType.STRING, StateType.GROUP, StateType.UNKNOWN]:
-                    state.value = str(state_text)
-                elif state.type in [StateType.DECIMAL, StateType.DIMMER, StateType.ROLLERSHUTTER]:
-                    state.value = float(state_text)
-                elif state.type in [StateType.CONTACT, StateType.ONOFF, StateType.SWITCH]:
-                    state.value = OnOffValue.parse(state_text)
-                elif state.type == StateType.HSB:
-                    state.value = HsbValue.parse(state_text)
-                elif state.type == StateType.PERCENT:
-                    state.value = int(state_text)
-                elif state.type == StateType.UPDOWN:
-                    state.value = UpDownValue.parse(state_text)
-                elif state.type == StateType.THING_STATUS:
-                    state.value = ThingStatusValue.parse(state_text)
-                elif state.type == StateType.DATETIME:
-                    state.value = dateutil.parser.parse(state_text)
-                elif state.type == StateType.UNDEF:
-                    state.value = None
+                    value = None
+                elif type_out in [StateType.STRING, StateType.GROUP, StateType.UNKNOWN]:
+                    value = str(state_text)
+                elif type_out in [StateType.DECIMAL, StateType.DIMMER, StateType.ROLLERSHUTTER]:
+                    value = float(state_text)
+                elif type_out in [StateType.CONTACT, StateType.ONOFF, StateType.SWITCH]:
+                    value = OnOffValue.parse(state_text)
+                elif type_out == StateType.HSB:
+                    value = HsbValue.parse(state_text)
+                elif type_out == StateType.PERCENT:
+                    value = int(state_text)
+                elif type_out == StateType.UPDOWN:
+                    value = UpDownValue.parse(state_text)
+                elif type_out == StateType.THING_STATUS:
+                    value = ThingStatusValue.parse(state_text)
+                elif type_out == StateType.DATETIME:
+                    value = dateutil.parser.parse(state_text)
+                elif type_out == StateType.UNDEF:
+                    value = None
                 else:
-                    _logger.error('cannot convert - unknown state type: ', state_type)
+                    _logger.error('cannot convert - unknown state type: %s', state_type)
                     raise ValueError()
 
-        except ValueError:
-            state.type = StateType.UNKNOWN
-            state.value = str(state_text)
+        except (ValueError, OverflowError):
+            type_out = StateType.UNKNOWN
+            value = str(state_text)
 
-        state.update_last_change()
-
-        return state
+        return type_out, value
 
     # noinspection PyUnusedLocal
     @staticmethod
@@ -0,0 +1,59 @@
+import json
+
+try:
+    import orjson  # optional, much faster
+except ImportError:
+    orjson = None
+
+
+class JsonCodec:
+    """
+    JSON decoding/encoding for events, REST responses and persisted files. Uses "orjson" if installed,
+    otherwise falls back to the standard library.
+    """
+
+    BACKEND_JSON = 'json'
+    BACKEND_ORJSON = 'orjson'
+
+    # orjson.JSONDecodeError is derived from json.JSONDecodeError
+    DecodeError = json.JSONDecodeError
+
+    _backend = BACKEND_ORJSON if orjson else BACKEND_JSON
+
+    @classmethod
+    def get_backend(cls) -> str:
+        return cls._backend
+
+    @classmethod
+    def get_available_backends(cls) -> list:
+        backends = [cls.BACKEND_JSON]
+        if orjson:
+            backends.append(cls.BACKEND_ORJSON)
+        return backends
+
+    @classmethod
+    def set_backend(cls, backend: str) -> None:
+        """for benchmarks and tests"""
+        if backend not in cls.get_available_backends():
+            raise ValueError('json backend "{}" not available!'.format(backend))
+        cls._backend = backend
+
+    @classmethod
+    def loads(cls, data):
+        """
+        :param data: str or (utf-8) bytes
+        """
+        if cls._backend == cls.BACKEND_ORJSON:
+            return orjson.loads(data)
+        return json.loads(data)
+
+    @classmethod
+    def dumps(cls, data, pretty=False) -> str:
+        if cls._backend == cls.BACKEND_ORJSON:
+            option = orjson.OPT_NON_STR_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+            return orjson.dumps(data, option=option).decode('utf8')
+        if pretty:
+            return json.dumps(data, indent=4, sort_keys=True)
+        return json.dumps(data)
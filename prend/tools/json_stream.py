@@ -0,0 +1,83 @@
+import codecs
+import json
+
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser for a (large) JSON array, which arrives in chunks (e.g. REST responses). Delivers the elements
+    as soon as they are complete, so only the current element needs to be buffered instead of the whole document.
+    """
+
+    _WHITESPACE = ' \t\n\r'
+    MAX_ELEMENT_SIZE = 1048576
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._started = False
+        self._finished = False
+
+    def is_finished(self) -> bool:
+        """:return: True if the closing bracket was received"""
+        return self._finished
+
+    def feed(self, chunk: bytes) -> list:
+        """
+        :param chunk: next (utf-8) bytes of the document
+        :return: list of completed elements (maybe empty)
+        """
+        text = self._utf8.decode(chunk)
+        if self._pos > 65536 and self._pos * 2 > len(self._buffer):
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        self._buffer += text
+
+        elements = []
+        buffer = self._buffer
+        while not self._finished:
+            pos = self._skip_whitespace(buffer, self._pos)
+            if pos >= len(buffer):
+                self._pos = pos
+                break
+
+            char = buffer[pos]
+            if not self._started:
+                if char != '[':
+                    raise json.JSONDecodeError('array expected', buffer, pos)
+                self._started = True
+                self._pos = pos + 1
+                continue
+            if char == ',':
+                self._pos = pos + 1
+                continue
+            if char == ']':
+                self._finished = True
+                self._pos = pos + 1
+                break
+
+            try:
+                element, end = self._decoder.raw_decode(buffer, pos)
+                if not isinstance(element, (dict, list, str)):
+                    # numbers and literals may continue in the next chunk => complete if a delimiter follows
+                    pos_next = self._skip_whitespace(buffer, end)
+                    if pos_next >= len(buffer) or buffer[pos_next] not in ',]':
+                        raise json.JSONDecodeError('incomplete', buffer, pos_next)
+            except json.JSONDecodeError:
+                if len(buffer) - pos > self.MAX_ELEMENT_SIZE:
+                    raise  # not an incomplete element, but garbage
+                self._pos = pos
+                break  # incomplete => wait for more data
+
+            elements.append(element)
+            self._pos = end
+
+        return elements
+
+    @classmethod
+    def _skip_whitespace(cls, buffer: str, pos: int) -> int:
+        length = len(buffer)
+        while pos < length and buffer[pos] in cls._WHITESPACE:
+            pos += 1
+        return pos
@@ -1,11 +1,11 @@
 import copy
 import datetime
-import json
 import logging
 import os
 import os.path
 import threading
 import dateutil.parser
+from prend.tools.json_codec import JsonCodec
 
 
 _logger = logging.getLogger(__name__)
@@ -22,8 +22,8 @@ class Persister:
     def save(self, auto_save=False):
         with self._lock:
             if not auto_save or self._auto_save:
-                data_str = json.dumps(self._data, indent=4, sort_keys=True)
-                with open(self._path, "w+") as text_file:
+                data_str = JsonCodec.dumps(self._data, pretty=True)
+                with open(self._path, "w+", encoding="utf-8") as text_file:
                     text_file.write(data_str)
 
     def set_auto_save(self, auto_save):
@@ -32,8 +32,8 @@ class Persister:
 
     def load(self):
         with self._lock:
-            with open(self._path) as text_file:
-                self._data = json.load(text_file)
+            with open(self._path, 'rb') as text_file:
+                self._data = JsonCodec.loads(text_file.read())
 
     def set_value(self, key: str, value):
         if isinstance(value, (datetime.datetime, datetime.date)):
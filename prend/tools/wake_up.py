@@ -0,0 +1,37 @@
+import threading
+from typing import Optional
+
+
+class WakeUp:
+    """
+    Wake-up signal of the main loop: producers (observer, reload, sending threads) call "signal" after they have
+    queued something, the main loop blocks in "wait" till there is something to do or its next deadline has come.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._count_signals = 0
+        self._count_wake_ups = 0
+
+    def signal(self) -> None:
+        self._count_signals += 1  # statistics only, not synchronized
+        self._event.set()
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """
+        Signals, which arrive while the caller is processing, are kept => the next "wait" returns immediately.
+        :param timeout: seconds; None == till the next signal
+        :return: True if signaled, False on timeout
+        """
+        signaled = self._event.wait(timeout)
+        if signaled:
+            self._event.clear()  # the caller processes all queues afterwards
+        self._count_wake_ups += 1
+        return signaled
+
+    def pop_statistics(self) -> tuple:
+        """:return: tuple (count of signals, count of wake-ups) since last call"""
+        statistics = (self._count_signals, self._count_wake_ups)
+        self._count_signals = 0
+        self._count_wake_ups = 0
+        return statistics
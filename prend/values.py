@@ -7,6 +7,8 @@ _logger = logging.getLogger(__name__)
 
 
 class FormatToJson(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def format_to_json(self) -> str:
         """format value to json string
@@ -103,15 +105,40 @@ class UpDownValue(Enum):
 
 
 class HsbValue(FormatToJson):
+    """immutable value object (like State)"""
+
+    __slots__ = ('_hue', '_saturation', '_brightness')
 
     def __init__(self, hue, saturation, brightness):
-        self.hue = self.convert(hue)
-        self.saturation = self.convert(saturation)
-        self.brightness = self.convert(brightness)
+        self._hue = self.convert(hue)
+        self._saturation = self.convert(saturation)
+        self._brightness = self.convert(brightness)
 
     def __repr__(self) -> str:
         return '{}(h={},s={},b={})'.format(self.__class__.__name__, self.hue, self.saturation, self.brightness)
 
+    def __copy__(self) -> 'HsbValue':
+        return self
+
+    # noinspection PyUnusedLocal
+    def __deepcopy__(self, memo) -> 'HsbValue':
+        return self
+
+    def __hash__(self) -> int:
+        return hash((self._hue, self._saturation, self._brightness))
+
+    @property
+    def hue(self) -> int:
+        return self._hue
+
+    @property
+    def saturation(self) -> int:
+        return self._saturation
+
+    @property
+    def brightness(self) -> int:
+        return self._brightness
+
     def __eq__(self, other) -> bool:
         if not other:
             return False
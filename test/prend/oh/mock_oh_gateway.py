@@ -46,12 +46,12 @@ class MockOhGateway(OhGateway):
             raise TypeError(f"State expected, is'{type(state_in)}' instead!")
         channel = copy.deepcopy(channel_in)
         state = copy.deepcopy(state_in)
-        with self._lock_state:
+        with self._lock_state, self._lock_store:
             self._states[channel] = state
 
     def clear_state(self, channel: Channel):
         if channel:
-            with self._lock_state:
+            with self._lock_state, self._lock_store:
                 del self._states[channel]
 
     def set_item_state(self, channel_name, state: Optional[State]):
@@ -69,7 +69,7 @@ class MockOhGateway(OhGateway):
 
     def clear(self):
         self.clear_sent_actions()
-        with self._lock_state:
+        with self._lock_state, self._lock_store:
             self._states.clear()
 
     def cache_states(self):
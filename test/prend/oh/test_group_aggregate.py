@@ -0,0 +1,127 @@
+import unittest
+from prend.channel import Channel, ChannelType
+from prend.oh.group_aggregate import AggregateFunction, GroupAggregate, GroupAggregates
+from prend.oh.oh_event import OhNotificationType
+from prend.state import State, StateType
+from prend.values import OnOffValue
+
+
+class TestGroupAggregate(unittest.TestCase):
+
+    def test_numbers(self):
+        aggregate = GroupAggregate()
+        channels = [Channel.create_item('item{}'.format(i)) for i in range(4)]
+        for channel, value in zip(channels, [3, 1, 5, 1]):
+            aggregate.set_member(channel, value)
+        self.assertEqual(4, aggregate.get_value(AggregateFunction.COUNT))
+        self.assertEqual(10, aggregate.get_value(AggregateFunction.SUM))
+        self.assertEqual(1, aggregate.get_value(AggregateFunction.MIN))
+        self.assertEqual(5, aggregate.get_value(AggregateFunction.MAX))
+
+        # one of two minimums changes => no search
+        aggregate.set_member(channels[1], 2)
+        self.assertEqual(1, aggregate.get_value(AggregateFunction.MIN))
+        aggregate.set_member(channels[3], 4)
+        self.assertEqual(2, aggregate.get_value(AggregateFunction.MIN))
+
+        aggregate.remove_member(channels[2])
+        self.assertEqual(4, aggregate.get_value(AggregateFunction.MAX))
+        self.assertEqual(9, aggregate.get_value(AggregateFunction.SUM))
+
+        aggregate.set_member(channels[0], None)  # UNDEF
+        self.assertEqual(2, aggregate.get_value(AggregateFunction.COUNT))
+        self.assertEqual(6, aggregate.get_value(AggregateFunction.SUM))
+
+        for channel in channels:
+            aggregate.remove_member(channel)
+        self.assertEqual(0, aggregate.get_value(AggregateFunction.COUNT))
+        self.assertIsNone(aggregate.get_value(AggregateFunction.SUM))
+        self.assertIsNone(aggregate.get_value(AggregateFunction.MIN))
+        self.assertEqual(StateType.UNDEF, aggregate.get_state(AggregateFunction.MAX).type)
+
+    def test_sum_exact(self):
+        aggregate = GroupAggregate()
+        channels = [Channel.create_item('item{}'.format(i)) for i in range(3)]
+        aggregate.set_member(channels[0], 0.1)
+        aggregate.set_member(channels[1], 0.2)
+        self.assertEqual(0.1 + 0.2, aggregate.get_value(AggregateFunction.SUM))
+        aggregate.set_member(channels[0], 0.0)
+        aggregate.set_member(channels[1], 0.0)
+        self.assertEqual(0.0, aggregate.get_value(AggregateFunction.SUM))
+
+        # mixed with ints, many updates
+        aggregate.set_member(channels[2], 7)
+        for index in range(1000):
+            aggregate.set_member(channels[index % 2], index * 0.1)
+        aggregate.set_member(channels[0], 0.0)
+        aggregate.set_member(channels[1], 0.0)
+        self.assertEqual(7, aggregate.get_value(AggregateFunction.SUM))
+        self.assertEqual(State.create(StateType.DECIMAL, 7.0), aggregate.get_state(AggregateFunction.SUM))
+
+    def test_on(self):
+        aggregate = GroupAggregate()
+        aggregate.set_member(Channel.create_item('switch'), OnOffValue.ON)
+        aggregate.set_member(Channel.create_item('contact'), 'CLOSED')
+        self.assertEqual(1, aggregate.get_value(AggregateFunction.COUNT_ON))
+        self.assertEqual(OnOffValue.ON, aggregate.get_value(AggregateFunction.ANY_ON))
+        self.assertEqual(OnOffValue.OFF, aggregate.get_value(AggregateFunction.ALL_ON))
+
+        aggregate.set_member(Channel.create_item('contact'), 'OPEN')
+        self.assertEqual(2, aggregate.get_value(AggregateFunction.COUNT_ON))
+        self.assertEqual(OnOffValue.ON, aggregate.get_value(AggregateFunction.ALL_ON))
+        self.assertEqual(StateType.SWITCH, aggregate.get_state(AggregateFunction.ALL_ON).type)
+
+    def test_parse(self):
+        self.assertEqual(AggregateFunction.COUNT_ON, AggregateFunction.parse(' Count_On'))
+        self.assertIsNone(AggregateFunction.parse('avg'))
+
+
+class TestGroupAggregates(unittest.TestCase):
+
+    def test_membership(self):
+        aggregates = GroupAggregates()
+        window1, window2 = Channel.create_item('window1'), Channel.create_item('window2')
+        states = {window1: State.convert('Contact', 'OPEN'), window2: State.convert('Contact', 'CLOSED')}
+        aggregates.rebuild({window1: ['gWindows'], window2: ['gWindows', 'gUp']}, states)
+        self.assertEqual(['window1', 'window2'], sorted(c.name for c in aggregates.get_members('gWindows')))
+        version = aggregates.get_version()
+
+        channel = aggregates.subscribe('gWindows', AggregateFunction.COUNT_ON, states)
+        self.assertEqual(Channel.create(ChannelType.AGGREGATE, 'gWindows.count_on'), channel)
+        self.assertEqual(1, aggregates.get_state(channel).value)
+
+        # state change
+        states[window2] = State.convert('Contact', 'OPEN')
+        actions = aggregates.update_member(window2, states[window2])
+        self.assertEqual(1, len(actions))
+        self.assertEqual(OhNotificationType.AGGREGATE_CHANGE, actions[0].notification_type)
+        self.assertEqual((1, 2), (actions[0].state_old.value, actions[0].state_new.value))
+        self.assertEqual([], aggregates.update_member(window2, states[window2]))  # unchanged
+
+        # membership change (ItemUpdatedEvent)
+        actions = aggregates.set_member_groups(window1, ['gUp'], states[window1])
+        self.assertEqual(1, aggregates.get_state(channel).value)
+        self.assertEqual(1, len(actions))
+        self.assertEqual(['window2'], [c.name for c in aggregates.get_members('gWindows')])
+        self.assertNotEqual(version, aggregates.get_version())
+
+        # not aggregated groups
+        self.assertEqual([], aggregates.update_member(window1, states[window1]))
+
+        # reload
+        actions = aggregates.rebuild({window1: ['gWindows'], window2: ['gWindows']}, states)
+        self.assertEqual(2, aggregates.get_state(channel).value)
+        self.assertEqual(1, len(actions))
+
+    def test_groups_nested(self):
+        aggregates = GroupAggregates()
+        item = Channel.create_item('valTemp')
+        aggregates.rebuild({item: ['gLiving'],
+                            Channel.create(ChannelType.GROUP, 'gLiving'): ['gHouse'],
+                            Channel.create(ChannelType.GROUP, 'gHouse'): ['gLiving']}, {})  # cycle
+        self.assertEqual(frozenset(['gLiving', 'gHouse']), aggregates.get_groups_nested(item))
+        self.assertEqual(frozenset(), aggregates.get_groups_nested(Channel.create_item('other')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -126,6 +126,19 @@ class TestOhEventNotify(unittest.TestCase):
         ev_cmp = OhEvent.create(OhNotificationType.THING_CHANGE, oh_channel, oh_state)
         self.check_notify_event(str_in, ev_cmp)
 
+    def test_create_notify_item_lifecycle(self):
+        str_in = '{"topic":"smarthome/items/rawWinLara/updated","payload":"[{\\"type\\":\\"String\\",\\"name\\":\\"rawWinLara\\",\\"groupNames\\":[\\"gWindows\\"]},{\\"type\\":\\"String\\",\\"name\\":\\"rawWinLara\\",\\"groupNames\\":[]}]","type":"ItemUpdatedEvent"}'
+        event = OhEvent.create_from_notify_json(str_in)
+        self.assertEqual(OhNotificationType.RELOAD, event.notification_type)
+        self.assertEqual(Channel.create(ChannelType.ITEM, 'rawWinLara'), event.channel)
+        self.assertEqual(['gWindows'], event.group_names)
+
+        str_in = '{"topic":"smarthome/items/gWindows/removed","payload":"{\\"type\\":\\"Group\\",\\"name\\":\\"gWindows\\",\\"groupNames\\":[\\"gAll\\"]}","type":"ItemRemovedEvent"}'
+        event = OhEvent.create_from_notify_json(str_in)
+        self.assertEqual(Channel.create(ChannelType.GROUP, 'gWindows'), event.channel)
+        self.assertEqual([], event.group_names)
+        self.assertTrue(event.is_valid())
+
     def test_create_notify_hsb(self):
         str_in = '{"topic":"smarthome/items/valLiOfficeIris/statechanged","payload":"{\\\"type\\\":\\\"HSB\\\",\\\"value\\\":\\\"66,56,0\\\",\\\"oldType\\\":\\\"HSB\\\",\\\"oldValue\\\":\\\"66,56,56\\\"}","type":"ItemStateChangedEvent"}'
         oh_channel = Channel.create(ChannelType.ITEM, 'valLiOfficeIris')
@@ -153,6 +166,14 @@ class TestOhEventItemState(unittest.TestCase):
             print('check_oh_event failed with\n    json: {}\n    out : {}\n    cmp : {}'.format(json_data, str_out, ev_cmp))
         self.assertTrue(result)
 
+    def test_create_state_group_names(self):
+        json_data = {'state': 'OFF', 'type': 'Switch', 'name': 'valBattWinLara', 'groupNames': ['gRawWinDorsUp', 'gBattery']}
+        event = OhEvent.create_from_state_json(json_data, ChannelType.ITEM)
+        self.assertEqual(['gRawWinDorsUp', 'gBattery'], event.group_names)
+
+        event = OhEvent.create_from_state_json({'state': 'OFF', 'type': 'Switch', 'name': 'x'}, ChannelType.ITEM)
+        self.assertIsNone(event.group_names)
+
     def test_create_state_string(self):
         json_data = {'link': 'http://127.0.0.1:8080/rest/items/dummyString', 'state': 'NULL', 'editable': False, 'type': 'String', 'name': 'dummyString', 'category': 'settings', 'tags': [], 'groupNames': []}
         oh_channel = Channel.create(ChannelType.ITEM, 'dummyString')
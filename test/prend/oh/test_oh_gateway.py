@@ -1,9 +1,11 @@
 import copy
+import datetime
 import unittest
 
 from prend.action import Action
 from prend.channel import Channel, ChannelType
 from prend.dispatcher import DispatcherActionSink
+from prend.oh.group_aggregate import AggregateFunction
 from prend.oh.oh_event import OhEvent, OhNotificationType
 from prend.oh.oh_gateway import OhGateway
 from prend.oh.oh_rest import OhRest
@@ -39,7 +41,7 @@ class MockDispatcher(DispatcherActionSink):
     def register_cron_listener(self, cron_key: str, job, listener):
         pass
 
-    def register_oh_listener(self, channel, listeners) -> None:
+    def register_oh_listener(self, channel, listeners, min_interval=None) -> None:
         pass
 
 
@@ -114,8 +116,7 @@ class TestOhGateway(unittest.TestCase):
         self.assertEqual(0, len(states_comp))
 
         dispatcher.queued_actions.clear()
-        ev_update.state.value = OnOffValue.OFF
-        ev_update.state.update_last_change()
+        ev_update.state = ev_update.state.with_value(OnOffValue.OFF)
         gateway.push_event(ev_update)
         state_g3 = gateway.get_state(ev_update.channel)
         self.assertEqual(ev_update.state, state_g3)
@@ -129,6 +130,142 @@ class TestOhGateway(unittest.TestCase):
         gateway.push_event(ev_update)
         self.assertEqual(1, len(dispatcher.queued_actions))
 
+    def test_push_events(self):
+        dispatcher = MockDispatcher()
+        gateway = OhGateway()
+        gateway.set_dispatcher(dispatcher)
+
+        events = []
+        for index in range(5):
+            events.append(OhEvent.create(OhNotificationType.ITEM_CHANGE,
+                                         Channel.create(ChannelType.ITEM, 'item{}'.format(index)),
+                                         State.create(StateType.DECIMAL, index)))
+        events.append(OhEvent.create(OhNotificationType.RELOAD, None, None))
+        gateway.push_events(events)
+
+        self.assertEqual(5, len(gateway.get_states()))
+        self.assertEqual(5, len(dispatcher.queued_actions))
+
+        statistics = gateway.pop_push_statistics()
+        self.assertEqual(1, statistics.batches)
+        self.assertEqual(6, statistics.events)
+        self.assertEqual(6, statistics.batch_size_max)
+        print(statistics)
+
+        statistics = gateway.pop_push_statistics()
+        self.assertEqual(0, statistics.batches)
+
+    def test_cache_states_diff(self):
+        dispatcher = MockDispatcher()
+        rest = MockRest()
+        gateway = OhGateway()
+        gateway.set_dispatcher(dispatcher)
+        gateway.set_rest(rest)
+
+        def create_event(name, value):
+            return OhEvent.create(OhNotificationType.ITEM_CHANGE, Channel.create(ChannelType.ITEM, name),
+                                  State.create(StateType.DECIMAL, value))
+
+        gateway.push_events([create_event('unchanged', 1), create_event('updated', 1), create_event('deleted', 1)])
+        dispatcher.queued_actions.clear()
+
+        rest.dummy_events = [create_event('unchanged', 1), create_event('updated', 2), create_event('inserted', 3)]
+        gateway.cache_states()
+
+        statistics = gateway.get_reload_statistics()
+        self.assertEqual((3, 1, 1, 1, 3), (statistics.read, statistics.inserted, statistics.updated,
+                                           statistics.deleted, statistics.count))
+        self.assertFalse(statistics.concurrent_writes)
+        self.assertEqual(['inserted', 'updated'], sorted(c.name for c in dispatcher.queued_actions))
+        self.assertEqual(1, dispatcher.queued_actions[Channel.create_item('updated')].state_old.value)
+        self.assertEqual(2, gateway.get_item_state_value('updated'))
+        self.assertIsNone(gateway.get_item_state('deleted'))
+
+    def test_cache_states_concurrent_write(self):
+        dispatcher = MockDispatcher()
+        rest = MockRest()
+        event_observer = OhEvent.create(OhNotificationType.ITEM_CHANGE, Channel.create_item('item1'),
+                                        State.create(StateType.DECIMAL, 5))
+
+        class ConcurrentOhGateway(OhGateway):
+            def _diff_states(self, snapshot, events, statistics):
+                result = super()._diff_states(snapshot, events, statistics)
+                self.push_event(event_observer)  # observer writes while diffing
+                return result
+
+        gateway = ConcurrentOhGateway()
+        gateway.set_dispatcher(dispatcher)
+        gateway.set_rest(rest)
+        rest.dummy_events = [
+            OhEvent.create(OhNotificationType.ITEM_CHANGE, Channel.create_item('item1'),
+                           State.create(StateType.DECIMAL, 1, datetime.datetime.now() - datetime.timedelta(1))),
+            OhEvent.create(OhNotificationType.ITEM_CHANGE, Channel.create_item('item2'),
+                           State.create(StateType.DECIMAL, 2))
+        ]
+        gateway.cache_states()
+
+        self.assertTrue(gateway.get_reload_statistics().concurrent_writes)
+        self.assertEqual(5, gateway.get_item_state_value('item1'))
+        self.assertEqual(2, gateway.get_item_state_value('item2'))
+        self.assertEqual(5, dispatcher.queued_actions[Channel.create_item('item1')].state_new.value)
+
+    def test_group_aggregates(self):
+        dispatcher = MockDispatcher()
+        rest = MockRest()
+        gateway = OhGateway()
+        gateway.set_dispatcher(dispatcher)
+        gateway.set_rest(rest)
+
+        def create_event(name, value, group_names=None):
+            event = OhEvent.create(OhNotificationType.ITEM_CHANGE, Channel.create_item(name),
+                                   State.create(StateType.DECIMAL, value))
+            event.group_names = group_names
+            return event
+
+        rest.dummy_events = [create_event('power1', 100, ['gPower']), create_event('power2', 50, ['gPower']),
+                             create_event('other', 10, [])]
+        gateway.cache_states()
+        channel = gateway.register_group_aggregate('gPower', AggregateFunction.SUM)
+        self.assertEqual(150, gateway.get_state_value(channel))
+        dispatcher.queued_actions.clear()
+
+        gateway.push_event(create_event('power2', 70))
+        self.assertEqual(170, dispatcher.queued_actions[channel].state_new.value)
+        self.assertEqual(150, dispatcher.queued_actions[channel].state_old.value)
+
+        # membership updated by openhab
+        event = OhEvent.create(OhNotificationType.RELOAD, Channel.create_item('other'), None)
+        event.group_names = ['gPower']
+        gateway.push_event(event)
+        self.assertEqual(180, gateway.get_state_value(channel))
+        self.assertEqual(['other', 'power1', 'power2'], sorted(c.name for c in gateway.get_group_members('gPower')))
+        self.assertEqual(3, len(gateway.expand_group_aggregates([channel])))
+
+    def test_history(self):
+        gateway = OhGateway()
+        gateway.set_dispatcher(MockDispatcher())
+        channel = Channel.create_item('power')
+        gateway.enable_history(channel, 3)
+
+        for value in [1, 1, 2, 6, 4]:  # unchanged states are not recorded
+            gateway.push_event(OhEvent.create(OhNotificationType.ITEM_CHANGE, channel,
+                                              State.create(StateType.DECIMAL, value)))
+        self.assertEqual([2.0, 6.0, 4.0], [value for _, value in gateway.get_history(channel)])
+        self.assertEqual(4.0, gateway.get_history_aggregates(channel).mean)
+        self.assertEqual(1, gateway.get_history_memory()[0])
+
+    def test_read_while_writing(self):
+        gateway = OhGateway()
+        gateway.set_dispatcher(MockDispatcher())
+        channel = Channel.create_item('item')
+        gateway.push_event(OhEvent.create(OhNotificationType.ITEM_CHANGE, channel, State.create(StateType.DECIMAL, 1)))
+
+        # a writer (observer batch, reload) holds the writer lock => readers don't wait for it
+        with gateway._lock_state:  # pylint: disable=protected-access
+            self.assertEqual(1, len(gateway.get_states()))
+            self.assertEqual([channel], gateway.query_channels(state_type=StateType.DECIMAL))
+            self.assertEqual(1, gateway.get_state_value(channel))
+
     def test_get_states(self):
 
         gateway = MockOhGateway()
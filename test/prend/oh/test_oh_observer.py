@@ -10,14 +10,19 @@ from prend.state import State, StateType
 class TestEventSink(OhGatewayEventSink):
     def __init__(self):
         self.list = []
+        self.reload_requested = False
 
     def push_event(self, event: OhEvent) -> None:
         self.list.append(event)
 
+    def request_reload(self) -> None:
+        self.reload_requested = True
+
 
 class MockNotificationEvent:
-    def __init__(self, data):
+    def __init__(self, data, event_id=None):
         self.data = data
+        self.id = event_id
 
 
 class TestOhObserver(unittest.TestCase):
@@ -49,6 +54,16 @@ class TestOhObserver(unittest.TestCase):
         ev_cmp = OhEvent.create(OhNotificationType.ITEM_CHANGE, oh_channel, oh_state)
         self.check_handle_event(str_in, ev_cmp)
 
+    def test_handle_events(self):
+        # noinspection PyPep8
+        str_in = '{"topic":"smarthome/items/valSockMeasPower/state","payload":"{\\\"type\\\":\\\"Decimal\\\",\\\"value\\\":\\\"109.01\\\"}","type":"ItemStateEvent"}'  # noqa
+        events_in = [MockNotificationEvent(str_in), MockNotificationEvent('invalid event!'),
+                     MockNotificationEvent(str_in)]
+
+        self.event_sink.list.clear()
+        self.observer._handle_events(events_in)
+        self.assertEqual(2, len(self.event_sink.list))
+
     def test_handle_event_invalid(self):
         # exception will occur, but should be catched! no crash!
         self.check_handle_event('invalid event!', None)
@@ -59,6 +74,115 @@ class TestOhObserver(unittest.TestCase):
         str_in = '{"topic":"xxx","type":"FirmwareStatusInfoEvent"}'
         self.check_handle_event(str_in, None)
 
+    def test_build_topics(self):
+        channels = [Channel.create(ChannelType.THING, 'hue:0200:1:hueOfficeIris'),
+                    Channel.create(ChannelType.ITEM, 'valSockMeasPower'),
+                    Channel.create(ChannelType.GROUP, 'gsLightsKids')]
+        topics = OhObserver.build_topics(channels).split(',')
+
+        for topic in OhObserver.LIFECYCLE_TOPICS:
+            self.assertTrue(topic in topics)
+        self.assertTrue('smarthome/items/valSockMeasPower/*' in topics)
+        self.assertTrue('smarthome/items/gsLightsKids/*' in topics)
+        self.assertTrue('smarthome/things/hue:0200:1:hueOfficeIris/*' in topics)
+        self.assertEqual(len(OhObserver.LIFECYCLE_TOPICS) + 3, len(topics))
+
+    def test_event_statistics(self):
+        # noinspection PyPep8
+        str_in = '{"topic":"smarthome/items/valSockMeasPower/state","payload":"{\\\"type\\\":\\\"Decimal\\\",\\\"value\\\":\\\"109.01\\\"}","type":"ItemStateEvent"}'  # noqa
+        self.observer.set_subscribed_channels([Channel.create(ChannelType.ITEM, 'otherItem')])
+        self.observer._handle_event(MockNotificationEvent(str_in))
+
+        self.observer.set_subscribed_channels([Channel.create(ChannelType.ITEM, 'valSockMeasPower')])
+        self.observer._handle_event(MockNotificationEvent(str_in))
+
+        self.assertEqual(2, self.observer._stat_events)
+        self.assertEqual(1, self.observer._stat_unsubscribed)
+
+        rate_events, rate_unsubscribed = self.observer.pop_event_statistics()
+        self.assertTrue(rate_events >= rate_unsubscribed)
+        self.assertEqual(0, self.observer._stat_events)
+
+    def test_resume(self):
+        # noinspection PyPep8
+        str_in = '{"topic":"smarthome/items/valSockMeasPower/state","payload":"{\\\"type\\\":\\\"Decimal\\\",\\\"value\\\":\\\"109.01\\\"}","type":"ItemStateEvent"}'  # noqa
+
+        self.assertFalse(self.observer.can_resume())
+        self.observer._handle_events([MockNotificationEvent(str_in, '41'), MockNotificationEvent(str_in, '42')])
+        self.assertTrue(self.observer.can_resume())
+        self.assertEqual('42', self.observer.get_last_event_id())
+
+        # gap replayed
+        observer = OhObserver(Config(), self.event_sink)
+        observer.set_resume_event_id('42')
+        observer._resume_pending = True
+        observer._handle_events([MockNotificationEvent(str_in, '43')])
+        self.assertFalse(self.event_sink.reload_requested)
+        self.assertFalse(observer._resume_pending)
+        observer._check_resume_timeout()
+        self.assertFalse(self.event_sink.reload_requested)
+
+        # gap not replayed
+        observer = OhObserver(Config(), self.event_sink)
+        observer.set_resume_event_id('42')
+        observer._resume_pending = True
+        observer._handle_events([MockNotificationEvent(str_in, '50')])
+        self.assertTrue(self.event_sink.reload_requested)
+
+        # nothing received
+        self.event_sink.reload_requested = False
+        observer = OhObserver(Config(), self.event_sink)
+        observer.set_resume_event_id('42')
+        observer._resume_pending = True
+        observer._check_resume_timeout()
+        self.assertTrue(self.event_sink.reload_requested)
+
+    def test_is_successor_event_id(self):
+        self.assertTrue(OhObserver.is_successor_event_id('42', '43'))
+        self.assertFalse(OhObserver.is_successor_event_id('42', '44'))
+        self.assertFalse(OhObserver.is_successor_event_id('42', None))
+        self.assertFalse(OhObserver.is_successor_event_id(None, '43'))
+        self.assertFalse(OhObserver.is_successor_event_id('OhObserver4711', '43'))
+
+        self.assertTrue(OhObserver.is_successor_event_id('42', '44', filtered=True))
+        self.assertFalse(OhObserver.is_successor_event_id('42', '42', filtered=True))
+        self.assertFalse(OhObserver.is_successor_event_id('42', '41', filtered=True))
+        self.assertFalse(OhObserver.is_successor_event_id('42', None, filtered=True))
+
+    def test_resume_filtered(self):
+        # noinspection PyPep8
+        str_in = '{"topic":"smarthome/items/valSockMeasPower/state","payload":"{\\\"type\\\":\\\"Decimal\\\",\\\"value\\\":\\\"109.01\\\"}","type":"ItemStateEvent"}'  # noqa
+        config = Config()
+        config.oh_observer_topic_filter = True
+        channels = [Channel.create(ChannelType.ITEM, 'valSockMeasPower')]
+
+        # events of other topics were filtered out by the server => gap in the ids, but resumed
+        observer = OhObserver(config, self.event_sink)
+        observer.set_subscribed_channels(channels)
+        observer.set_resume_event_id('42')
+        observer._resume_pending = True
+        observer._handle_events([MockNotificationEvent(str_in, '50')])
+        self.assertFalse(self.event_sink.reload_requested)
+        self.assertFalse(observer._resume_pending)
+        self.assertEqual('50', observer.get_last_event_id())
+
+        # server restarted (ids start again)
+        observer = OhObserver(config, self.event_sink)
+        observer.set_subscribed_channels(channels)
+        observer.set_resume_event_id('42')
+        observer._resume_pending = True
+        observer._handle_events([MockNotificationEvent(str_in, '3')])
+        self.assertTrue(self.event_sink.reload_requested)
+
+        # nothing received
+        self.event_sink.reload_requested = False
+        observer = OhObserver(config, self.event_sink)
+        observer.set_subscribed_channels(channels)
+        observer.set_resume_event_id('42')
+        observer._resume_pending = True
+        observer._check_resume_timeout()
+        self.assertTrue(self.event_sink.reload_requested)
+
 
 # todo
 # self.check_parse(OhNotificationType.RELOAD,
@@ -6,7 +6,7 @@ import unittest
 from prend.channel import Channel, ChannelType
 from prend.oh.oh_event import OhEvent, OhNotificationType
 from prend.oh.oh_gateway import OhGatewayEventSink
-from prend.oh.oh_rest import OhRest
+from prend.oh.oh_rest import OhRest, OhRestException
 from prend.oh.oh_send_data import OhSendData, OhSendFlags
 from prend.state import State, StateType
 from prend.values import OnOffValue, ThingStatusValue
@@ -21,6 +21,41 @@ class TestEventSink(OhGatewayEventSink):
         self.list.append(event)
 
 
+class MockStreamResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+        self.status_code = 200
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def iter_content(self, chunk_size):
+        for pos in range(0, len(self.content), 7):  # tiny chunks
+            yield self.content[pos:pos + 7]
+
+
+class MockStreamSession:
+    def __init__(self, content: bytes):
+        self.content = content
+        self.requests = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def get(self, url, **kwargs):
+        self.requests.append((url, kwargs))
+        return MockStreamResponse(self.content)
+
+
 class TestOhRest(unittest.TestCase):
 
     # from test.setup_test import SetupTest
@@ -107,6 +142,41 @@ class TestOhRest(unittest.TestCase):
         ev_cmp = OhEvent.create(OhNotificationType.GROUP_CHANGE, channel, state)
         self.check_fetch_event(ev_out, ev_cmp)
 
+    # pylint: disable=protected-access
+    def test_fetch_items_stream(self):
+        # noinspection PyPep8
+        content = b'[{"state":"ON","type":"Switch","name":"dummySwitch"},{"state":"NULL","type":"Group","name":"gMarc"}]'  # noqa
+        rest = OhRest(SetupTest.get_config())
+        session = MockStreamSession(content)
+        rest._create_session = lambda: session
+
+        # not open
+        with self.assertRaises(OhRestException):
+            rest.fetch_items([])
+
+        rest.open()
+        events = []
+        rest.fetch_items(events)
+        self.assertEqual(['dummySwitch', 'gMarc'], [e.channel.name for e in events])
+        self.assertEqual(OhNotificationType.GROUP_CHANGE, events[1].notification_type)
+
+        url, kwargs = session.requests[0]
+        self.assertTrue(url.endswith('/items/'))
+        self.assertEqual(OhRest.ITEM_PARAMS, kwargs['params'])
+        self.assertTrue(kwargs['stream'])
+
+        # incomplete
+        session.content = content[:-1]
+        with self.assertRaises(OhRestException):
+            rest.fetch_items([])
+
+        # closed
+        rest.close()
+        with self.assertRaises(OhRestException):
+            rest.fetch_items([])
+        with self.assertRaises(OhRestException):
+            rest._req_put('/items/dummySwitch/state', b'ON')
+
     def test_fetch_thing(self):
         rest = OhRest(SetupTest.get_config())
         time_start_loading = datetime.datetime.now()
@@ -0,0 +1,68 @@
+import unittest
+from prend.oh.aiosseclient import Event
+from prend.oh.sse_parser import SseParser
+
+
+class TestSseParser(unittest.TestCase):
+
+    # noinspection PyPep8
+    NOTIFICATION = 'data: {"topic":"smarthome/items/valSockMeasPower/state","payload":"{\\"type\\":\\"Decimal\\",\\"value\\":\\"109.01\\"}","type":"ItemStateEvent"}\n\n'  # noqa
+
+    def check_events(self, events_out, events_cmp):
+        self.assertEqual(len(events_cmp), len(events_out))
+        for event_out, event_cmp in zip(events_out, events_cmp):
+            self.assertEqual(event_cmp.data, event_out.data)
+            self.assertEqual(event_cmp.event, event_out.event)
+            self.assertEqual(event_cmp.id, event_out.id)
+            self.assertEqual(event_cmp.retry, event_out.retry)
+
+    def check_stream(self, stream: str, frames_cmp: list):
+        events_cmp = [Event.parse(frame) for frame in frames_cmp]
+        data = stream.encode('utf8')
+
+        # at once
+        parser = SseParser()
+        self.check_events(parser.feed(data), events_cmp)
+
+        # split at every position
+        for split in range(1, len(data)):
+            parser = SseParser()
+            events_out = parser.feed(data[:split]) + parser.feed(data[split:])
+            self.check_events(events_out, events_cmp)
+
+        # byte by byte
+        parser = SseParser()
+        events_out = []
+        for pos in range(len(data)):
+            events_out.extend(parser.feed(data[pos:pos + 1]))
+        self.check_events(events_out, events_cmp)
+
+    def test_single_data(self):
+        self.check_stream(self.NOTIFICATION, [self.NOTIFICATION])
+        self.check_stream(self.NOTIFICATION * 3, [self.NOTIFICATION] * 3)
+        self.check_stream('data:no space\n\n', ['data:no space\n'])
+
+    def test_ok_and_comments(self):
+        self.check_stream(':ok\n\n' + self.NOTIFICATION, [self.NOTIFICATION])
+        self.check_stream(': comment\ndata: abc\n\n', ['data: abc\n'])
+        self.check_stream(':ok\n\n\n\n', [])
+
+    def test_multi_line(self):
+        stream = 'id: 42\nevent: update\nretry: 3000\ndata: line1\ndata: line2\n\n'
+        self.check_stream(stream, [stream])
+
+        parser = SseParser()
+        events = parser.feed(stream.encode('utf8'))
+        self.assertEqual('line1\nline2', events[0].data)
+        self.assertEqual('42', parser.last_event_id)
+
+    def test_line_breaks(self):
+        self.check_stream('data: abc\r\n\r\ndata: def\r\rdata: ghi\n\n', ['data: abc\n', 'data: def\n', 'data: ghi\n'])
+
+    def test_utf8(self):
+        stream = 'data: 3,4°C / 56%\n\n'
+        self.check_stream(stream, [stream])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import datetime
+import os
+import unittest
+from dateutil.tz import tzoffset
+from prend.channel import Channel, ChannelType
+from prend.dispatcher import DispatcherActionSink
+from prend.oh.oh_gateway import OhGateway
+from prend.oh.state_cache_file import StateCacheFile
+from prend.state import State, StateType
+from prend.values import HsbValue, OnOffValue, ThingStatusValue
+from test.setup_test import SetupTest
+
+
+class TestStateCacheFile(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_file = StateCacheFile.create(SetupTest.ensure_work_dir())
+        if os.path.isfile(self.cache_file.get_path()):
+            os.remove(self.cache_file.get_path())
+
+    def test_save_load(self):
+        states = {
+            Channel.create_item('valDecimal'): State.convert('Number', '12.5'),
+            Channel.create_item('valSwitch'): State.create(StateType.SWITCH, OnOffValue.ON),
+            Channel.create_item('valColor'): State.create(StateType.HSB, HsbValue(10, 20, 30)),
+            Channel.create_item('valUndef'): State.create(StateType.DIMMER, None),
+            Channel.create_item('valTime'): State.create(StateType.DATETIME, datetime.datetime(
+                2018, 12, 3, 13, 7, 45, tzinfo=tzoffset(None, 3600))),
+            Channel.create(ChannelType.GROUP, 'gAll'): State.create(StateType.GROUP, 'abc'),
+            Channel.create(ChannelType.THING, 'hue:0200:1:lamp'): State.create(
+                StateType.THING_STATUS, ThingStatusValue.ONLINE),
+        }
+        gateway = OhGateway()
+        gateway.restore_states(states)
+
+        self.assertEqual(len(states), self.cache_file.save(gateway.get_states()))
+        time_saved = datetime.datetime.now()
+
+        states_out = self.cache_file.load()
+        self.assertEqual(len(states), len(states_out))
+        for channel, state in states.items():
+            self.assertEqual(state, states_out[channel])
+            self.assertTrue(states_out[channel].last_change <= time_saved)
+
+    def test_load_invalid(self):
+        self.assertEqual({}, self.cache_file.load())  # no file
+
+        with open(self.cache_file.get_path(), 'w') as text_file:
+            text_file.write('{"invalid json')
+        self.assertEqual({}, self.cache_file.load())
+
+    def test_restore_stale(self):
+        gateway = OhGateway()
+        gateway.set_dispatcher(DispatcherActionSink())
+        channel = Channel.create_item('valDecimal')
+        with gateway._lock_state:  # pylint: disable=protected-access
+            gateway._states[channel] = State.create(StateType.DECIMAL, 2.0)  # pylint: disable=protected-access
+
+        count = gateway.restore_states({channel: State.create(StateType.DECIMAL, 1.0),
+                                        Channel.create_item('other'): State.create(StateType.DECIMAL, 3.0)})
+        self.assertEqual(1, count)
+        self.assertTrue(gateway.is_stale())
+        self.assertEqual(2.0, gateway.get_state_value(channel))  # newer state kept
+
+
+if __name__ == '__main__':
+    unittest.main()
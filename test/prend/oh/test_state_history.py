@@ -0,0 +1,84 @@
+import random
+import unittest
+from prend.channel import Channel
+from prend.oh.state_history import HistoryBuffer, StateHistory, StateHistoryException
+from prend.state import State, StateType
+
+
+class TestHistoryBuffer(unittest.TestCase):
+
+    def test_ring(self):
+        buffer = HistoryBuffer(3)
+        for index, value in enumerate([5, 1, 3, 2]):
+            buffer.append(float(index), value)
+
+        self.assertEqual(3, len(buffer))
+        self.assertEqual([(1.0, 1.0), (2.0, 3.0), (3.0, 2.0)], buffer.get_items())
+        self.assertEqual([(2.0, 3.0), (3.0, 2.0)], buffer.get_items(since=1.5))
+        self.assertEqual([], buffer.get_items(since=4))
+
+        aggregates = buffer.get_aggregates()
+        self.assertEqual((3, 6.0, 2.0, 1.0, 3.0),
+                         (aggregates.count, aggregates.sum, aggregates.mean, aggregates.min, aggregates.max))
+
+        buffer.append(4.0, 4)  # evicts the minimum
+        aggregates = buffer.get_aggregates()
+        self.assertEqual((2.0, 4.0, 9.0), (aggregates.min, aggregates.max, aggregates.sum))
+
+    def test_max_age(self):
+        buffer = HistoryBuffer(10, max_age=5)
+        for index in range(10):
+            buffer.append(float(index), index)
+        buffer.expire(10.0)
+        self.assertEqual([5.0, 6.0, 7.0, 8.0, 9.0], [value for _, value in buffer.get_items()])
+        self.assertEqual(5.0, buffer.get_aggregates().min)
+
+        buffer.expire(100.0)
+        aggregates = buffer.get_aggregates()
+        self.assertEqual((0, 0.0, None, None), (aggregates.count, aggregates.sum, aggregates.mean, aggregates.min))
+
+    def test_aggregates_random(self):
+        rand = random.Random(4711)
+        buffer = HistoryBuffer(7)
+        values = []
+        for index in range(200):
+            value = rand.randint(-50, 50)
+            buffer.append(float(index), value)
+            values = (values + [value])[-7:]
+            aggregates = buffer.get_aggregates()
+            self.assertEqual((min(values), max(values)), (aggregates.min, aggregates.max))
+            self.assertAlmostEqual(sum(values), aggregates.sum)
+
+
+class TestStateHistory(unittest.TestCase):
+
+    def test_record(self):
+        history = StateHistory(1024)
+        channel = Channel.create_item('power')
+        self.assertFalse(history.record(channel, State.create(StateType.DECIMAL, 1)))  # not enabled
+
+        history.enable(channel, 10)
+        self.assertTrue(history.record(channel, State.create(StateType.DECIMAL, 1), 1.0))
+        self.assertTrue(history.record(channel, State.convert('Number', '2.5'), 2.0))
+        self.assertFalse(history.record(channel, State.create(StateType.UNDEF, None), 3.0))
+        self.assertFalse(history.record(channel, State.create(StateType.STRING, 'text'), 4.0))
+        self.assertEqual([(1.0, 1.0), (2.0, 2.5)], history.get_history(channel))
+        self.assertEqual(1.75, history.get_aggregates(channel).mean)
+        self.assertIsNone(history.get_aggregates(Channel.create_item('other')))
+
+        # resize keeps the latest entries
+        history.enable(channel, 1)
+        self.assertEqual([(2.0, 2.5)], history.get_history(channel))
+
+    def test_memory_limit(self):
+        history = StateHistory(100 * HistoryBuffer.ITEM_SIZE)
+        history.enable(Channel.create_item('a'), 60)
+        with self.assertRaises(StateHistoryException):
+            history.enable(Channel.create_item('b'), 60)
+        history.enable(Channel.create_item('a'), 50)
+        history.enable(Channel.create_item('b'), 50)
+        self.assertEqual(100 * HistoryBuffer.ITEM_SIZE, history.get_memory())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from prend.channel import Channel, ChannelType
+from prend.oh.state_index import StateIndex
+from prend.oh.state_store import StateStore
+from prend.state import State, StateType
+from prend.values import OnOffValue, ThingStatusValue
+
+
+class TestStateIndex(unittest.TestCase):
+
+    @staticmethod
+    def create_item(name):
+        return Channel.create(ChannelType.ITEM, name)
+
+    @staticmethod
+    def names(channels):
+        return sorted(c.name for c in channels)
+
+    def setUp(self):
+        self.store = StateStore(StateIndex())
+        self.index = self.store.get_index()
+
+        self.store[self.create_item('lightKitchen')] = State.convert('Switch', 'ON')
+        self.store[self.create_item('lightLiving')] = State.convert('Switch', 'OFF')
+        self.store[self.create_item('lightBath')] = State.convert('Switch', 'ON')
+        self.store[self.create_item('tempKitchen')] = State.convert('Number', '21.5')
+        self.store[self.create_item('windowKitchen')] = State.convert('Contact', 'OPEN')
+        self.store[Channel.create(ChannelType.GROUP, 'lights')] = State.convert('Group', 'ON')
+        self.store[Channel.create(ChannelType.THING, 'zwave:1')] = State.create(StateType.THING_STATUS,
+                                                                                ThingStatusValue.ONLINE)
+
+    def test_query(self):
+        self.assertEqual(7, len(self.index))
+        self.assertEqual(7, len(self.index.query()))
+
+        self.assertEqual(['lightBath', 'lightKitchen', 'lightLiving', 'tempKitchen', 'windowKitchen'],
+                         self.names(self.index.query(channel_type=ChannelType.ITEM)))
+        self.assertEqual(['tempKitchen'], self.names(self.index.query(state_type=StateType.DECIMAL)))
+        self.assertEqual(['lightBath', 'lightKitchen', 'lightLiving', 'lights'],
+                         self.names(self.index.query(name_prefix='light')))
+        self.assertEqual(['lightBath', 'lightKitchen', 'lightLiving'],
+                         self.names(self.index.query(ChannelType.ITEM, name_prefix='light')))
+        self.assertEqual(['lightBath', 'lightKitchen'],
+                         self.names(self.index.query(name_prefix='light', value=OnOffValue.ON)))
+        self.assertEqual(['windowKitchen'], self.names(self.index.query(value='OPEN')))
+        self.assertEqual(['windowKitchen'], self.names(self.index.query(state_type=StateType.CONTACT, value='OPEN')))
+        self.assertEqual(['windowKitchen'], self.names(self.index.query(state_type=StateType.CONTACT)))
+        self.assertEqual([], self.index.query(state_type=StateType.CONTACT, value='CLOSED'))
+        self.assertEqual([], self.index.query(state_type=StateType.CONTACT, value=OnOffValue.ON))
+        self.assertEqual(['lightBath', 'lightKitchen'],
+                         self.names(self.index.query(state_type=StateType.SWITCH, value='ON')))
+        self.assertEqual(['zwave:1'], self.names(self.index.query(value=ThingStatusValue.ONLINE)))
+        self.assertEqual([], self.index.query(name_prefix='x'))
+        self.assertEqual([], self.index.query(state_type=StateType.HSB))
+
+    def test_query_prefix_filter(self):
+        # more prefix matches than the other criteria deliver => prefix is checked per channel
+        for i in range(10):
+            self.store[self.create_item('lightExtra{}'.format(i))] = State.convert('Switch', 'OFF')
+        self.assertEqual(['lightLiving'], self.names(self.index.query(state_type=StateType.SWITCH,
+                                                                      name_prefix='lightL', value=OnOffValue.OFF)))
+        self.assertEqual(['lightBath', 'lightKitchen'],
+                         self.names(self.index.query(name_prefix='light', value=OnOffValue.ON)))
+
+    def test_update(self):
+        # value changes move the channel between the value indexes
+        self.store[self.create_item('lightBath')] = State.convert('Switch', 'OFF')
+        self.assertEqual(['lightKitchen'], self.names(self.index.query(ChannelType.ITEM, value=OnOffValue.ON)))
+        self.assertEqual(['lightBath', 'lightLiving'], self.names(self.index.query(value=OnOffValue.OFF)))
+
+        # numbers are not converted for indexing
+        state = State.convert('Number', '22')
+        self.store[self.create_item('tempKitchen')] = state
+        self.assertFalse(state.is_converted())
+        self.assertEqual(['tempKitchen'], self.names(self.index.query(state_type=StateType.DECIMAL)))
+
+        del self.store[self.create_item('lightKitchen')]
+        self.assertEqual([], self.index.query(ChannelType.ITEM, value=OnOffValue.ON))
+        self.assertEqual(['lightBath', 'lightLiving', 'lights'], self.names(self.index.query(name_prefix='light')))
+        self.assertEqual(6, len(self.index))
+
+    def test_replace_all(self):
+        data = self.store.snapshot().copy()
+        del data[self.create_item('lightLiving')]
+        data[self.create_item('lightKitchen')] = State.convert('Switch', 'OFF')
+        data[self.create_item('lightHall')] = State.convert('Switch', 'ON')
+        self.store.replace_all(data)
+
+        self.assertEqual(['lightBath', 'lightHall'],
+                         self.names(self.index.query(ChannelType.ITEM, value=OnOffValue.ON)))
+        self.assertEqual(['lightKitchen'], self.names(self.index.query(value=OnOffValue.OFF)))
+        self.assertEqual(['lightBath', 'lightHall', 'lightKitchen', 'lights'],
+                         self.names(self.index.query(name_prefix='light')))
+
+        self.store.clear()
+        self.assertEqual(0, len(self.index))
+        self.assertEqual([], self.index.query(name_prefix='light'))
+
+
+if __name__ == '__main__':
+    unittest.main()
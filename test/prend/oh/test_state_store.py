@@ -0,0 +1,76 @@
+import unittest
+from prend.channel import Channel, ChannelType
+from prend.oh.state_index import StateIndex
+from prend.oh.state_store import StateStore
+from prend.state import State, StateType
+
+
+class TestStateStore(unittest.TestCase):
+
+    @staticmethod
+    def create_channel(name):
+        return Channel.create(ChannelType.ITEM, name)
+
+    def test_snapshot(self):
+        store = StateStore()
+        store[self.create_channel('a')] = State.create(StateType.DECIMAL, 1)
+        store[self.create_channel('b')] = State.create(StateType.DECIMAL, 2)
+        version = store.get_version()
+
+        snapshot = store.snapshot()
+        self.assertEqual(version, snapshot.version)
+        self.assertEqual(2, len(snapshot))
+
+        # store changes => snapshot stays consistent
+        store[self.create_channel('a')] = State.create(StateType.DECIMAL, 10)
+        store[self.create_channel('c')] = State.create(StateType.DECIMAL, 3)
+        del store[self.create_channel('b')]
+        self.assertNotEqual(version, store.get_version())
+
+        self.assertEqual(1, snapshot[self.create_channel('a')].value)
+        self.assertEqual(2, snapshot.get(self.create_channel('b')).value)
+        self.assertFalse(self.create_channel('c') in snapshot)
+        self.assertEqual(['a', 'b'], sorted(c.name for c in snapshot))
+
+        self.assertEqual(10, store.get(self.create_channel('a')).value)
+        self.assertIsNone(store.get(self.create_channel('b')))
+        self.assertEqual(2, len(store))
+
+        store.clear()
+        self.assertEqual(0, len(store))
+        self.assertEqual(2, len(snapshot))
+
+    def test_snapshot_modified(self):
+        store = StateStore()
+        store[self.create_channel('a')] = State.create(StateType.DECIMAL, 1)
+
+        snapshot = store.snapshot()
+        del snapshot[self.create_channel('a')]
+        snapshot[self.create_channel('b')] = State.create(StateType.DECIMAL, 2)
+
+        self.assertEqual(1, store[self.create_channel('a')].value)
+        self.assertFalse(self.create_channel('b') in store)
+        self.assertEqual(['b'], [c.name for c in snapshot])
+
+    def test_replaced(self):
+        store = StateStore(StateIndex())
+        store[self.create_channel('a')] = State.create(StateType.DECIMAL, 1)
+        store[self.create_channel('b')] = State.convert('Contact', 'OPEN')
+        version = store.get_version()
+
+        store_new = store.replaced({self.create_channel('b'): State.convert('Contact', 'CLOSED'),
+                                    self.create_channel('c'): State.create(StateType.DECIMAL, 3)})
+        self.assertLess(version, store_new.get_version())
+        self.assertEqual(['b', 'c'], sorted(c.name for c in store_new))
+        self.assertEqual(['b'], [c.name for c in store_new.get_index().query(value='CLOSED')])
+        self.assertEqual(['c'], [c.name for c in store_new.get_index().query(state_type=StateType.DECIMAL)])
+
+        # the current store (and its index) stays unchanged till it gets swapped
+        self.assertEqual(version, store.get_version())
+        self.assertEqual(['a', 'b'], sorted(c.name for c in store))
+        self.assertEqual(['b'], [c.name for c in store.get_index().query(value='OPEN')])
+        self.assertEqual([], store.get_index().query(value='CLOSED'))
+
+
+if __name__ == '__main__':
+    unittest.main()
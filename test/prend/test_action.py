@@ -1,6 +1,6 @@
 import copy
 import unittest
-from prend.action import Action
+from prend.action import Action, BoundAction
 from prend.channel import Channel, ChannelType
 from prend.oh.oh_event import OhNotificationType
 from prend.state import State, StateType
@@ -98,7 +98,7 @@ class TestOhAction(unittest.TestCase):
         self.assertTrue(out)
 
         comp = copy.deepcopy(orig)
-        comp.channel.name = None
+        comp.channel = Channel(ChannelType.ITEM, None)
         out = comp.is_valid()
         self.assertFalse(out)
 
@@ -115,6 +115,36 @@ class TestOhAction(unittest.TestCase):
         out = startup.is_valid()
         self.assertTrue(out)
 
+    def test_bound_action(self):
+        action = Action()
+        action.channel = Channel.create(ChannelType.ITEM, 'channel')
+        action.state_old = State.create(StateType.DECIMAL, 1)
+        action.state_new = State.create(StateType.DECIMAL, 2)
+        action.notification_type = OhNotificationType.ITEM_CHANGE
+
+        bound1 = BoundAction(action, 'listener1')
+        bound2 = BoundAction(action, 'listener2')
+        self.assertTrue(bound1.is_valid())
+        self.assertTrue(bound1.should_be_published())
+        self.assertEqual(action.channel, bound1.channel)
+        self.assertNotEqual(bound1, bound2)
+        bound2.listener = 'listener1'
+        self.assertEqual(bound1, bound2)
+        self.assertNotEqual(action, bound1)
+        action.listener = 'listener1'
+        self.assertEqual(action, bound1)
+        self.assertEqual(bound1, action)
+        action.listener = None
+
+        newer = Action()
+        newer.state_new = State.create(StateType.DECIMAL, 3)
+        bound1.coalesce(newer)
+        self.assertEqual(1, bound1.state_old.value)
+        self.assertEqual(3, bound1.state_new.value)
+        self.assertEqual(2, action.state_new.value)  # shared payload untouched
+        self.assertEqual(2, bound2.state_new.value)
+        print(bound1)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,238 @@
+import threading
+import time
+import unittest
+from prend.action import Action, ActionPriority, BoundAction
+from prend.action_queue import ActionQueue, ActionQueueFairness, ActionQueuePolicy
+from prend.channel import Channel, ChannelType
+from prend.oh.oh_event import OhNotificationType
+from prend.state import State, StateType
+
+
+class TestActionQueue(unittest.TestCase):
+
+    LISTENER = object()
+
+    @classmethod
+    def create_action(cls, name, value, notification_type=OhNotificationType.ITEM_CHANGE):
+        action = Action()
+        action.channel = Channel.create(ChannelType.ITEM, name)
+        action.state_old = State.create(StateType.DECIMAL, value - 1)
+        action.state_new = State.create(StateType.DECIMAL, value)
+        action.notification_type = notification_type
+        action.listener = cls.LISTENER
+        return action
+
+    @staticmethod
+    def pop_all(queue):
+        actions = []
+        while True:
+            action = queue.get_nowait()
+            if action is None:
+                break
+            actions.append(action)
+        return actions
+
+    def test_create(self):
+        queue = ActionQueue.create(10, 'Drop_Oldest', 1.5)
+        self.assertEqual(ActionQueuePolicy.DROP_OLDEST, queue.get_policy())
+        self.assertEqual(ActionQueuePolicy.COALESCE, ActionQueue.create().get_policy())
+
+        with self.assertRaises(ValueError):
+            ActionQueue.create(policy='unknown')
+        with self.assertRaises(ValueError):
+            ActionQueue.create(max_size=0)
+
+    def test_coalesce(self):
+        queue = ActionQueue.create(2, ActionQueuePolicy.COALESCE)
+        queue.put_all([self.create_action('a', 1), self.create_action('b', 1)])
+        queue.put(self.create_action('a', 2))
+        queue.put(self.create_action('a', 3))
+
+        actions = self.pop_all(queue)
+        self.assertEqual(2, len(actions))
+        self.assertEqual('a', actions[0].channel.name)
+        self.assertEqual(0, actions[0].state_old.value)  # first old state
+        self.assertEqual(3, actions[0].state_new.value)  # latest new state
+
+        statistics = queue.pop_statistics()
+        self.assertEqual(2, statistics.coalesced)
+        self.assertEqual(0, statistics.dropped)
+        self.assertEqual(2, statistics.size_max)
+
+        # not queued channel => drop oldest
+        queue.put_all([self.create_action('a', 1), self.create_action('b', 1), self.create_action('c', 1)])
+        self.assertEqual(['b', 'c'], [a.channel.name for a in self.pop_all(queue)])
+        self.assertEqual(1, queue.pop_statistics().dropped)
+
+    def test_drop_oldest(self):
+        queue = ActionQueue.create(2, ActionQueuePolicy.DROP_OLDEST)
+        command = self.create_action('cmd', 1, OhNotificationType.ITEM_COMMAND)
+        queue.put_all([command, self.create_action('a', 1), self.create_action('a', 2), self.create_action('a', 3)])
+
+        actions = self.pop_all(queue)
+        self.assertEqual(command, actions[0])  # never dropped
+        self.assertEqual([3], [a.state_new.value for a in actions[1:]])
+        self.assertEqual(2, queue.pop_statistics().dropped)
+
+        # commands exceed the limit
+        queue.put_all([command, command, command])
+        self.assertEqual(3, queue.qsize())
+
+    def test_block(self):
+        queue = ActionQueue.create(1, ActionQueuePolicy.BLOCK, 5.0)
+        self.assertIsNone(queue.get_nowait())  # main thread is consumer
+        queue.put(self.create_action('a', 1))
+
+        def produce():
+            queue.put(self.create_action('a', 2))
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        while queue.pop_statistics().blocked == 0 and thread.is_alive():
+            thread.join(0.01)
+        self.assertEqual(1, queue.get_nowait().state_new.value)
+        thread.join()
+
+        self.assertEqual(2, queue.get_nowait().state_new.value)
+        self.assertEqual(0, queue.pop_statistics().dropped)
+
+        # consumer thread must not wait
+        queue.put_all([self.create_action('a', 3), self.create_action('a', 4)])
+        self.assertEqual([4], [a.state_new.value for a in self.pop_all(queue)])
+
+    def test_block_timeout(self):
+        queue = ActionQueue.create(1, ActionQueuePolicy.BLOCK, 0.01)
+        queue.put(self.create_action('a', 1))
+
+        thread = threading.Thread(target=lambda: queue.put(self.create_action('a', 2)))
+        thread.start()
+        thread.join()
+
+        self.assertEqual([2], [a.state_new.value for a in self.pop_all(queue)])
+        statistics = queue.pop_statistics()
+        self.assertEqual(1, statistics.blocked)
+        self.assertEqual(1, statistics.dropped)
+
+    def test_priority(self):
+        queue = ActionQueue.create(100)
+        queue.put_all([BoundAction(self.create_action('low', 1), self.LISTENER, ActionPriority.LOW),
+                       BoundAction(self.create_action('normal', 1), self.LISTENER),
+                       BoundAction(self.create_action('high1', 1), self.LISTENER, ActionPriority.HIGH),
+                       self.create_action('plain', 1),  # NORMAL
+                       BoundAction(self.create_action('high2', 1), self.LISTENER, ActionPriority.HIGH)])
+        self.assertEqual(5, queue.qsize())
+        names = [action.channel.name for action in self.pop_all(queue)]
+        self.assertEqual(['high1', 'high2', 'normal', 'plain', 'low'], names)
+
+    def test_aging(self):
+        queue = ActionQueue.create(100, promotion_seconds=0.01)
+        queue.put(BoundAction(self.create_action('low', 1), self.LISTENER, ActionPriority.LOW))
+        time.sleep(0.05)  # aged to HIGH
+        queue.put(BoundAction(self.create_action('high', 1), self.LISTENER, ActionPriority.HIGH))
+        names = [action.channel.name for action in self.pop_all(queue)]
+        self.assertEqual(['low', 'high'], names)
+
+    def test_high_priority_before_backlog(self):
+        # 5s telemetry backlog (100/s), then a command => the command is served next
+        queue = ActionQueue.create(1000)
+        with self.assertRaises(ValueError):
+            ActionQueue.create(promotion_seconds=0)
+        queue.put_all([self.create_action('telemetry{}'.format(value), value) for value in range(500)])
+        time_now = time.monotonic()
+        for index, entry in enumerate(queue._levels[ActionPriority.NORMAL.value].order):
+            entry.time_put = time_now - 5 + index / 100
+        command = BoundAction(self.create_action('command', 1, OhNotificationType.ITEM_COMMAND), self.LISTENER,
+                              ActionPriority.HIGH)
+        queue.put(command)
+        self.assertIs(command, queue.get_nowait())
+
+        # starving for 2 promotion intervals (default 30s) => served before the higher priority
+        queue.put(command)
+        queue._levels[ActionPriority.NORMAL.value].order[0].time_put = time_now - 61
+        self.assertEqual('telemetry0', queue.get_nowait().channel.name)
+        self.assertIs(command, queue.get_nowait())
+
+    def test_aging_oldest_entry(self):
+        # the oldest not expired action ages a priority, not the next served (round robin) or an expired one
+        for deadline_offset, names_expected in [(None, ['a1', 'b0', 'high']), (0.01, ['high', 'a1'])]:
+            queue = ActionQueue.create(100, fairness=ActionQueueFairness.WEIGHTED, promotion_seconds=0.01)
+            queue.set_weight('a', 2)
+            deadline = time.monotonic() + deadline_offset if deadline_offset is not None else None
+            queue.put_all([BoundAction(self.create_action('a0', 1), 'a', ActionPriority.LOW),
+                           BoundAction(self.create_action('b0', 1), 'b', ActionPriority.LOW, deadline=deadline)])
+            time.sleep(0.05)
+            queue.put(BoundAction(self.create_action('a1', 1), 'a', ActionPriority.LOW))
+            self.assertEqual('a0', queue.get_nowait().channel.name)  # "a" keeps its turn, next served is fresh "a1"
+            queue.put(BoundAction(self.create_action('high', 1), 'h', ActionPriority.HIGH))
+            names = [action.channel.name for action in self.pop_all(queue)]
+            self.assertEqual(names_expected, names)
+
+    def test_expired(self):
+        queue = ActionQueue.create(100)
+        time_now = time.monotonic()
+        queue.put_all([BoundAction(self.create_action('expired', 1), self.LISTENER, deadline=time_now - 1),
+                       BoundAction(self.create_action('valid', 1), self.LISTENER, deadline=time_now + 60),
+                       BoundAction(self.create_action('unlimited', 1), self.LISTENER)])
+        names = [action.channel.name for action in self.pop_all(queue)]
+        self.assertEqual(['valid', 'unlimited'], names)
+        self.assertEqual(1, queue.pop_statistics().expired)
+
+    @classmethod
+    def create_listener_actions(cls, listener, name, count):
+        return [BoundAction(cls.create_action('{}{}'.format(name, value), value), listener) for value in range(count)]
+
+    def test_round_robin(self):
+        queue = ActionQueue.create(100, fairness='Round_Robin')
+        self.assertEqual(ActionQueueFairness.ROUND_ROBIN, queue.get_fairness())
+        with self.assertRaises(ValueError):
+            ActionQueue.create(fairness='unknown')
+
+        chatty, quiet = 'chatty', 'quiet'
+        queue.put_all(self.create_listener_actions(chatty, 'c', 4))
+        queue.put_all(self.create_listener_actions(quiet, 'q', 2))
+        names = [action.channel.name for action in self.pop_all(queue)]
+        self.assertEqual(['c0', 'q0', 'c1', 'q1', 'c2', 'c3'], names)  # in order per listener
+
+        statistics = {s.listener: s for s in queue.pop_listener_statistics()}
+        self.assertEqual(4, statistics[chatty].served)
+        self.assertEqual(4, statistics[chatty].backlog_max)
+        self.assertEqual(0, statistics[quiet].backlog)
+        self.assertEqual([], queue.pop_listener_statistics())  # idle listeners are not reported
+
+    def test_weighted(self):
+        queue = ActionQueue.create(100, fairness=ActionQueueFairness.WEIGHTED)
+        queue.set_weight('heavy', 2)
+        with self.assertRaises(ValueError):
+            queue.set_weight('heavy', 0)
+        queue.put_all(self.create_listener_actions('heavy', 'h', 5))
+        queue.put_all(self.create_listener_actions('light', 'l', 3))
+        names = [action.channel.name for action in self.pop_all(queue)]
+        self.assertEqual(['h0', 'h1', 'l0', 'h2', 'h3', 'l1', 'h4', 'l2'], names)
+
+    def test_fifo(self):
+        queue = ActionQueue.create(100)
+        queue.put_all(self.create_listener_actions('chatty', 'c', 2))
+        queue.put_all(self.create_listener_actions('quiet', 'q', 1))
+        self.assertEqual(['c0', 'c1', 'q0'], [action.channel.name for action in self.pop_all(queue)])
+
+    def test_drop_biggest_backlog(self):
+        queue = ActionQueue.create(4, ActionQueuePolicy.DROP_OLDEST, fairness=ActionQueueFairness.ROUND_ROBIN)
+        queue.put_all(self.create_listener_actions('quiet', 'q', 1))
+        queue.put_all(self.create_listener_actions('chatty', 'c', 5))
+        names = [action.channel.name for action in self.pop_all(queue)]
+        self.assertEqual(['q0', 'c2', 'c3', 'c4'], names)  # only the chatty listener lost actions
+
+        statistics = {s.listener: s for s in queue.pop_listener_statistics()}
+        self.assertEqual(2, statistics['chatty'].dropped)
+        self.assertEqual(0, statistics['quiet'].dropped)
+        self.assertEqual(({}, 0), (queue._backlog_buckets, queue._backlog_max))
+
+        # the biggest backlog moves to the other listener
+        queue.put_all(self.create_listener_actions('chatty', 'c', 1))
+        queue.put_all(self.create_listener_actions('quiet', 'q', 4))
+        self.assertEqual(['c0', 'q1', 'q2', 'q3'], [action.channel.name for action in self.pop_all(queue)])
+        self.assertEqual(({}, 0), (queue._backlog_buckets, queue._backlog_max))
+
+
+if __name__ == '__main__':
+    unittest.main()
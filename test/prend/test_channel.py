@@ -21,42 +21,48 @@ class TestChannelType(unittest.TestCase):
 class TestChannel(unittest.TestCase):
 
     def test_eq(self):
-        orig = Channel()
-        orig.type = ChannelType.GROUP
-        orig.name = 'hgffc'
+        orig = Channel(ChannelType.GROUP, 'hgffc')
 
-        comp = copy.deepcopy(orig)
+        comp = Channel(ChannelType.GROUP, 'hgffc')
         self.assertTrue(orig == comp)
+        self.assertEqual(hash(orig), hash(comp))
 
-        comp = copy.deepcopy(orig)
-        comp.type = ChannelType.ITEM
+        comp = Channel(ChannelType.ITEM, orig.name)
         self.assertTrue(orig != comp)
 
-        comp = copy.deepcopy(orig)
-        comp.name = orig.name + '2'
+        comp = Channel(ChannelType.GROUP, orig.name + '2')
         self.assertTrue(orig != comp)
 
         startup = Channel.create_startup()
         self.assertEqual(startup.type, ChannelType.STARTUP)
         comp = Channel.create_startup()
         self.assertEqual(startup, comp)
-        comp.name = 'xx'
+        comp = Channel(ChannelType.STARTUP, 'xx')
         self.assertEqual(startup, comp)
+        self.assertEqual(hash(startup), hash(comp))
+
+    def test_interned(self):
+        channel = Channel.create(ChannelType.ITEM, 'dummyInterned')
+        self.assertIs(channel, Channel.create_item(''.join(['dummy', 'Interned'])))
+        self.assertIs(channel, copy.deepcopy(channel))
+        self.assertIsNot(channel, Channel.create(ChannelType.GROUP, 'dummyInterned'))
+        self.assertEqual(Channel(ChannelType.ITEM, 'dummyInterned'), channel)
+
+        with self.assertRaises(AttributeError):
+            channel.name = 'other'
+        with self.assertRaises(TypeError):
+            Channel.create(ChannelType.ITEM, None)
 
     def test_is_valid(self):
         channel = Channel.create(ChannelType.ITEM, 'dummyNumber')
         out = channel.is_valid()
         self.assertTrue(out)
 
-        channel = Channel()
-        channel.type = None
-        channel.name = 'dummyNumber'
+        channel = Channel(None, 'dummyNumber')
         out = channel.is_valid()
         self.assertFalse(out)
 
-        channel = Channel()
-        channel.type = ChannelType.ITEM
-        channel.name = None
+        channel = Channel(ChannelType.ITEM, None)
         out = channel.is_valid()
         self.assertFalse(out)
 
@@ -0,0 +1,65 @@
+import unittest
+from prend.channel import Channel, ChannelType
+from prend.channel_pattern import ChannelPattern, ChannelPatternException, ChannelPatternIndex
+
+
+class TestChannelPattern(unittest.TestCase):
+
+    def test_matches(self):
+        item = Channel.create(ChannelType.ITEM, 'valTempLiving')
+        group = Channel.create(ChannelType.GROUP, 'valTempLiving')
+
+        self.assertTrue(ChannelPattern.create_prefix('valTemp').matches(item))
+        self.assertFalse(ChannelPattern.create_prefix('valTemp').matches(group))
+        self.assertTrue(ChannelPattern.create_prefix('valTemp', ChannelType.GROUP).matches(group))
+        self.assertFalse(ChannelPattern.create_prefix('valtemp').matches(item))
+
+        self.assertTrue(ChannelPattern.create_glob('val*Living').matches(item))
+        self.assertTrue(ChannelPattern.create_glob('valTemp?iving').matches(item))
+        self.assertFalse(ChannelPattern.create_glob('val*Kitchen').matches(item))
+
+        self.assertTrue(ChannelPattern.create_regex('Temp(Living|Kitchen)$').matches(item))
+        self.assertFalse(ChannelPattern.create_regex('^Temp').matches(item))
+
+        self.assertTrue(ChannelPattern.create_channel_type(ChannelType.ITEM).matches(item))
+        self.assertFalse(ChannelPattern.create_channel_type(ChannelType.THING).matches(item))
+
+        self.assertTrue(ChannelPattern.create_group('gTemp').matches(item, {'gTemp', 'gAll'}))
+        self.assertFalse(ChannelPattern.create_group('gTemp').matches(item))
+
+    def test_invalid(self):
+        with self.assertRaises(ChannelPatternException):
+            ChannelPattern.create_prefix('')
+        with self.assertRaises(ChannelPatternException):
+            ChannelPattern.create_regex('val[')
+        with self.assertRaises(ChannelPatternException):
+            ChannelPattern.create_channel_type(ChannelType.CRON)
+
+    def test_equal(self):
+        self.assertEqual(ChannelPattern.create_glob('val*'), ChannelPattern.create_glob('val*'))
+        self.assertNotEqual(ChannelPattern.create_glob('val*'), ChannelPattern.create_prefix('val*'))
+        self.assertEqual(1, len({ChannelPattern.create_group('g1'), ChannelPattern.create_group('g1')}))
+
+    def test_index(self):
+        index = ChannelPatternIndex()
+        index.add(ChannelPattern.create_prefix('valTemp'), 'prefix')
+        index.add(ChannelPattern.create_glob('val*Living'), 'glob')
+        index.add(ChannelPattern.create_regex('Kitchen'), 'regex')
+        index.add(ChannelPattern.create_channel_type(ChannelType.THING), 'thing')
+        index.add(ChannelPattern.create_group('gLiving'), 'group')
+        self.assertEqual(5, len(index))
+        self.assertTrue(index.has_group_patterns())
+
+        def find(channel_type, name, groups=()):
+            return sorted(index.find(Channel.create(channel_type, name), groups))
+
+        self.assertEqual(['glob', 'prefix'], find(ChannelType.ITEM, 'valTempLiving'))
+        self.assertEqual(['prefix', 'regex'], find(ChannelType.ITEM, 'valTempKitchen'))
+        self.assertEqual(['glob', 'group'], find(ChannelType.ITEM, 'valLightLiving', {'gLiving'}))
+        self.assertEqual([], find(ChannelType.ITEM, 'val'))
+        self.assertEqual([], find(ChannelType.GROUP, 'valTempLiving'))
+        self.assertEqual(['thing'], find(ChannelType.THING, 'hue:0200:1:lamp1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
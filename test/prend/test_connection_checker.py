@@ -8,16 +8,21 @@ class MockConCheOhObserver:
 
     def __init__(self):
         self._is_connected = True
+        self._can_resume = False
 
     def is_connected(self):
         return self._is_connected
 
+    def can_resume(self):
+        return self._can_resume
+
 
 class MockConCheOhGateway:
 
     def __init__(self):
         self._is_connected = True
         self._last_cache_time = None
+        self._reload_requested = False
 
     def is_connected(self):
         return self._is_connected
@@ -25,6 +30,9 @@ class MockConCheOhGateway:
     def get_last_cache_time(self):
         return self._last_cache_time
 
+    def is_reload_requested(self):
+        return self._reload_requested
+
 
 class MockConnectionChecker(ConnectionChecker):
 
@@ -159,6 +167,31 @@ class TestConnectionChecker(unittest.TestCase):
         out = self.con_check.should_reconnect_oh_gateway()
         self.assertEqual(True, out)
 
+    def test_resume_observer(self):
+        self.con_check._current_time = datetime.datetime.now()
+        self.gateway._last_cache_time = self.con_check._current_time
+
+        # observer disconnects, but can resume => gateway not affected
+        self.observer._is_connected = False
+        self.observer._can_resume = True
+        self.con_check.check_connection_state()
+        self.assertEqual(False, self.con_check.should_reconnect_observer())
+        self.assertEqual(False, self.con_check.should_reconnect_oh_gateway())
+        self.assertEqual(None, self.con_check._reconnect_oh_gateway_after)
+
+        offset_seconds = Constants.WAIT_AFTER_CONNECTION_ERROR_SEC + 1
+        self.con_check._current_time = self.con_check._current_time + datetime.timedelta(seconds=offset_seconds)
+        self.con_check.check_connection_state()
+        self.assertEqual(True, self.con_check.should_reconnect_observer())
+        self.assertEqual(False, self.con_check.should_reconnect_oh_gateway())
+
+        # resumed observer detects a gap
+        self.observer._is_connected = True
+        self.gateway._reload_requested = True
+        self.con_check.check_connection_state()
+        self.assertEqual(False, self.con_check.should_reconnect_observer())
+        self.assertEqual(True, self.con_check.should_reconnect_oh_gateway())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,153 @@
+import datetime
+import schedule
+import unittest
+from prend.cron_scheduler import CronException, CronExpressionTrigger, CronScheduler, CronTrigger, DailyTrigger, \
+    IntervalTrigger, ScheduleJobTrigger
+
+
+class TestCronTrigger(unittest.TestCase):
+
+    def test_cron_expression(self):
+        after = datetime.datetime(2019, 3, 5, 10, 7, 30)  # Tuesday
+
+        trigger = CronExpressionTrigger('*/15 * * * *')
+        self.assertEqual(datetime.datetime(2019, 3, 5, 10, 15), trigger.next_fire(after))
+        self.assertEqual(datetime.datetime(2019, 3, 5, 10, 30),
+                         trigger.next_fire(datetime.datetime(2019, 3, 5, 10, 15)))
+
+        trigger = CronExpressionTrigger('30 6,18 * * *')
+        self.assertEqual(datetime.datetime(2019, 3, 5, 18, 30), trigger.next_fire(after))
+
+        trigger = CronExpressionTrigger('0 8 * * 1-5')  # working days
+        self.assertEqual(datetime.datetime(2019, 3, 6, 8, 0), trigger.next_fire(after))
+        self.assertEqual(datetime.datetime(2019, 3, 11, 8, 0),
+                         trigger.next_fire(datetime.datetime(2019, 3, 8, 9, 0)))
+
+        trigger = CronExpressionTrigger('0 0 1 * 0')  # 1st of month or Sunday
+        self.assertEqual(datetime.datetime(2019, 3, 10, 0, 0), trigger.next_fire(after))
+
+        trigger = CronExpressionTrigger('0 12 29 2 *')
+        self.assertEqual(datetime.datetime(2020, 2, 29, 12, 0), trigger.next_fire(after))
+
+        trigger = CronExpressionTrigger('59 23 31 12 *')
+        self.assertEqual(datetime.datetime(2019, 12, 31, 23, 59), trigger.next_fire(after))
+
+        self.assertIsNone(CronExpressionTrigger('0 0 30 2 *').next_fire(after))
+
+    def test_cron_expression_invalid(self):
+        for expression in ['', '* * * *', '60 * * * *', '* 24 * * *', '*/0 * * * *', '5-1 * * * *', 'a * * * *']:
+            with self.assertRaises(CronException):
+                CronExpressionTrigger(expression)
+
+    def test_interval(self):
+        anchor = datetime.datetime(2019, 3, 5, 10, 0, 0)
+        trigger = IntervalTrigger(90, anchor)
+        self.assertEqual(anchor, trigger.next_fire(anchor - datetime.timedelta(seconds=1)))
+        self.assertEqual(datetime.datetime(2019, 3, 5, 10, 1, 30), trigger.next_fire(anchor))
+        # no drift, missed fire times are skipped
+        self.assertEqual(datetime.datetime(2019, 3, 5, 10, 6, 0),
+                         trigger.next_fire(datetime.datetime(2019, 3, 5, 10, 5, 0, 1)))
+        with self.assertRaises(CronException):
+            IntervalTrigger(0)
+
+    def test_daily(self):
+        trigger = DailyTrigger('07:30')
+        self.assertEqual(datetime.datetime(2019, 3, 5, 7, 30), trigger.next_fire(datetime.datetime(2019, 3, 5, 7, 0)))
+        self.assertEqual(datetime.datetime(2019, 3, 6, 7, 30), trigger.next_fire(datetime.datetime(2019, 3, 5, 7, 30)))
+        with self.assertRaises(CronException):
+            DailyTrigger('7')
+        with self.assertRaises(CronException):
+            DailyTrigger('25:00')
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            CronTrigger()  # pylint: disable=abstract-class-instantiated
+
+    def test_create(self):
+        self.assertTrue(isinstance(CronTrigger.create('* * * * *'), CronExpressionTrigger))
+        self.assertTrue(isinstance(CronTrigger.create(schedule.every().minute), ScheduleJobTrigger))
+        trigger = DailyTrigger('12:00')
+        self.assertTrue(CronTrigger.create(trigger) is trigger)
+        with self.assertRaises(CronException):
+            CronTrigger.create(42)
+
+    def test_schedule_job(self):
+        jobs_before = len(schedule.jobs)
+        after = datetime.datetime(2019, 3, 5, 11, 20, 30)  # Tuesday
+
+        def next_fire(job):
+            return CronTrigger.create(job).next_fire(after)
+
+        self.assertEqual(after + datetime.timedelta(seconds=10), next_fire(schedule.every(10).seconds))
+        self.assertEqual(after + datetime.timedelta(minutes=1), next_fire(schedule.every().minute))
+        self.assertEqual(datetime.datetime(2019, 3, 6, 10, 30), next_fire(schedule.every().day.at('10:30')))
+        self.assertEqual(datetime.datetime(2019, 3, 5, 12, 0), next_fire(schedule.every().day.at('12:00')))
+        self.assertEqual(datetime.datetime(2019, 3, 5, 12, 15), next_fire(schedule.every().hour.at(':15')))
+        self.assertEqual(datetime.datetime(2019, 3, 11, 8, 0), next_fire(schedule.every().monday.at('08:00')))
+        self.assertEqual(datetime.datetime(2019, 3, 5, 18, 0), next_fire(schedule.every().tuesday.at('18:00')))
+        self.assertEqual(jobs_before, len(schedule.jobs))  # not registered at "schedule"
+
+        # the scheduler passes the time of the pass, not "now"
+        scheduler = CronScheduler()
+        job = scheduler.add('job', schedule.every(10).minutes, 'listener', after)
+        self.assertEqual(after + datetime.timedelta(minutes=10), job.next_run)
+        scheduler.pop_due(after + datetime.timedelta(hours=1))
+        self.assertEqual(after + datetime.timedelta(hours=1, minutes=10), job.next_run)
+
+    def test_schedule_job_invalid(self):
+        job = schedule.every().day
+        job.start_day = 'monday'
+        with self.assertRaises(CronException):
+            CronTrigger.create(job)
+
+
+class TestCronScheduler(unittest.TestCase):
+
+    def test_pop_due(self):
+        now = datetime.datetime(2019, 3, 5, 10, 0, 0)
+        scheduler = CronScheduler()
+        self.assertIsNone(scheduler.get_idle_seconds(now))
+        self.assertEqual([], scheduler.pop_due(now))
+
+        job_minute = scheduler.add('minute', '* * * * *', 'listener1', now)
+        scheduler.add('interval', IntervalTrigger(20, now), 'listener2', now)
+        scheduler.add('daily', DailyTrigger('12:00'), 'listener3', now)
+        self.assertEqual(3, len(scheduler))
+        self.assertEqual(20, scheduler.get_idle_seconds(now))
+
+        self.assertEqual([], scheduler.pop_due(now + datetime.timedelta(seconds=19)))
+        due = scheduler.pop_due(now + datetime.timedelta(seconds=20))
+        self.assertEqual(['interval'], [job.key for job in due])
+        self.assertEqual(20, scheduler.get_idle_seconds(now + datetime.timedelta(seconds=20)))
+
+        due = scheduler.pop_due(now + datetime.timedelta(seconds=60))
+        self.assertEqual(['interval', 'minute'], sorted(job.key for job in due))
+        self.assertEqual('listener1', job_minute.listener)
+
+        # missed fire times are skipped
+        due = scheduler.pop_due(now + datetime.timedelta(hours=3))
+        self.assertEqual(['daily', 'interval', 'minute'], sorted(job.key for job in due))
+        self.assertEqual(3, len(scheduler))
+
+    def test_remove(self):
+        now = datetime.datetime(2019, 3, 5, 10, 0, 0)
+        scheduler = CronScheduler()
+        job1 = scheduler.add('job1', IntervalTrigger(10, now), 'listener', now)
+        scheduler.add('job2', IntervalTrigger(30, now), 'listener', now)
+        scheduler.remove(job1)
+        scheduler.remove(job1)
+        self.assertEqual(1, len(scheduler))
+        self.assertEqual(30, scheduler.get_idle_seconds(now))
+        due = scheduler.pop_due(now + datetime.timedelta(seconds=60))
+        self.assertEqual(['job2'], [job.key for job in due])
+
+    def test_never_fires(self):
+        scheduler = CronScheduler()
+        job = scheduler.add('never', '0 0 30 2 *', 'listener')
+        self.assertIsNone(job.next_run)
+        self.assertEqual(0, len(scheduler))
+        self.assertIsNone(scheduler.get_idle_seconds())
+
+
+if __name__ == '__main__':
+    unittest.main()
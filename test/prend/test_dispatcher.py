@@ -1,12 +1,14 @@
 import schedule
 import time
 import unittest
-from prend.action import Action
+from prend.action import Action, ActionPriority
 from prend.dispatcher import Dispatcher
 from prend.channel import Channel, ChannelType
+from prend.channel_pattern import ChannelPattern
 from prend.oh.oh_event import OhNotificationType
 from prend.state import State, StateType
 from prend.rule import Rule
+from prend.tools.wake_up import WakeUp
 
 
 class DispatchCheckerRule(Rule):
@@ -57,6 +59,154 @@ class TestDispatcher(unittest.TestCase):
         compare = (action_in == action_out)
         self.assertTrue(compare)
 
+    def test_fan_out_shared(self):
+        dispatcher = Dispatcher()
+        checkers = [DispatchCheckerRule(dispatcher) for _ in range(3)]
+        channel = Channel.create(ChannelType.ITEM, 'dummyNumber')
+        for checker in checkers:
+            checker.subscribe_channel_actions(channel)
+
+        action_in = Action()
+        action_in.channel = channel
+        action_in.state_new = State.create(StateType.DECIMAL, 3)
+        action_in.notification_type = OhNotificationType.ITEM_CHANGE
+        dispatcher.push_action(action_in)
+        dispatcher.dispatch()
+
+        for checker in checkers:
+            self.assertEqual(1, len(checker.notifications))
+            action_out = checker.notifications[0]
+            self.assertTrue(action_out.listener is checker)
+            self.assertTrue(action_out.action is action_in)  # no copies
+            self.assertEqual(3, action_out.state_new.value)
+        self.assertIsNone(action_in.listener)
+
+    def test_pattern_subscription(self):
+        class GroupSource:
+            def __init__(self):
+                self.version = 1
+                self.groups = {}
+
+            def get_group_version(self):
+                return self.version
+
+            def get_groups_of(self, channel):
+                return self.groups.get(channel, frozenset())
+
+        dispatcher = Dispatcher()
+        group_source = GroupSource()
+        dispatcher.set_group_source(group_source)
+        checker_glob = DispatchCheckerRule(dispatcher)
+        checker_group = DispatchCheckerRule(dispatcher)
+        checker_glob.subscribe_pattern_actions(ChannelPattern.create_glob('valTemp*'))
+        checker_glob.subscribe_pattern_actions(ChannelPattern.create_prefix('valTempLiv'))
+        checker_glob.subscribe_channel_actions(Channel.create(ChannelType.ITEM, 'valTempLiving'))
+        checker_group.subscribe_pattern_actions(ChannelPattern.create_group('gLiving'))
+        self.assertTrue(dispatcher.has_pattern_listeners())
+
+        def push(name):
+            action_in = Action()
+            action_in.channel = Channel.create(ChannelType.ITEM, name)
+            action_in.state_new = State.create(StateType.DECIMAL, 1)
+            action_in.notification_type = OhNotificationType.ITEM_CHANGE
+            dispatcher.push_action(action_in)
+            dispatcher.dispatch()
+
+        push('valTempLiving')
+        self.assertEqual(1, len(checker_glob.notifications))  # once, though 3 subscriptions match
+        self.assertEqual(0, len(checker_group.notifications))
+        push('valTempNew')
+        self.assertEqual(2, len(checker_glob.notifications))
+        push('valOther')
+        self.assertEqual(2, len(checker_glob.notifications))
+
+        # membership changed => cached matches get invalid
+        group_source.groups[Channel.create(ChannelType.ITEM, 'valTempLiving')] = frozenset(['gLiving'])
+        push('valTempLiving')
+        self.assertEqual(0, len(checker_group.notifications))
+        group_source.version += 1
+        push('valTempLiving')
+        self.assertEqual(1, len(checker_group.notifications))
+        self.assertEqual(4, len(checker_glob.notifications))
+
+    def test_priority(self):
+        dispatcher = Dispatcher()
+        dispatcher.set_priorities({'valAlarm': ' High', 'valTelemetry': 'urgent'})  # raw config texts
+        self.assertEqual({'valalarm': ActionPriority.HIGH}, dispatcher._priorities)
+        dispatcher.set_priorities({'valAlarm': ActionPriority.HIGH})
+        checker = DispatchCheckerRule(dispatcher)
+        for name in ['valTelemetry', 'valAlarm', 'valCommand']:
+            checker.subscribe_channel_actions(Channel.create(ChannelType.ITEM, name))
+        checker.subscribe_channel_actions(Channel.create(ChannelType.ITEM, 'valStale'), max_age=-1)
+
+        for name, notification_type in [('valTelemetry', OhNotificationType.ITEM_CHANGE),
+                                        ('valStale', OhNotificationType.ITEM_CHANGE),
+                                        ('valCommand', OhNotificationType.ITEM_COMMAND),
+                                        ('valAlarm', OhNotificationType.ITEM_CHANGE)]:
+            action_in = Action()
+            action_in.channel = Channel.create(ChannelType.ITEM, name)
+            action_in.state_new = State.create(StateType.DECIMAL, 1)
+            action_in.notification_type = notification_type
+            dispatcher.push_action(action_in)
+        dispatcher.dispatch()
+
+        names = [action.channel.name for action in checker.notifications]
+        self.assertEqual(['valCommand', 'valAlarm', 'valTelemetry'], names)
+        self.assertEqual(1, dispatcher.pop_queue_statistics().expired)
+
+    def test_get_oh_channels(self):
+        dispatcher = Dispatcher()
+        checker = DispatchCheckerRule(dispatcher)
+        self.assertEqual(0, len(dispatcher.get_oh_channels()))
+        version = dispatcher.get_subscription_version()
+
+        channel = Channel.create(ChannelType.ITEM, 'dummyNumber')
+        checker.subscribe_channel_actions(channel)
+        checker.subscribe_channel_actions(channel)
+
+        self.assertEqual([channel], dispatcher.get_oh_channels())
+        self.assertNotEqual(version, dispatcher.get_subscription_version())
+
+    def test_rate_limit(self):
+        dispatcher = Dispatcher()
+        dispatcher.set_rate_limits({'valPvModVoltage': 60})
+        checker = DispatchCheckerRule(dispatcher)
+
+        channel = Channel.create(ChannelType.ITEM, 'valpvmodvoltage')
+        checker.subscribe_channel_actions(channel)
+
+        for value in range(3):
+            action_in = Action()
+            action_in.channel = channel
+            action_in.state_old = State.create(StateType.DECIMAL, value)
+            action_in.state_new = State.create(StateType.DECIMAL, value + 1)
+            action_in.notification_type = OhNotificationType.ITEM_CHANGE
+            dispatcher.push_action(action_in)
+
+        dispatcher.dispatch()
+        self.assertEqual(1, len(checker.notifications))
+        self.assertIsNotNone(dispatcher.get_next_rate_limit_deadline())
+        self.assertEqual(1, dispatcher.pop_rate_limit_merged_count())
+
+    def test_wake_up(self):
+        dispatcher = Dispatcher()
+        wake_up = WakeUp()
+        dispatcher.set_wake_up(wake_up)
+        checker = DispatchCheckerRule(dispatcher)
+        channel = Channel.create(ChannelType.ITEM, 'dummyNumber')
+        checker.subscribe_channel_actions(channel)
+
+        action_in = Action()
+        action_in.channel = channel
+        action_in.state_new = State.create(StateType.DECIMAL, 1)
+        action_in.notification_type = OhNotificationType.ITEM_CHANGE
+        dispatcher.push_action(action_in)
+
+        self.assertTrue(wake_up.wait(0))
+        dispatcher.dispatch()
+        self.assertEqual(1, len(checker.notifications))
+        self.assertFalse(wake_up.wait(0))
+
     def test_dispatch_cron(self):
         dispatcher = Dispatcher()
         checker = DispatchCheckerRule(dispatcher)
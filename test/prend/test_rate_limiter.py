@@ -0,0 +1,78 @@
+import unittest
+from prend.action import Action
+from prend.channel import Channel, ChannelType
+from prend.oh.oh_event import OhNotificationType
+from prend.rate_limiter import RateLimiter
+from prend.state import State, StateType
+
+
+class MockRateLimiter(RateLimiter):
+
+    def __init__(self):
+        super().__init__()
+        self.current_time = 100.0
+
+    def get_time(self) -> float:
+        return self.current_time
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    LISTENER = object()
+
+    @classmethod
+    def create_action(cls, value, notification_type=OhNotificationType.ITEM_CHANGE):
+        action = Action()
+        action.channel = Channel.create(ChannelType.ITEM, 'valPvModVoltage')
+        action.state_old = State.create(StateType.DECIMAL, value - 1)
+        action.state_new = State.create(StateType.DECIMAL, value)
+        action.notification_type = notification_type
+        action.listener = cls.LISTENER
+        return action
+
+    def test_burst(self):
+        limiter = MockRateLimiter()
+
+        self.assertTrue(limiter.offer(self.create_action(1), 1.0))
+        self.assertIsNone(limiter.get_next_deadline())
+
+        limiter.current_time += 0.1
+        self.assertFalse(limiter.offer(self.create_action(2), 1.0))
+        self.assertFalse(limiter.offer(self.create_action(3), 1.0))
+        self.assertFalse(limiter.offer(self.create_action(4), 1.0))
+        self.assertEqual(101.0, limiter.get_next_deadline())
+
+        limiter.current_time += 0.5
+        self.assertEqual([], limiter.pop_due())
+
+        limiter.current_time += 0.5
+        actions = limiter.pop_due()
+        self.assertEqual(1, len(actions))
+        self.assertEqual(1, actions[0].state_old.value)  # first old state
+        self.assertEqual(4, actions[0].state_new.value)  # latest new state
+        self.assertIsNone(limiter.get_next_deadline())
+        self.assertEqual(2, limiter.pop_merged_count())
+
+        # interval counts from the flush
+        limiter.current_time += 0.5
+        self.assertFalse(limiter.offer(self.create_action(5), 1.0))
+        limiter.current_time += 1.0
+        self.assertFalse(limiter.offer(self.create_action(6), 1.0))  # not yet flushed => merged
+        self.assertEqual([6], [a.state_new.value for a in limiter.pop_due()])
+
+        # quiet channel => immediately
+        limiter.current_time += 5.0
+        self.assertTrue(limiter.offer(self.create_action(7), 1.0))
+
+    def test_not_limited(self):
+        limiter = MockRateLimiter()
+
+        self.assertTrue(limiter.offer(self.create_action(1), None))
+        self.assertTrue(limiter.offer(self.create_action(2), None))
+
+        self.assertTrue(limiter.offer(self.create_action(1, OhNotificationType.ITEM_COMMAND), 1.0))
+        self.assertTrue(limiter.offer(self.create_action(2, OhNotificationType.ITEM_COMMAND), 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import threading
+import time
+import unittest
+from prend.action import Action
+from prend.action_queue import ActionQueue
+from prend.channel import Channel, ChannelType
+from prend.dispatcher import Dispatcher
+from prend.oh.oh_event import OhNotificationType
+from prend.rule_executor import RuleExecutor
+from prend.state import State, StateType
+from prend.tools.wake_up import WakeUp
+
+
+class ExecutorCheckerListener:
+
+    def __init__(self, sleep_seconds=0.0):
+        self.sleep_seconds = sleep_seconds
+        self.values = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def notify_action(self, action) -> None:
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        if self.sleep_seconds:
+            time.sleep(self.sleep_seconds)
+        self.values.append(action.state_new.value)
+        with self._lock:
+            self.running -= 1
+
+
+class FailingListener(ExecutorCheckerListener):
+
+    def notify_action(self, action) -> None:
+        super().notify_action(action)
+        if action.state_new.value == 0:
+            raise RuntimeError('rule failed')
+
+
+class TestRuleExecutor(unittest.TestCase):
+
+    @staticmethod
+    def create_action(listener, value) -> Action:
+        action = Action()
+        action.channel = Channel.create(ChannelType.ITEM, 'dummyNumber')
+        action.state_new = State.create(StateType.DECIMAL, value)
+        action.notification_type = OhNotificationType.ITEM_CHANGE
+        action.listener = listener
+        return action
+
+    def test_create(self):
+        self.assertIsNone(RuleExecutor.create(None))
+        self.assertIsNone(RuleExecutor.create(0))
+        with self.assertRaises(ValueError):
+            RuleExecutor.create(-1)
+        executor = RuleExecutor.create(2)
+        self.assertIsNotNone(executor)
+        executor.shutdown()
+
+    def test_order_per_rule(self):
+        executor = RuleExecutor(4)
+        listeners = [ExecutorCheckerListener(0.001) for _ in range(3)]
+        for value in range(30):
+            for listener in listeners:
+                executor.submit(self.create_action(listener, value))
+        executor.shutdown()
+
+        self.assertEqual(0, executor.get_pending())
+        for listener in listeners:
+            self.assertEqual(list(range(30)), listener.values)
+            self.assertEqual(1, listener.max_running)  # never concurrently with itself
+
+        statistics = executor.pop_statistics()
+        self.assertEqual(3, len(statistics))
+        for _, queue_size, rule_statistics in statistics:
+            self.assertEqual(0, queue_size)
+            self.assertEqual(30, rule_statistics.processed)
+            self.assertGreaterEqual(rule_statistics.queue_size_max, 1)
+        self.assertEqual(0, executor.pop_statistics()[0][2].processed)
+
+    def test_shutdown_drains_mailbox(self):
+        executor = RuleExecutor(1)
+        listener = ExecutorCheckerListener(0.001)
+        count = 3 * RuleExecutor.BATCH_SIZE + 1
+        for value in range(count):
+            executor.submit(self.create_action(listener, value))
+        executor.shutdown()
+
+        self.assertEqual(list(range(count)), listener.values)
+        self.assertEqual(0, executor.get_pending())
+
+    def test_listener_exception(self):
+        executor = RuleExecutor(1)  # default notify function, without error handling of the dispatcher
+        listener = FailingListener()
+        for value in range(3):
+            executor.submit(self.create_action(listener, value))
+        executor.shutdown()
+
+        self.assertEqual([0, 1, 2], listener.values)
+        self.assertEqual(0, executor.get_pending())
+        self.assertEqual(3, executor.pop_statistics()[0][2].processed)
+
+    def test_slow_rule_does_not_block(self):
+        executor = RuleExecutor(2)
+        slow = ExecutorCheckerListener(0.2)
+        fast = ExecutorCheckerListener()
+        executor.submit(self.create_action(slow, 1))
+        time_start = time.perf_counter()
+        executor.submit(self.create_action(fast, 1))
+        while not fast.values and time.perf_counter() - time_start < 5:
+            time.sleep(0.001)
+        self.assertLess(time.perf_counter() - time_start, 0.15)
+        self.assertEqual([], slow.values)
+        executor.shutdown()
+        self.assertEqual([1], slow.values)
+
+    def test_dispatcher_capacity(self):
+        dispatcher = Dispatcher(ActionQueue.create(100, None, None))
+        executor = RuleExecutor(1, max_pending=2)
+        wake_up = WakeUp()
+        executor.set_wake_up(wake_up)
+        dispatcher.set_rule_executor(executor)
+
+        listener = ExecutorCheckerListener(0.02)
+        dispatcher.push_actions([self.create_action(listener, value) for value in range(5)])
+        self.assertTrue(dispatcher.dispatch())
+        self.assertEqual(2, executor.get_pending())  # the rest waits in the action queue
+
+        self.assertTrue(wake_up.wait(5))  # capacity again
+        time_start = time.perf_counter()
+        while len(listener.values) < 5 and time.perf_counter() - time_start < 5:
+            dispatcher.dispatch()
+            wake_up.wait(0.1)
+        executor.shutdown()
+        self.assertEqual(list(range(5)), listener.values)
@@ -44,22 +44,51 @@ class TestStateType(unittest.TestCase):
 class TestState(unittest.TestCase):
 
     def test_eq(self):
-        orig = State()
-        orig.type = StateType.DECIMAL
-        orig.value = 'hgffc'
+        orig = State.create(StateType.DECIMAL, 'hgffc')
 
-        comp = copy.deepcopy(orig)
-        comp.update_last_change()
+        comp = orig.with_last_change(datetime.datetime.now() + datetime.timedelta(seconds=1))
         self.assertTrue(orig == comp)
 
-        comp = copy.deepcopy(orig)
-        comp.type = StateType.ONOFF
+        comp = State.create(StateType.ONOFF, orig.value)
         self.assertTrue(orig != comp)
 
-        comp = copy.deepcopy(orig)
-        comp.value = orig.value + '2'
+        comp = orig.with_value(orig.value + '2')
         self.assertTrue(orig != comp)
 
+    def test_immutable(self):
+        state = State.convert('HSB', '10,20,30')
+        self.assertTrue(copy.copy(state) is state)
+        self.assertTrue(copy.deepcopy(state) is state)
+        self.assertTrue(copy.deepcopy(state.value) is state.value)
+
+        with self.assertRaises(AttributeError):
+            state.value = 1
+        with self.assertRaises(AttributeError):
+            state.value.hue = 1
+        with self.assertRaises(AttributeError):
+            state.other = 1
+
+    def test_merge(self):
+        time_old = datetime.datetime(2018, 12, 3, 13, 7, 45)
+        time_new = time_old + datetime.timedelta(seconds=1)
+
+        state = State.create(StateType.DIMMER, 10.0, time_old)
+        merged = state.merge_newer(State.create(StateType.DECIMAL, 20.0, time_new))
+        self.assertEqual(State.create(StateType.DIMMER, 20.0), merged)
+        self.assertEqual(time_new, merged.last_change)
+        self.assertEqual(10.0, state.value)  # unchanged
+
+        other = State.create(StateType.STRING, 'abc', time_new)
+        self.assertTrue(state.merge_newer(other) is other)
+
+        merged = state.merge_newer(State.create(StateType.UNDEF, None, time_new))
+        self.assertEqual(StateType.DIMMER, merged.type)
+        self.assertIsNone(merged.value)
+
+        # older
+        state = State.create(StateType.DIMMER, 10.0, time_new)
+        self.assertTrue(state.merge_newer(State.create(StateType.DECIMAL, 20.0, time_old)) is state)
+
     def test_convert_to_json(self):
 
         out = State.convert_to_json(datetime.datetime(2018, 12, 3, 13, 7, 45, tzinfo=tzoffset(None, 3600)))
@@ -90,9 +119,35 @@ class TestState(unittest.TestCase):
         out = State.convert_to_json(None)
         self.assertEqual(out, 'UNDEF')
 
-    def test_import_state(self):
-        # todo
-        pass
+    def test_convert_lazy(self):
+        state = State.convert('Decimal', '1.50')
+        self.assertFalse(state.is_converted())
+        self.assertTrue(state.is_valid())
+        self.assertFalse(state.is_converted())
+
+        # same texts => equal without conversion
+        comp = State.convert('Decimal', '1.50')
+        self.assertEqual(state, comp)
+        self.assertFalse(state.is_converted())
+        self.assertFalse(comp.is_converted())
+
+        # same type text => taken over without conversion
+        state = state.merge(State.convert('Decimal', '2.50'))
+        self.assertFalse(state.is_converted())
+        self.assertEqual(state.value, 2.5)
+        self.assertTrue(state.is_converted())
+
+        # different texts, but equal values
+        self.assertEqual(State.convert('Decimal', '2.5'), state)
+
+        state = State.convert('Switch', 'ON').merge(State.convert('OnOff', 'OFF'))
+        self.assertEqual(state.type, StateType.SWITCH)
+        self.assertEqual(state.value, OnOffValue.OFF)
+        self.assertNotEqual(state, State.convert('OnOff', 'OFF'))
+
+        state = State.convert('Decimal', 'abc')
+        self.assertEqual(state.type, StateType.UNKNOWN)
+        self.assertEqual(state.value, 'abc')
 
     def check_convert_roundabout(self, state_type, state_value):
 
@@ -153,10 +208,11 @@ class TestState(unittest.TestCase):
 
     def check_set_value_check_type(self, state_type, value1, value2, expected_result):
         state = State.create(state_type, value1)
-        result = state.set_value_check_type(copy.deepcopy(value2))
-        self.assertEqual(result, expected_result)
-        if result:
-            self.assertEqual(state.value, value2)
+        state_out = state.with_value_check_type(value2)
+        self.assertEqual(state_out is not None, expected_result)
+        if state_out:
+            self.assertEqual(state_out.value, value2)
+            self.assertEqual(state.value, value1)
 
     def test_set_value_check_type(self):
         self.check_set_value_check_type(StateType.DECIMAL, 1, 2.4, True)
@@ -0,0 +1,39 @@
+import unittest
+from prend.tools.json_codec import JsonCodec
+
+
+class TestJsonCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = JsonCodec.get_backend()
+
+    def tearDown(self):
+        JsonCodec.set_backend(self.backend)
+
+    def test_roundtrip(self):
+        data = {'b': [1, 2.5, None, True], 'a': '3,4°C / 56%', 'c': {'d': 'e'}}
+
+        for backend in JsonCodec.get_available_backends():
+            JsonCodec.set_backend(backend)
+
+            self.assertEqual(data, JsonCodec.loads(JsonCodec.dumps(data)))
+            self.assertEqual(data, JsonCodec.loads(JsonCodec.dumps(data, pretty=True)))
+            self.assertEqual(data, JsonCodec.loads(JsonCodec.dumps(data).encode('utf8')))
+
+            text = JsonCodec.dumps(data, pretty=True)
+            self.assertTrue(text.index('"a"') < text.index('"b"'))  # sorted
+
+    def test_decode_error(self):
+        for backend in JsonCodec.get_available_backends():
+            JsonCodec.set_backend(backend)
+            with self.assertRaises(JsonCodec.DecodeError):
+                JsonCodec.loads('invalid json!')
+
+    def test_set_backend(self):
+        with self.assertRaises(ValueError):
+            JsonCodec.set_backend('unknown')
+        self.assertEqual(self.backend, JsonCodec.get_backend())
+
+
+if __name__ == '__main__':
+    unittest.main()
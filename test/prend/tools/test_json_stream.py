@@ -0,0 +1,51 @@
+import json
+import unittest
+from prend.tools.json_stream import JsonArrayStreamParser
+
+
+class TestJsonArrayStreamParser(unittest.TestCase):
+
+    def check_stream(self, elements_cmp: list, text: str = None):
+        data = (text if text is not None else json.dumps(elements_cmp)).encode('utf8')
+
+        parser = JsonArrayStreamParser()
+        self.assertEqual(elements_cmp, parser.feed(data))
+        self.assertTrue(parser.is_finished())
+
+        for split in range(1, len(data)):
+            parser = JsonArrayStreamParser()
+            elements_out = parser.feed(data[:split]) + parser.feed(data[split:])
+            self.assertEqual(elements_cmp, elements_out)
+            self.assertTrue(parser.is_finished())
+
+    def test_objects(self):
+        self.check_stream([])
+        self.check_stream([{'name': 'valItem1', 'type': 'Number', 'state': '12.3'},
+                           {'name': 'gAll', 'type': 'Group', 'state': 'NULL', 'members': [1, 2, {}]}])
+        self.check_stream([{'name': 'valTemp', 'state': '3,4°C / 56%'}])  # multi byte utf-8
+
+    def test_whitespace_and_scalars(self):
+        self.check_stream([{'a': 1}, {'b': 2}], ' [ {"a": 1} ,\n\t{"b": 2}\r\n] ')
+        self.check_stream([12345, 'text', True, None, 1.5e3])
+
+    def test_incremental(self):
+        parser = JsonArrayStreamParser()
+        self.assertEqual([{'a': 1}], parser.feed(b'[{"a": 1}, {"b"'))
+        self.assertFalse(parser.is_finished())
+        self.assertEqual([], parser.feed(b': 2'))
+        self.assertEqual([{'b': 2}], parser.feed(b'}'))
+        self.assertEqual([], parser.feed(b']'))
+        self.assertTrue(parser.is_finished())
+
+        parser = JsonArrayStreamParser()
+        self.assertEqual([], parser.feed(b'[1500'))
+        self.assertEqual([], parser.feed(b'.'))
+        self.assertEqual([1500.25], parser.feed(b'25 ,'))
+
+    def test_no_array(self):
+        with self.assertRaises(json.JSONDecodeError):
+            JsonArrayStreamParser().feed(b'{"a": 1}')
+
+
+if __name__ == '__main__':
+    unittest.main()
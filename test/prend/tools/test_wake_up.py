@@ -0,0 +1,35 @@
+import threading
+import time
+import unittest
+from prend.tools.wake_up import WakeUp
+
+
+class TestWakeUp(unittest.TestCase):
+
+    def test_timeout(self):
+        wake_up = WakeUp()
+        time_start = time.perf_counter()
+        self.assertFalse(wake_up.wait(0.01))
+        self.assertGreaterEqual(time.perf_counter() - time_start, 0.009)
+
+    def test_signal_kept(self):
+        wake_up = WakeUp()
+        wake_up.signal()  # arrives while the loop is processing
+        wake_up.signal()
+        self.assertTrue(wake_up.wait(1))
+        self.assertFalse(wake_up.wait(0))  # reset
+        self.assertEqual((2, 2), wake_up.pop_statistics())
+        self.assertEqual((0, 0), wake_up.pop_statistics())
+
+    def test_signal_thread(self):
+        wake_up = WakeUp()
+        timer = threading.Timer(0.01, wake_up.signal)
+        timer.start()
+        time_start = time.perf_counter()
+        self.assertTrue(wake_up.wait(5))
+        self.assertLess(time.perf_counter() - time_start, 1)
+        timer.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,710 @@
+"""
+Micro benchmarks for the hot paths of prend (no openhab connection needed).
+
+Run from the project dir:
+    python -m tools.benchmark                    # all cases
+    python -m tools.benchmark event_stream       # selected cases
+    python -m tools.benchmark --count 100000 event_stream
+"""
+
+import argparse
+import copy
+import datetime
+import json
+import random
+import schedule
+import sys
+import threading
+import time
+import tracemalloc
+
+from prend.action import Action, BoundAction
+from prend.action_queue import ActionQueue, ActionQueueFairness
+from prend.channel import Channel, ChannelType
+from prend.channel_pattern import ChannelPattern, ChannelPatternIndex
+from prend.cron_scheduler import CronScheduler, IntervalTrigger
+from prend.dispatcher import Dispatcher, DispatcherActionSink
+from prend.oh.aiosseclient import Event
+from prend.oh.oh_event import OhEvent, OhNotificationType
+from prend.oh.oh_gateway import OhGateway
+from prend.oh.sse_parser import SseParser
+from prend.state import State, StateType
+from prend.tools.json_codec import JsonCodec
+from prend.tools.json_stream import JsonArrayStreamParser
+from prend.tools.wake_up import WakeUp
+from prend.values import OnOffValue
+
+
+_cases = {}
+
+
+def benchmark(func):
+    _cases[func.__name__[len('bench_'):]] = func
+    return func
+
+
+def report(case: str, variant: str, seconds: float, count: int, extra: str = '') -> None:
+    per_op = 1e6 * seconds / count if count else 0.0
+    print('{:<20} {:<24} {:>10.3f}s {:>10.2f}us/op {}'.format(case, variant, seconds, per_op, extra).rstrip())
+
+
+class EventStream:
+    """
+    Reproducible event stream, modeled after a recorded stream of a real installation: mostly numeric telemetry
+    (often with unchanged values), some switches, datetimes, colors and thing status events.
+    """
+
+    @classmethod
+    def create(cls, count: int, seed: int = 4711) -> list:
+        rand = random.Random(seed)
+        values = {}
+        lines = []
+        for _ in range(count):
+            kind = rand.random()
+            if kind < 0.70:
+                name = 'valTelemetry{}'.format(rand.randint(0, 99))
+                value = values.get(name, 230.0)
+                if rand.random() < 0.4:
+                    value = round(value + rand.uniform(-1.0, 1.0), 2)
+                values[name] = value
+                lines.append(cls._item_event(name, 'Decimal', '{:.2f}'.format(value)))
+            elif kind < 0.85:
+                name = 'valSwitch{}'.format(rand.randint(0, 29))
+                lines.append(cls._item_event(name, 'OnOff', rand.choice(['ON', 'OFF'])))
+            elif kind < 0.93:
+                name = 'valTime{}'.format(rand.randint(0, 9))
+                value = '2018-11-26T19:{:02d}:41.000+0100'.format(rand.randint(0, 59))
+                lines.append(cls._item_event(name, 'DateTime', value))
+            elif kind < 0.97:
+                name = 'valColor{}'.format(rand.randint(0, 9))
+                value = '{},{},{}'.format(rand.randint(0, 360), rand.randint(0, 100), rand.randint(0, 100))
+                lines.append(cls._item_event(name, 'HSB', value))
+            else:
+                uid = 'hue:0200:1:lamp{}'.format(rand.randint(0, 19))
+                payload = json.dumps({'status': rand.choice(['ONLINE', 'OFFLINE']), 'statusDetail': 'NONE'})
+                topic = 'smarthome/things/{}/status'.format(uid)
+                lines.append(json.dumps({'topic': topic, 'payload': payload, 'type': 'ThingStatusInfoEvent'}))
+        return lines
+
+    @staticmethod
+    def _item_event(name: str, state_type: str, value: str) -> str:
+        payload = json.dumps({'type': state_type, 'value': value})
+        topic = 'smarthome/items/{}/state'.format(name)
+        return json.dumps({'topic': topic, 'payload': payload, 'type': 'ItemStateEvent'})
+
+
+@benchmark
+def bench_event_stream(count: int) -> None:
+    """decode event + push into gateway cache: eager conversion (as before) vs. lazy conversion"""
+    lines = EventStream.create(count)
+
+    results = {}
+    for variant in ['eager', 'lazy']:
+        gateway = OhGateway()
+        gateway.set_dispatcher(DispatcherActionSink())
+
+        time_start = time.process_time()
+        for line in lines:
+            event = OhEvent.create_from_notify_json(line)
+            if variant == 'eager':
+                _ = event.state.value  # force conversion
+            gateway.push_event(event)
+        results[variant] = time.process_time() - time_start
+        report('event_stream', variant, results[variant], count)
+
+    saved = results['eager'] - results['lazy']
+    print('{:<20} saved {:.2f}us CPU per event ({:.1f}%)'.format(
+        'event_stream', 1e6 * saved / count, 100.0 * saved / results['eager']))
+
+
+@benchmark
+def bench_sse_framing(count: int) -> None:
+    """SSE framing of a received byte stream: line based (as before) vs. incremental SseParser"""
+    stream = ''.join('data: {}\n\n'.format(line) for line in EventStream.create(count)).encode('utf8')
+    chunk_size = 4096
+    chunks = [stream[pos:pos + chunk_size] for pos in range(0, len(stream), chunk_size)]
+
+    time_start = time.process_time()
+    received = 0
+    lines = []
+    for line in stream.splitlines(keepends=True):  # aiohttp StreamReader delivers lines
+        line = line.decode('utf8')
+        if line == '\n':
+            if lines[0] != ':ok\n':
+                received += bool(Event.parse(''.join(lines)).data)
+            lines = []
+        else:
+            lines.append(line)
+    report('sse_framing', 'lines + Event.parse', time.process_time() - time_start, received)
+
+    time_start = time.process_time()
+    received = 0
+    parser = SseParser()
+    for chunk in chunks:
+        received += len(parser.feed(chunk))
+    report('sse_framing', 'SseParser', time.process_time() - time_start, received)
+
+
+class ItemsDocument:
+    """synthetic "/items/" response of a large installation"""
+
+    @staticmethod
+    def create(count: int, seed: int = 4711) -> list:
+        rand = random.Random(seed)
+        items = []
+        for index in range(count):
+            name = 'valItem{}'.format(index)
+            items.append({
+                'link': 'http://127.0.0.1:8080/rest/items/{}'.format(name),
+                'state': '{:.2f}'.format(rand.uniform(0, 1000)),
+                'stateDescription': {'pattern': '%.1f W', 'readOnly': False, 'options': []},
+                'editable': False,
+                'type': 'Number',
+                'name': name,
+                'label': 'Item label {}'.format(index),
+                'category': 'energy',
+                'tags': ['Measurement'],
+                'groupNames': ['gGroup{}'.format(index % 50), 'gAll'],
+            })
+        return items
+
+
+@benchmark
+def bench_json_envelope(count: int) -> None:
+    """decode event envelope + embedded payload for each json backend"""
+    lines = EventStream.create(count)
+    backend_orig = JsonCodec.get_backend()
+    try:
+        for backend in JsonCodec.get_available_backends():
+            JsonCodec.set_backend(backend)
+            time_start = time.process_time()
+            for line in lines:
+                JsonCodec.loads(JsonCodec.loads(line)['payload'])
+            report('json_envelope', backend, time.process_time() - time_start, count)
+    finally:
+        JsonCodec.set_backend(backend_orig)
+
+
+@benchmark
+def bench_json_reload(count: int) -> None:
+    """decode a "/items/" response (count // 10 items) for each json backend"""
+    item_count = max(count // 10, 1)
+    content = json.dumps(ItemsDocument.create(item_count)).encode('utf8')
+    backend_orig = JsonCodec.get_backend()
+    try:
+        for backend in JsonCodec.get_available_backends():
+            JsonCodec.set_backend(backend)
+            time_start = time.process_time()
+            JsonCodec.loads(content)
+            report('json_reload', backend, time.process_time() - time_start, item_count,
+                   '({:.1f} MB)'.format(len(content) / 1e6))
+    finally:
+        JsonCodec.set_backend(backend_orig)
+
+
+class LegacyState:
+    """same attributes as the former mutable State, which had to be deep-copied on every read"""
+
+    def __init__(self, state):
+        self._type = state.type
+        self._value = state.value
+        self._raw = state._raw  # pylint: disable=protected-access
+        self._converted = True
+        self.last_change = state.last_change
+
+
+@benchmark
+def bench_state_read(count: int) -> None:
+    """gateway.get_item_state_value: locked deepcopy of a mutable state (as before) vs. shared immutable state"""
+    gateway = OhGateway()
+    gateway.set_dispatcher(DispatcherActionSink())
+    for line in EventStream.create(10000):
+        gateway.push_event(OhEvent.create_from_notify_json(line))
+    states = gateway.get_states()
+    legacy_states = {channel: LegacyState(state) for channel, state in states.items()}
+    lock = threading.Lock()
+    names = sorted(channel.name for channel in states if channel.type == ChannelType.ITEM)
+    names = [names[index % len(names)] for index in range(count)]
+
+    time_start = time.process_time()
+    for name in names:
+        channel = Channel.create(ChannelType.ITEM, name)
+        with lock:
+            state = copy.deepcopy(legacy_states.get(channel))
+        _ = state._value  # pylint: disable=protected-access
+    report('state_read', 'locked deepcopy', time.process_time() - time_start, count)
+
+    time_start = time.process_time()
+    for name in names:
+        _ = gateway.get_item_state_value(name)
+    report('state_read', 'shared immutable', time.process_time() - time_start, count)
+
+
+@benchmark
+def bench_state_snapshot(count: int) -> None:
+    """gateway.get_states with 8000 channels: deepcopy of the dict (as before) vs. copy-on-write snapshot"""
+    gateway = OhGateway()
+    gateway.set_dispatcher(DispatcherActionSink())
+    for index in range(8000):
+        line = EventStream._item_event('valItem{}'.format(index), 'Decimal', str(index))  # pylint: disable=W0212
+        gateway.push_event(OhEvent.create_from_notify_json(line))
+    legacy_states = {channel: LegacyState(state) for channel, state in gateway.get_states().items()}
+    repeats = max(count // 1000, 1)
+
+    time_start = time.process_time()
+    for _ in range(repeats):
+        copy.deepcopy(legacy_states)
+    report('state_snapshot', 'deepcopy', time.process_time() - time_start, repeats)
+
+    line = EventStream._item_event('valItem0', 'Decimal', '-1')  # pylint: disable=W0212
+    event = OhEvent.create_from_notify_json(line)
+    time_start = time.process_time()
+    for _ in range(repeats):
+        gateway.get_states()
+        gateway.push_event(event)  # first write after a snapshot copies the dict
+    report('state_snapshot', 'snapshot + write', time.process_time() - time_start, repeats)
+
+
+@benchmark
+def bench_state_query(count: int) -> None:
+    """switched on lights among 8000 channels: scan over get_states (as before) vs. secondary indexes"""
+    gateway = OhGateway()
+    gateway.set_dispatcher(DispatcherActionSink())
+    for index in range(8000):
+        if index % 100 == 0:
+            line = EventStream._item_event('light{}'.format(index), 'OnOff', 'ON')  # pylint: disable=W0212
+        else:
+            line = EventStream._item_event('valItem{}'.format(index), 'Decimal', str(index))  # pylint: disable=W0212
+        gateway.push_event(OhEvent.create_from_notify_json(line))
+    repeats = max(count // 100, 1)
+
+    time_start = time.process_time()
+    for _ in range(repeats):
+        found = [c for c, s in gateway.get_states().items() if c.name.startswith('light') and s.value == OnOffValue.ON]
+    report('state_query', 'scan', time.process_time() - time_start, repeats, '{} found'.format(len(found)))
+
+    time_start = time.process_time()
+    for _ in range(repeats):
+        found = gateway.query_channels(ChannelType.ITEM, name_prefix='light', value=OnOffValue.ON)
+    report('state_query', 'index', time.process_time() - time_start, repeats, '{} found'.format(len(found)))
+
+
+@benchmark
+def bench_state_contention(count: int) -> None:
+    """
+    get_states latency of 3 reader threads while the observer pushes batches of 500 events: readers sharing the writer
+    lock (as before) vs. the short store lock
+    """
+    gateway = OhGateway()
+    gateway.set_dispatcher(DispatcherActionSink())
+    lines = [EventStream._item_event('valItem{}'.format(i % 8000), 'Decimal', str(i))  # pylint: disable=W0212
+             for i in range(16000)]
+    events = [OhEvent.create_from_notify_json(line) for line in lines]
+    gateway.push_events(events[:8000])
+    batches = [events[i:i + 500] for i in range(0, len(events), 500)]
+    reads_per_thread = max(count // 30, 10)
+
+    def read_shared_lock():
+        with gateway._lock_state:  # pylint: disable=protected-access
+            return gateway._states.snapshot()  # pylint: disable=protected-access
+
+    for variant, read_func in [('writer lock', read_shared_lock), ('store lock', gateway.get_states)]:
+        stop = threading.Event()
+        latencies = []
+
+        def write():
+            index = 0
+            while not stop.is_set():
+                gateway.push_events(batches[index % len(batches)])
+                index += 1
+
+        def read():
+            local = []
+            for _ in range(reads_per_thread):
+                time_start = time.perf_counter()
+                read_func()
+                local.append(time.perf_counter() - time_start)
+                time.sleep(0.0005)
+            latencies.extend(local)
+
+        writer = threading.Thread(target=write)
+        readers = [threading.Thread(target=read) for _ in range(3)]
+        writer.start()
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        stop.set()
+        writer.join()
+
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99)]
+        report('state_contention', variant, sum(latencies), len(latencies),
+               'p99={:.3f}ms max={:.3f}ms'.format(1000 * p99, 1000 * latencies[-1]))
+
+
+class ReloadRest:
+    """delivers prepared events like "OhRest.fetch_all" """
+
+    def __init__(self, events: list):
+        self.events = events
+
+    def fetch_all(self) -> list:
+        return list(self.events)
+
+
+@benchmark
+def bench_cache_reload(count: int) -> None:
+    """OhGateway.cache_states with count // 10 items (1% changed): push_event per item (as before) vs. diff + swap"""
+    item_count = max(count // 10, 1)
+    rand = random.Random(4711)
+    names = ['valItem{}'.format(index) for index in range(item_count)]
+    events = [OhEvent.create_from_notify_json(EventStream._item_event(name, 'Decimal', '1'))  # pylint: disable=W0212
+              for name in names]
+    events_reload = [OhEvent.create_from_notify_json(EventStream._item_event(  # pylint: disable=W0212
+        name, 'Decimal', '2' if rand.random() < 0.01 else '1')) for name in names]
+
+    for variant in ['push_event', 'diff + swap']:
+        gateway = OhGateway()
+        gateway.set_dispatcher(DispatcherActionSink())
+        gateway.push_events(events)
+        gateway.set_rest(ReloadRest(events_reload))
+
+        time_start = time.process_time()
+        if variant == 'push_event':
+            existing_channels = set()
+            for event in events_reload:
+                gateway.push_event(event)
+                existing_channels.add(event.channel)
+            legacy_states = copy.deepcopy({c: LegacyState(s) for c, s in gateway.get_states().items()})
+            _ = [channel for channel in legacy_states if channel not in existing_channels]  # deleted
+        else:
+            gateway.cache_states()
+        report('cache_reload', variant, time.process_time() - time_start, item_count)
+    print('{:<20} {}'.format('cache_reload', gateway.get_reload_statistics()))
+
+
+@benchmark
+def bench_items_fetch(count: int) -> None:
+    """
+    "/items/" response with count // 10 items: full document + json.loads (as before) vs. trimmed fields
+    (fields=name,type,state) + streamed parsing in 64 KB chunks; reports bytes and the peak of python allocations
+    """
+    item_count = max(count // 10, 1)
+    items = ItemsDocument.create(item_count)
+    content_full = json.dumps(items).encode('utf8')
+    content_trimmed = json.dumps([{k: item[k] for k in ['name', 'type', 'state']} for item in items]).encode('utf8')
+    del items
+    chunk_size = 65536
+
+    def load_full():
+        return sum(1 for _ in json.loads(content_full))
+
+    def load_streamed():
+        parser = JsonArrayStreamParser()
+        received = 0
+        for pos in range(0, len(content_trimmed), chunk_size):
+            received += len(parser.feed(content_trimmed[pos:pos + chunk_size]))
+        return received
+
+    for variant, func, content in [('full + loads', load_full, content_full),
+                                   ('trimmed + streamed', load_streamed, content_trimmed)]:
+        tracemalloc.start()
+        time_start = time.process_time()
+        func()
+        seconds = time.process_time() - time_start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report('items_fetch', variant, seconds, item_count,
+               '({:.2f} MB transferred, {:.2f} MB peak)'.format(len(content) / 1e6, peak / 1e6))
+
+
+class LegacyChannel:
+    """the former Channel: new instance per event, hash built from a tuple, type checks on every comparison"""
+
+    def __init__(self, channel_type, name):
+        self.type = channel_type
+        self.name = name
+
+    def __eq__(self, other) -> bool:
+        if not other:
+            return False
+        if type(self) != type(other):
+            return False
+        if self.type != other.type:
+            return False
+        if self.type == ChannelType.STARTUP and self.type == other.type:
+            return True
+        if self.name != other.name:
+            return False
+        return True
+
+    def __hash__(self):
+        return hash((self.type, self.name))
+
+
+@benchmark
+def bench_channel_lookup(count: int) -> None:
+    """
+    dict lookups (channel created per event) in a dict of 10k channels and the memory of the channels of "count"
+    events: new instance per event (as before) vs. interned flyweights
+    """
+    names = ['valItem{}'.format(index) for index in range(10000)]
+    # names are decoded from JSON for every event => new strings
+    event_names = [''.join(names[index % len(names)]) for index in range(count)]
+
+    for variant, factory in [('new instance', LegacyChannel), ('interned', Channel.create)]:
+        states = {factory(ChannelType.ITEM, name): index for index, name in enumerate(names)}
+
+        time_start = time.process_time()
+        for name in event_names:
+            _ = states[factory(ChannelType.ITEM, name)]
+        seconds = time.process_time() - time_start
+
+        tracemalloc.start()
+        channels = [factory(ChannelType.ITEM, name) for name in event_names]
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del channels
+        report('channel_lookup', variant, seconds, count, '({:.2f} MB channels)'.format(memory / 1e6))
+
+
+class LatencyListener:
+    """rule, which records the time between pushing and dispatching an action"""
+
+    def __init__(self):
+        self.push_times = {}
+        self.latencies = []
+
+    def notify_action(self, action: Action) -> None:
+        self.latencies.append(time.perf_counter() - self.push_times[action.state_new.value])
+
+
+@benchmark
+def bench_wake_up(count: int) -> None:
+    """
+    event-to-rule latency (observer thread pushes count // 250 actions at random intervals) and wake-ups of the idle
+    main loop: polling with 30ms sleeps (as before) vs. blocking on the wake-up signal
+    """
+    action_count = max(count // 250, 10)
+    rand = random.Random(4711)
+    pauses = [rand.uniform(0.001, 0.01) for _ in range(action_count)]
+    channel = Channel.create(ChannelType.ITEM, 'valLatency')
+
+    for variant in ['polling 30ms', 'wake-up']:
+        dispatcher = Dispatcher()
+        wake_up = WakeUp()
+        if variant == 'wake-up':
+            dispatcher.set_wake_up(wake_up)
+        listener = LatencyListener()
+        dispatcher.register_oh_listener(channel, listener)
+        stop = threading.Event()
+        loops = [0]
+
+        def main_loop():
+            while not stop.is_set():
+                loops[0] += 1
+                if not dispatcher.dispatch():
+                    if variant == 'wake-up':
+                        wake_up.wait(3)
+                    else:
+                        time.sleep(0.03)
+
+        def produce():
+            for index, pause in enumerate(pauses):
+                time.sleep(pause)
+                action = Action()
+                action.channel = channel
+                action.notification_type = OhNotificationType.ITEM_CHANGE
+                action.state_new = State.create(StateType.DECIMAL, index)
+                listener.push_times[index] = time.perf_counter()
+                dispatcher.push_action(action)
+
+        thread_loop = threading.Thread(target=main_loop)
+        thread_loop.start()
+        produce()
+        time.sleep(0.1)
+
+        loops[0] = 0  # idle phase
+        time.sleep(1)
+        idle_loops = loops[0]
+        stop.set()
+        wake_up.signal()
+        thread_loop.join()
+
+        latencies = sorted(listener.latencies)
+        report('wake_up', variant, sum(latencies), len(latencies), 'p99={:.3f}ms idle wake-ups={}/s'.format(
+            1000 * latencies[int(len(latencies) * 0.99)], idle_loops))
+
+
+@benchmark
+def bench_fan_out(count: int) -> None:
+    """
+    fan-out of "count" state changes to the 12 listeners of a channel: deep copy per listener (as before) vs. shared
+    action bound by an envelope; plus the memory of the queued actions of 1000 events
+    """
+    listeners = [LatencyListener() for _ in range(12)]
+    channel = Channel.create(ChannelType.ITEM, 'valFanOut')
+    root_actions = []
+    for index in range(count):
+        action = Action()
+        action.channel = channel
+        action.notification_type = OhNotificationType.ITEM_CHANGE
+        action.state_old = State.create(StateType.DECIMAL, index)
+        action.state_new = State.create(StateType.DECIMAL, index + 1)
+        root_actions.append(action)
+
+    def fan_out_copy(root_action):
+        actions = []
+        for listener in listeners:
+            action = copy.deepcopy(root_action)
+            action.listener = listener
+            actions.append(action)
+        return actions
+
+    def fan_out_bound(root_action):
+        return [BoundAction(root_action, listener) for listener in listeners]
+
+    for variant, fan_out in [('deepcopy', fan_out_copy), ('bound envelope', fan_out_bound)]:
+        time_start = time.process_time()
+        for root_action in root_actions:
+            fan_out(root_action)
+        seconds = time.process_time() - time_start
+
+        tracemalloc.start()
+        queued = [fan_out(root_action) for root_action in root_actions[:1000]]
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del queued
+        report('fan_out', variant, seconds, count * len(listeners), '({:.2f} MB queued)'.format(memory / 1e6))
+
+
+@benchmark
+def bench_pattern_match(count: int) -> None:
+    """
+    subscriptions of "count" events (2000 channels) with 10/100/1000 glob patterns: testing every pattern vs. prefix
+    trie (uncached) vs. the dispatcher (trie + cached match results)
+    """
+    rand = random.Random(4711)
+    channels = [Channel.create(ChannelType.ITEM, 'val{}Sensor{}'.format(rand.choice(['Temp', 'Hum', 'Power']), i))
+                for i in range(2000)]
+    events = [rand.choice(channels) for _ in range(count)]
+
+    for pattern_count in [10, 100, 1000]:
+        patterns = [ChannelPattern.create_glob('val{}Sensor{}*'.format(['Temp', 'Hum', 'Power'][i % 3], i))
+                    for i in range(pattern_count)]
+        index = ChannelPatternIndex()
+        dispatcher = Dispatcher()
+        for pattern in patterns:
+            index.add(pattern, pattern)
+            dispatcher.register_pattern_listener(pattern, LatencyListener())
+
+        time_start = time.process_time()
+        for channel in events:
+            _ = [pattern for pattern in patterns if pattern.matches(channel)]
+        report('pattern_match', 'scan {}'.format(pattern_count), time.process_time() - time_start, count)
+
+        time_start = time.process_time()
+        for channel in events:
+            index.find(channel)
+        report('pattern_match', 'trie {}'.format(pattern_count), time.process_time() - time_start, count)
+
+        time_start = time.process_time()
+        for channel in events:
+            dispatcher._get_listeners_locked(channel)  # pylint: disable=protected-access
+        report('pattern_match', 'cached {}'.format(pattern_count), time.process_time() - time_start, count)
+
+
+@benchmark
+def bench_queue_fairness(count: int) -> None:
+    """
+    a rule subscribed to 400 channels queues "count" actions, meanwhile a second rule gets one action per 100: actions
+    served before the quiet rule's actions (avg) with one FIFO (as before) vs. per-rule queues (round robin)
+    """
+    chatty, quiet = LatencyListener(), LatencyListener()
+    channels = [Channel.create(ChannelType.ITEM, 'valSensor{}'.format(i)) for i in range(400)]
+    quiet_channel = Channel.create(ChannelType.ITEM, 'valQuiet')
+
+    def create_action(channel, value, listener):
+        action = Action()
+        action.channel = channel
+        action.notification_type = OhNotificationType.ITEM_CHANGE
+        action.state_new = State.create(StateType.DECIMAL, value)
+        return BoundAction(action, listener)
+
+    actions = []
+    for index in range(count):
+        actions.append(create_action(channels[index % len(channels)], index, chatty))
+        if index % 100 == 0:
+            actions.append(create_action(quiet_channel, index, quiet))
+
+    for fairness in [ActionQueueFairness.FIFO, ActionQueueFairness.ROUND_ROBIN]:
+        queue = ActionQueue.create(len(actions), fairness=fairness)
+        queue.put_all(actions)
+        time_start = time.process_time()
+        positions = []
+        position = 0
+        while True:
+            action = queue.get_nowait()
+            if action is None:
+                break
+            if action.listener is quiet:
+                positions.append(position)
+            position += 1
+        seconds = time.process_time() - time_start
+        report('queue_fairness', fairness.value, seconds, len(actions),
+               '(quiet rule waits behind {:.0f} actions)'.format(sum(positions) / len(positions)))
+
+
+@benchmark
+def bench_cron_jobs(count: int) -> None:
+    """
+    main loop passes with 5000 registered (not due) cron jobs: scanning all jobs (schedule.run_pending, as before) vs.
+    peeking the heap; plus firing every job 10 times from the heap
+    """
+    job_count = 5000
+    scheduler = schedule.Scheduler()
+    for index in range(job_count):
+        scheduler.every(index % 60 + 1).minutes.do(lambda: None)
+    time_start = time.process_time()
+    for _ in range(count):
+        scheduler.run_pending()
+    report('cron_jobs', 'schedule scan', time.process_time() - time_start, count)
+
+    now = datetime.datetime.now()
+    cron_scheduler = CronScheduler()
+    for index in range(job_count):
+        cron_scheduler.add('job{}'.format(index), IntervalTrigger(60 * (index % 60 + 1), now), None, now)
+    time_start = time.process_time()
+    for _ in range(count):
+        cron_scheduler.pop_due(now)
+    report('cron_jobs', 'heap peek', time.process_time() - time_start, count)
+
+    cron_scheduler = CronScheduler()
+    for index in range(job_count):
+        cron_scheduler.add('job{}'.format(index), IntervalTrigger(1, now), None, now)
+    time_start = time.process_time()
+    fired = 0
+    for second in range(10):
+        fired += len(cron_scheduler.pop_due(now + datetime.timedelta(seconds=second + 1)))
+    report('cron_jobs', 'heap fire', time.process_time() - time_start, fired)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='prend micro benchmarks')
+    parser.add_argument('--count', type=int, default=50000, help='operations per case')
+    parser.add_argument('cases', nargs='*', help='cases to run ({})'.format(', '.join(_cases)))
+    args = parser.parse_args()
+
+    cases = args.cases or list(_cases)
+    for case in cases:
+        func = _cases.get(case)
+        if not func:
+            print('unknown case "{}"!'.format(case))
+            return 1
+        func(args.count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())